@@ -0,0 +1,256 @@
+"""
+Build driver for the Slabikar.otf font, the examples and the visual tests.
+
+The build is split into stages. For each stage we record the fingerprints
+(SHA-256 hashes) of its input and output files in `.build_state.json`. A stage
+is only rerun if any of its inputs changed since its last successful run or if
+its outputs are missing or were modified. Use `--force` to rerun all stages.
+
+Usage:
+
+    python build.py [--force] [--tex] [stage ...]
+
+If no stages are given, all stages are run (in order), except the TeX visual
+test (pdf, png, compare: compiles example.tex with tectonic and rasterizes it
+with Ghostscript), which only runs with `--tex` or if its stages are given.
+The fast visual test (proof, visual) renders the text of example.tex directly
+with the font.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import time
+from glob import glob
+from hashlib import sha256
+
+root = os.path.dirname(os.path.abspath(__file__))
+state_file = os.path.join(root, ".build_state.json")
+
+# Maximum size of Slabikar.otf in bytes, the build fails if the font is larger.
+# It is kept close to the current size (27140 bytes), so that an unintended
+# growth of the outlines fails the build; raise it with an intended change.
+otf_budget = 28000
+
+# The modules that gen/svg.py imports (the other scripts in gen do not affect
+# the glyphs)
+glyph_modules = ["svg.py", "bezier.py", "stroke.py", "mfpath.py", "glif.py",
+    "cache.py"]
+
+# The web fonts written by gen/webfont.py
+webfonts = ["Slabikar.woff2", "Slabikar.woff",
+    "Slabikar-letters.woff2", "Slabikar-letters.woff",
+    "Slabikar-punctuation.woff2", "Slabikar-punctuation.woff",
+    "Slabikar-subsets.css"]
+
+def run(cmd, cwd="."):
+    print(f"+ {cmd}")
+    subprocess.run(cmd, shell=True, check=True, cwd=os.path.join(root, cwd))
+
+def files(*patterns):
+    """
+    Returns the sorted list of files matching the glob patterns (relative to
+    the root directory).
+    """
+    r = set()
+    for pattern in patterns:
+        for f in glob(os.path.join(root, pattern), recursive=True):
+            if os.path.isfile(f):
+                r.add(os.path.relpath(f, root))
+    return sorted(r)
+
+def fingerprint(filenames):
+    """
+    Returns a dictionary filename -> hash of the contents (None for missing
+    files).
+    """
+    r = {}
+    for filename in filenames:
+        try:
+            r[filename] = sha256(
+                    open(os.path.join(root, filename), "rb").read()).hexdigest()
+        except FileNotFoundError:
+            r[filename] = None
+    return r
+
+# Stages
+
+def build_glyphs():
+    run("python svg.py", cwd="gen")
+
+def build_features():
+    run("python features.py", cwd="gen")
+
+def build_otf():
+    shutil.rmtree(os.path.join(root, "tmp"), ignore_errors=True)
+    run("checkoutlinesufo -e font.ufo -o tmp")
+    run("psautohint tmp")
+    run("makeotf -r -gs -omitMacNames -f tmp -o tmp/Slabikar.otf")
+
+def build_size():
+    run(f"python gen/otfsize.py --subroutinize --budget {otf_budget} "
+        "-o Slabikar.otf tmp/Slabikar.otf")
+
+def build_webfont():
+    run("python gen/webfont.py --subsets Slabikar.otf")
+
+def build_copy():
+    for f in ["Slabikar.otf"] + webfonts:
+        shutil.copy(os.path.join(root, f), os.path.join(root, "examples/html"))
+    shutil.copy(os.path.join(root, "Slabikar.otf"),
+            os.path.join(root, "examples/tex"))
+
+def build_pdf():
+    run("tectonic example.tex", cwd="examples/tex")
+
+def build_png():
+    run("gs -q -dNOPAUSE -dBATCH -sDEVICE=pngmono -g2550x3300 -dPDFFitPage "
+        "-dUseCropBox -sOutputFile=example%d.png example.pdf",
+        cwd="examples/tex")
+
+def build_compare():
+    run("python compare.py", cwd="examples/tex")
+
+def build_proof():
+    run("python gen/proof.py")
+
+def build_visual():
+    run("python compare.py --summary proof.json proof.png", cwd="examples/tex")
+
+class Stage:
+
+    def __init__(self, name, action, inputs, outputs, tex=False,
+            edited=False):
+        """
+        name ... the name of the stage
+        action ... function that runs the stage
+        inputs, outputs ... functions returning the list of input and output
+            files (evaluated lazily, as the files can be created by previous
+            stages)
+        tex ... the stage is part of the TeX visual test
+        edited ... the outputs are checked in and could be edited by hand
+            by mistake, the stage refuses to overwrite them if they changed
+            since it generated them
+        """
+        self.name = name
+        self.action = action
+        self.inputs = inputs
+        self.outputs = outputs
+        self.tex = tex
+        self.edited = edited
+
+stages = [
+    Stage("glyphs", build_glyphs,
+        lambda: ["gen/" + f for f in glyph_modules],
+        lambda: files("font.ufo/glyphs/*", "font.ufo/lib.plist")
+            + ["GlyphOrderAndAliasDB"]),
+    Stage("features", build_features,
+        lambda: ["gen/features.py", "gen/svg.py"],
+        lambda: ["font.ufo/features.fea"], edited=True),
+    Stage("otf", build_otf,
+        lambda: files("font.ufo/**/*") + ["GlyphOrderAndAliasDB"],
+        lambda: ["tmp/Slabikar.otf"]),
+    Stage("size", build_size,
+        lambda: ["tmp/Slabikar.otf", "gen/otfsize.py"],
+        lambda: ["Slabikar.otf"]),
+    Stage("webfont", build_webfont,
+        lambda: ["Slabikar.otf", "gen/webfont.py"],
+        lambda: webfonts),
+    Stage("copy", build_copy,
+        lambda: ["Slabikar.otf"] + webfonts,
+        lambda: ["examples/html/Slabikar.otf", "examples/tex/Slabikar.otf"]
+            + ["examples/html/" + f for f in webfonts]),
+    Stage("proof", build_proof,
+        lambda: ["Slabikar.otf", "examples/tex/example.tex", "gen/proof.py",
+            "gen/render.py", "gen/shaper.py", "font.ufo/features.fea"],
+        lambda: ["examples/tex/proof.png"]),
+    Stage("visual", build_visual,
+        lambda: ["examples/tex/proof.png", "examples/tex/reference/proof.png",
+            "examples/tex/compare.py"],
+        lambda: ["examples/tex/proof.json"]),
+    Stage("pdf", build_pdf,
+        lambda: ["examples/tex/example.tex", "examples/tex/Slabikar.otf"],
+        lambda: ["examples/tex/example.pdf"], tex=True),
+    Stage("png", build_png,
+        lambda: ["examples/tex/example.pdf"],
+        lambda: ["examples/tex/example1.png", "examples/tex/example2.png"],
+        tex=True),
+    Stage("compare", build_compare,
+        lambda: files("examples/tex/example*.png",
+            "examples/tex/reference/example*.png", "examples/tex/compare.py"),
+        lambda: ["examples/tex/compare.json"], tex=True),
+]
+
+def load_state():
+    try:
+        return json.load(open(state_file))
+    except FileNotFoundError:
+        return {}
+
+def save_state(state):
+    json.dump(state, open(state_file, "w"), indent=2, sort_keys=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the font")
+    parser.add_argument("--force", action="store_true",
+            help="rerun all stages, even if their inputs did not change")
+    parser.add_argument("--tex", action="store_true",
+            help="also run the TeX visual test (needs tectonic and "
+            "Ghostscript)")
+    parser.add_argument("stages", nargs="*",
+            help="stages to run (default: all): "
+                + ", ".join(stage.name for stage in stages))
+    args = parser.parse_args()
+    for name in args.stages:
+        if name not in [stage.name for stage in stages]:
+            parser.error(f"unknown stage: {name}")
+
+    state = load_state()
+    timings = []
+    for stage in stages:
+        if args.stages and stage.name not in args.stages:
+            continue
+        if stage.tex and not args.tex and not args.stages:
+            continue
+        inputs = fingerprint(stage.inputs())
+        recorded = state.get(stage.name)
+        if not args.force and recorded is not None \
+                and recorded["inputs"] == inputs \
+                and recorded["outputs"] == fingerprint(stage.outputs()):
+            print(f"=== {stage.name}: up to date")
+            timings.append((stage.name, "skipped", 0.0))
+            continue
+        if stage.edited and recorded is not None:
+            for f, h in fingerprint(stage.outputs()).items():
+                if h is not None and h != recorded["outputs"].get(f):
+                    raise Exception(f"{f} was edited since the {stage.name} "
+                        "stage generated it, make the change in the "
+                        "generator instead (delete the file to regenerate "
+                        "it)")
+        print(f"=== {stage.name}")
+        t1 = time.perf_counter()
+        try:
+            stage.action()
+        except Exception:
+            # The stage must rerun next time
+            state.pop(stage.name, None)
+            save_state(state)
+            raise
+        t2 = time.perf_counter()
+        timings.append((stage.name, "run", t2-t1))
+        state[stage.name] = {
+            "inputs": inputs,
+            "outputs": fingerprint(stage.outputs()),
+        }
+        save_state(state)
+
+    print()
+    print("Stage      Status     Time [s]")
+    for name, status, t in timings:
+        print(f"{name:10} {status:10} {t:8.3f}")
+    print(f"{'total':10} {'':10} {sum(t for _, _, t in timings):8.3f}")
+
+if __name__ == "__main__":
+    main()
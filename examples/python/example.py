@@ -15,6 +15,9 @@ finally the RAQM [3] library provides a convenient API to FreeType+HarfBuzz.
 [1] https://freetype.org/
 [2] https://harfbuzz.github.io/
 [3] https://github.com/HOST-Oman/libraqm
+
+To render many strings (e.g. worksheets), use gen/render.py instead, which
+keeps the font loaded and caches the rendered glyphs.
 """
 import PIL.features
 if not PIL.features.check_feature("raqm"):
@@ -1,21 +1,160 @@
-from PIL.Image import open
-from PIL.ImageChops import difference
-
-def images_equal(img1, img2, diff):
-    d = difference(open(img1), open(img2))
-    if d.getbbox():
-        d.save(diff)
-        # Images not equal
-        return False
-    else:
-        # Images equal
-        return True
+"""
+Visual test: compares the rendered pages of example.pdf with the references.
+
+The pages are compared as NumPy bitmaps (True is ink). A differing pixel is
+tolerated if it is within `--tolerance` pixels of the ink of the other image
+(the added ink near the reference ink, the missing ink near the rendered
+ink), so the one pixel shifts of the edges (rounding in the rasterizer) do not
+fail the test, while a missing or added stroke does. This is the distance
+transform of the ink thresholded at the tolerance, computed as the dilation
+of the ink by a disk.
+
+For each page the differences are counted per tile (`--tile` pixels), the
+page fails if it has more than `--max-failing` pixels that are not tolerated.
+The pages are compared in parallel. Writes:
+
+* diff-<page>.png ... the heatmap of the differences of each differing page:
+  the reference ink in gray, the tiles shaded by their count of failing
+  pixels, the tolerated pixels in orange and the failing ones in red
+* compare.json ... the summary of all pages
+
+Usage:
+
+    python compare.py [--tolerance 1] [--tile 64] [--max-failing 0]
+        [--reference reference] [page.png ...]
+"""
+
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+from PIL import Image
 
-if __name__ == '__main__':
-    r1 = images_equal("example1.png", "reference/example1.png", "diff1.png")
-    r2 = images_equal("example2.png", "reference/example2.png", "diff2.png")
-    if r1 and r2:
+default_pages = ["example1.png", "example2.png"]
+
+def load_ink(filename: str) -> np.ndarray:
+    """
+    Returns the bitmap of the image, True where there is ink (black).
+    """
+    image = Image.open(filename)
+    if image.mode == "1":
+        return ~np.asarray(image)
+    return np.asarray(image.convert("L")) < 128
+
+def dilate(ink: np.ndarray, radius: int) -> np.ndarray:
+    """
+    Returns the pixels within `radius` (Euclidean distance) of the ink.
+    """
+    if radius <= 0:
+        return ink
+    h, w = ink.shape
+    padded = np.pad(ink, radius)
+    r = ink.copy()
+    for dy in range(-radius, radius + 1):
+        for dx in range(-radius, radius + 1):
+            if 0 < dx*dx + dy*dy <= radius*radius:
+                r |= padded[radius+dy:radius+dy+h, radius+dx:radius+dx+w]
+    return r
+
+def tile_counts(mask: np.ndarray, tile: int) -> np.ndarray:
+    """
+    Returns the number of set pixels of each tile x tile tile of the mask.
+    """
+    h, w = mask.shape
+    rows, columns = -(-h // tile), -(-w // tile)
+    padded = np.zeros((rows * tile, columns * tile), dtype=np.int32)
+    padded[:h, :w] = mask
+    return padded.reshape(rows, tile, columns, tile).sum(axis=(1, 3))
+
+def heatmap(reference: np.ndarray, tolerated: np.ndarray,
+        failing: np.ndarray, counts: np.ndarray, tile: int) -> Image.Image:
+    h, w = reference.shape
+    image = np.full((h, w, 3), 255, dtype=np.uint8)
+    if counts.max() > 0:
+        shade = counts / counts.max()
+        shade = np.repeat(np.repeat(shade, tile, axis=0), tile, axis=1)[:h, :w]
+        image[..., 1] = image[..., 2] = 255 - np.round(shade * 128)
+    image[reference] = (160, 160, 160)
+    image[tolerated] = (255, 160, 0)
+    image[failing] = (255, 0, 0)
+    return Image.fromarray(image)
+
+def compare_page(page: str, reference_dir: str, tolerance: int, tile: int,
+        max_failing: int) -> dict:
+    """
+    Compares the page with its reference, writes the heatmap if they differ.
+    Returns the summary of the page.
+    """
+    reference_file = os.path.join(reference_dir, os.path.basename(page))
+    ink = load_ink(page)
+    reference = load_ink(reference_file)
+    summary = {"page": page, "reference": reference_file}
+    if ink.shape != reference.shape:
+        summary.update(ok=False, error=f"size {ink.shape[1]}x{ink.shape[0]} "
+            f"differs from the reference {reference.shape[1]}x"
+            f"{reference.shape[0]}")
+        return summary
+    added = ink & ~reference
+    missing = reference & ~ink
+    failing = (added & ~dilate(reference, tolerance)) \
+            | (missing & ~dilate(ink, tolerance))
+    different = added | missing
+    counts = tile_counts(failing, tile)
+    n_failing = int(failing.sum())
+    summary.update(
+        ok=n_failing <= max_failing,
+        different=int(different.sum()),
+        failing=n_failing,
+        tiles=[{"x": int(c * tile), "y": int(r * tile),
+                "failing": int(counts[r, c])}
+            for r, c in zip(*np.nonzero(counts))],
+    )
+    if summary["different"] > 0:
+        diff = os.path.join(os.path.dirname(page),
+                "diff-" + os.path.basename(page))
+        heatmap(reference, different & ~failing, failing, counts, tile) \
+                .save(diff)
+        summary["heatmap"] = diff
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the rendered "
+            "pages with the references")
+    parser.add_argument("pages", nargs="*", default=default_pages,
+            help="the rendered pages (default: example1.png example2.png)")
+    parser.add_argument("--reference", default="reference",
+            help="directory of the reference pages (default: reference)")
+    parser.add_argument("--tolerance", type=int, default=1,
+            help="differences within this distance in pixels from the ink "
+            "are tolerated (default: 1)")
+    parser.add_argument("--tile", type=int, default=64,
+            help="tile size of the difference counts (default: 64)")
+    parser.add_argument("--max-failing", type=int, default=0,
+            help="maximum number of failing pixels per page (default: 0)")
+    parser.add_argument("--summary", default="compare.json",
+            help="the JSON summary (default: compare.json)")
+    args = parser.parse_args()
+
+    compare = partial(compare_page, reference_dir=args.reference,
+            tolerance=args.tolerance, tile=args.tile,
+            max_failing=args.max_failing)
+    with ProcessPoolExecutor() as executor:
+        summaries = list(executor.map(compare, args.pages))
+    json.dump(summaries, open(args.summary, "w"), indent=2)
+    for s in summaries:
+        if "error" in s:
+            print(f"{s['page']}: {s['error']}")
+        else:
+            print(f"{s['page']}: {s['different']} different pixels, "
+                f"{s['failing']} failing in {len(s['tiles'])} tiles")
+    if all(s["ok"] for s in summaries):
         print("Images equal")
     else:
         print("Images NOT equal")
         raise Exception("Images not equal")
+
+if __name__ == "__main__":
+    main()
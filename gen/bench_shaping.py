@@ -0,0 +1,254 @@
+"""
+Shaping benchmark for the Slabikář font.
+
+Shapes a set of corpora with HarfBuzz (via uharfbuzz, if installed, using
+Slabikar.otf) and with the Python shaper (shaper.py, using features.fea) and
+reports the throughput in glyphs per second. For the Python shaper it also
+reports the time spent in each lookup and the peak memory allocated while
+shaping. HarfBuzz does not expose per-lookup timings, so for it the time per
+feature is reported instead (shaping with only that feature enabled).
+
+The corpora:
+
+* example ... the text from the textarea in examples/html/example.html
+* connecting ... synthetic worst case: long words made only of the letters
+  with the most connection rules (b o v w s and the letters they connect to)
+* book ... the example text repeated to a book sized input (`--book-size`
+  characters)
+* any text files given by `--corpus`
+
+The results can be saved as JSON (`--output`) and compared to a previous run
+(`--compare`), e.g. between two builds of Slabikar.otf or features.fea.
+
+Usage:
+
+    python bench_shaping.py [--corpus file.txt] [--output results.json]
+        [--compare baseline.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import re
+import time
+import tracemalloc
+from html import unescape
+
+from shaper import Shaper, features_fea
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+example_html = os.path.join(root, "examples/html/example.html")
+font_otf = os.path.join(root, "Slabikar.otf")
+
+# Corpora
+
+def example_text():
+    html = open(example_html, encoding="utf-8").read()
+    m = re.search(r"<textarea[^>]*>(.*?)</textarea>", html, re.S)
+    return unescape(m.group(1)).strip()
+
+def connecting_text(size=20000, word_length=40, seed=0):
+    """
+    Long words where almost every letter triggers a connection rule (narrow
+    variants, "s" connections, begin/end glyphs).
+    """
+    rng = random.Random(seed)
+    letters = "bovwsšmnyýtzž"
+    words = []
+    n = 0
+    while n < size:
+        word = "".join(rng.choice(letters) for _ in range(word_length))
+        words.append(word)
+        n += len(word) + 1
+    return " ".join(words)
+
+def book_text(size):
+    text = example_text()
+    return (text + "\n") * (size // (len(text) + 1) + 1)
+
+def load_corpora(args):
+    corpora = {
+        "example": example_text(),
+        "connecting": connecting_text(),
+        "book": book_text(args.book_size),
+    }
+    for filename in args.corpus:
+        name = os.path.splitext(os.path.basename(filename))[0]
+        corpora[name] = open(filename, encoding="utf-8").read()
+    return corpora
+
+def paragraphs(text):
+    """
+    Splits the text into lines, which are shaped one at a time (as a browser
+    or TeX would shape the text of a paragraph run by run).
+    """
+    return [line for line in text.splitlines() if line.strip()]
+
+# Python shaper
+
+class ProfilingShaper(Shaper):
+    """
+    Shaper that accumulates the time spent in each lookup. The time of a
+    lookup includes the chained lookups it calls.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lookup_times = {}
+
+    def apply_lookup(self, lookup, buf, pos, values):
+        t1 = time.perf_counter()
+        r = super().apply_lookup(lookup, buf, pos, values)
+        t2 = time.perf_counter()
+        self.lookup_times[lookup.name] = \
+                self.lookup_times.get(lookup.name, 0) + t2 - t1
+        return r
+
+def bench_python(lines, repeat):
+    shaper = Shaper.from_file(features_fea)
+    best = None
+    for _ in range(repeat):
+        t1 = time.perf_counter()
+        glyphs = sum(len(shaper.shape(line)) for line in lines)
+        t2 = time.perf_counter()
+        best = t2-t1 if best is None else min(best, t2-t1)
+
+    # Per lookup times and memory are measured in a separate run, the
+    # instrumentation slows the shaping down
+    profiling = ProfilingShaper.from_file(features_fea)
+    tracemalloc.start()
+    for line in lines:
+        profiling.shape(line)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "glyphs": glyphs,
+        "time": best,
+        "glyphs_per_second": glyphs / best,
+        "lookups": dict(sorted(profiling.lookup_times.items(),
+            key=lambda x: -x[1])),
+        "peak_memory": peak,
+    }
+
+# HarfBuzz
+
+def bench_harfbuzz(lines, repeat):
+    import uharfbuzz as hb
+    face = hb.Face(open(font_otf, "rb").read())
+    font = hb.Font(face)
+
+    def shape(features=None):
+        glyphs = 0
+        for line in lines:
+            buf = hb.Buffer()
+            buf.add_str(line)
+            buf.guess_segment_properties()
+            hb.shape(font, buf, features)
+            glyphs += len(buf.glyph_infos)
+        return glyphs
+
+    def timeit(features=None):
+        best = None
+        for _ in range(repeat):
+            t1 = time.perf_counter()
+            glyphs = shape(features)
+            t2 = time.perf_counter()
+            best = t2-t1 if best is None else min(best, t2-t1)
+        return glyphs, best
+
+    glyphs, best = timeit()
+    tags = ["kern", "liga"]
+    features = {}
+    _, base = timeit({tag: False for tag in tags})
+    for tag in tags:
+        _, t = timeit({x: x == tag for x in tags})
+        features[tag] = t - base
+    return {
+        "glyphs": glyphs,
+        "time": best,
+        "glyphs_per_second": glyphs / best,
+        "features": features,
+    }
+
+def have_harfbuzz():
+    try:
+        import uharfbuzz
+    except ImportError:
+        return False
+    return os.path.exists(font_otf)
+
+# Reporting
+
+def print_results(results, baseline=None):
+    print(f"{'Corpus':12} {'Shaper':10} {'Glyphs':>9} {'Time [s]':>9} "
+        f"{'Glyphs/s':>10} {'Change':>8}")
+    for corpus, shapers in results["corpora"].items():
+        for name, r in shapers.items():
+            change = ""
+            try:
+                old = baseline["corpora"][corpus][name]["glyphs_per_second"]
+                change = f"{r['glyphs_per_second'] / old - 1:+8.1%}"
+            except (TypeError, KeyError):
+                pass
+            print(f"{corpus:12} {name:10} {r['glyphs']:9} {r['time']:9.4f} "
+                f"{r['glyphs_per_second']:10.0f} {change:>8}")
+    for corpus, shapers in results["corpora"].items():
+        if "python" in shapers:
+            r = shapers["python"]
+            print(f"\nPython shaper, {corpus}: peak memory "
+                f"{r['peak_memory'] / 1024:.0f} KiB, time per lookup:")
+            for name, t in r["lookups"].items():
+                print(f"    {name:14} {t:9.4f} s")
+        if "harfbuzz" in shapers:
+            r = shapers["harfbuzz"]
+            print(f"\nHarfBuzz, {corpus}: time per feature:")
+            for name, t in r["features"].items():
+                print(f"    {name:14} {t:9.4f} s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Shaping benchmark")
+    parser.add_argument("--corpus", action="append", default=[],
+            help="additional corpus (a UTF-8 text file), can be repeated")
+    parser.add_argument("--book-size", type=int, default=1000000,
+            help="size of the book corpus in characters (default: 1000000)")
+    parser.add_argument("--repeat", type=int, default=3,
+            help="number of runs, the best time is reported (default: 3)")
+    parser.add_argument("--shaper", choices=["python", "harfbuzz"],
+            action="append", help="shapers to run (default: all available)")
+    parser.add_argument("--output", help="save the results as JSON")
+    parser.add_argument("--compare", help="compare with saved results")
+    args = parser.parse_args()
+
+    shapers = args.shaper
+    if shapers is None:
+        shapers = ["python"]
+        if have_harfbuzz():
+            shapers.append("harfbuzz")
+    baseline = json.load(open(args.compare)) if args.compare else None
+
+    results = {
+        "python_version": platform.python_version(),
+        "features": features_fea,
+        "font": font_otf,
+        "corpora": {},
+    }
+    for corpus, text in load_corpora(args).items():
+        lines = paragraphs(text)
+        r = {}
+        for name in shapers:
+            print(f"Shaping {corpus} ({len(text)} characters) with {name}")
+            if name == "python":
+                r[name] = bench_python(lines, args.repeat)
+            else:
+                r[name] = bench_harfbuzz(lines, args.repeat)
+        results["corpora"][corpus] = r
+    print()
+    print_results(results, baseline)
+
+    if args.output:
+        json.dump(results, open(args.output, "w"), indent=2)
+
+if __name__ == "__main__":
+    main()
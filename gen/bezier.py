@@ -1,4 +1,6 @@
-from numpy import array, sqrt, arctan2, sin, cos
+from numpy import array, asarray, broadcast_to, sqrt, arctan2, sin, cos, \
+        float64, stack, zeros, arange, roll, pi
+from numpy.linalg import solve
 
 def arg(z):
     # NumPy's arctan2(y,x) is equal to the arg(x,y) before equation (2) in [1]
@@ -15,12 +17,33 @@ def compute_control_points(z1, z2, w1, w2, tau):
     Note: the unit tangent vector always points along the direction of the
     curve, so the first point "in" the curve, but the second points "out".
 
+    This is a convenience wrapper around compute_control_points_batch() for a
+    single segment.
+
     [1] John D. Hobby: Smooth, Easy to Compute Interpolating Splines. 1985. CS-TR-85-1047.
         Online link: http://i.stanford.edu/pub/cstr/reports/cs/tr/85/1047/CS-TR-85-1047.pdf
     """
-    z1 = array(z1)
-    z2 = array(z2)
-    tau1 = tau2 = tau
+    c = compute_control_points_batch([z1], [z2], [w1], [w2], tau, tau)
+    return c[0, 0], c[0, 1]
+
+def compute_control_points_batch(z1, z2, w1, w2, tau1, tau2):
+    """
+    Vectorized version of compute_control_points() for N segments at once.
+
+    z1, z2 ... N x 2 arrays of the Bezier nodes (1st and 4th control point)
+    w1, w2 ... N x 2 arrays of tangent vectors (just direction)
+    tau1, tau2 ... tensions at z1 and z2, either scalars or arrays of length N
+
+    Returns an N x 2 x 2 array, the [:,0,:] are the 2nd and [:,1,:] the 3rd
+    control points of each segment.
+    """
+    z1 = asarray(z1, dtype=float64).reshape(-1, 2)
+    z2 = asarray(z2, dtype=float64).reshape(-1, 2)
+    w1 = asarray(w1, dtype=float64).reshape(-1, 2)
+    w2 = asarray(w2, dtype=float64).reshape(-1, 2)
+    n = z1.shape[0]
+    tau1 = broadcast_to(asarray(tau1, dtype=float64), (n,))
+    tau2 = broadcast_to(asarray(tau2, dtype=float64), (n,))
 
     # Metafont parameters, paragraph after (10) in [1]
     a = sqrt(2)
@@ -28,27 +51,230 @@ def compute_control_points(z1, z2, w1, w2, tau):
     c = (3-sqrt(5))/2
 
     # Paragraph above equation (2) in [1]
-    theta = arg(w1) - arg(z2-z1)
-    phi   = arg(z2-z1) - arg(w2)
+    d = z2 - z1
+    arg_d = arg(d.T)
+    theta = arg(w1.T) - arg_d
+    phi   = arg_d - arg(w2.T)
+
+    st, ct = sin(theta), cos(theta)
+    sp, cp = sin(phi), cos(phi)
 
     # Equations (10) in [1]
-    alpha = a * (sin(theta) - b*sin(phi)) * (sin(phi) - b*sin(theta)) \
-              * (cos(theta) -   cos(phi))
-    rho   = (2 + alpha) / (1 + (1-c)*cos(theta) + c*cos(phi  ))
-    sigma = (2 - alpha) / (1 + (1-c)*cos(phi  ) + c*cos(theta))
+    alpha = a * (st - b*sp) * (sp - b*st) * (ct - cp)
+    rho   = (2 + alpha) / (1 + (1-c)*ct + c*cp)
+    sigma = (2 - alpha) / (1 + (1-c)*cp + c*ct)
 
     # Paragraph above equation (3) in [1]
-    c1 = rho/(3*tau1) * array([cos(theta), sin(theta)])
-    c2 = array([1 - sigma/(3*tau2) * cos(phi), sigma/(3*tau2) * sin(phi)])
+    u = stack([rho/(3*tau1) * ct, 1 - sigma/(3*tau2) * cp])
+    v = stack([rho/(3*tau1) * st, sigma/(3*tau2) * sp])
 
     # Shift and rotate the control points from (0,0)-(1,0) to z1-z2; equation (2) in [1]
-    c1 = z1 + array([
-        (z2[0]-z1[0])*c1[0]+(z1[1]-z2[1])*c1[1],
-        (z2[1]-z1[1])*c1[0]+(z2[0]-z1[0])*c1[1]
-        ])
-    c2 = z1 + array([
-        (z2[0]-z1[0])*c2[0]+(z1[1]-z2[1])*c2[1],
-        (z2[1]-z1[1])*c2[0]+(z2[0]-z1[0])*c2[1]
-        ])
-
-    return c1, c2
+    x = z1[:,0] + (d[:,0]*u - d[:,1]*v)
+    y = z1[:,1] + (d[:,1]*u + d[:,0]*v)
+    return stack([x, y], axis=-1).transpose(1, 0, 2)
+
+# Metafont's choice of the directions
+#
+# For the nodes where the direction is not given, Metafont chooses the
+# directions so that the (linearized) curvature is continuous at the nodes,
+# see [1], section 4 and "The METAFONTbook", chapter 14. The unknowns are the
+# angles theta_k between the chord z_k -> z_{k+1} and the outgoing direction
+# at z_k; the conditions form a tridiagonal (or cyclic tridiagonal) linear
+# system. The notation follows mf.web (part 18 "Choosing control points"),
+# where alpha and beta are the reciprocals of the tensions.
+
+def solve_tridiagonal(a, b, c, r):
+    """
+    Solves the tridiagonal system a[k] x[k-1] + b[k] x[k] + c[k] x[k+1] = r[k]
+    (a[0] and c[-1] are ignored) in O(n).
+    """
+    n = len(b)
+    cp = zeros(n)
+    rp = zeros(n)
+    cp[0] = c[0] / b[0]
+    rp[0] = r[0] / b[0]
+    for k in range(1, n):
+        m = b[k] - a[k]*cp[k-1]
+        cp[k] = c[k] / m if k < n-1 else 0
+        rp[k] = (r[k] - a[k]*rp[k-1]) / m
+    x = zeros(n)
+    x[-1] = rp[-1]
+    for k in range(n-2, -1, -1):
+        x[k] = rp[k] - cp[k]*x[k+1]
+    return x
+
+def solve_cyclic_tridiagonal(a, b, c, r):
+    """
+    Solves the cyclic tridiagonal system a[k] x[k-1] + b[k] x[k] + c[k] x[k+1]
+    = r[k] (the indices are modulo n) in O(n) using the Sherman-Morrison
+    formula.
+    """
+    n = len(b)
+    if n < 3:
+        m = zeros((n, n))
+        for k in range(n):
+            m[k, (k-1) % n] += a[k]
+            m[k, k] += b[k]
+            m[k, (k+1) % n] += c[k]
+        return solve(m, r)
+    gamma = -b[0]
+    bb = array(b, dtype=float64)
+    bb[0] -= gamma
+    bb[-1] -= a[0]*c[-1]/gamma
+    x = solve_tridiagonal(a, bb, c, r)
+    u = zeros(n)
+    u[0] = gamma
+    u[-1] = c[-1]
+    z = solve_tridiagonal(a, bb, c, u)
+    v0, vn = 1, a[0]/gamma
+    return x - (x[0]*v0 + x[-1]*vn) / (1 + z[0]*v0 + z[-1]*vn) * z
+
+def wrap_angle(a):
+    """
+    Normalizes the angles to (-pi, pi].
+    """
+    return -((pi - a) % (2*pi) - pi)
+
+def curl_ratio(gamma, alpha, beta):
+    # mf.web, section 296 (alpha, beta are the reciprocals of the tensions)
+    return ((3-alpha)*alpha**2*gamma + beta**3) / \
+            (alpha**3*gamma + (3-beta)*beta**2)
+
+def solve_run(z, tensions, w_start, w_end, curl=1):
+    """
+    Computes the directions at the nodes z[0..m] of a run of m curve segments
+    where only the outgoing direction at z[0] and the incoming direction at
+    z[m] can be given (otherwise they are None and the curl boundary
+    condition is used).
+
+    Returns the outgoing directions at z[0..m-1] and incoming directions at
+    z[1..m] (as unit vectors).
+    """
+    z = asarray(z, dtype=float64)
+    m = len(z) - 1
+    delta = z[1:] - z[:-1]
+    d = sqrt((delta**2).sum(axis=1))
+    arg_d = arctan2(delta[:,1], delta[:,0])
+    if m == 1 and w_start is None and w_end is None:
+        # Curls at both ends of a single segment: the straight line (the
+        # system is singular for equal curls)
+        w = delta / d[:,None]
+        return w, w
+    # The turning angle at each node, zero at the ends
+    psi = zeros(m+1)
+    psi[1:m] = wrap_angle(arg_d[1:] - arg_d[:-1])
+    # alpha[k] at z[k] (out of it), beta[k+1] at z[k+1] (into it)
+    inv_tau = 1 / asarray(tensions, dtype=float64)
+    alpha, beta = inv_tau, inv_tau
+
+    a = zeros(m+1); b = zeros(m+1); c = zeros(m+1); r = zeros(m+1)
+    # The curvature continuity at the inner nodes
+    k = arange(1, m)
+    A = alpha[k-1] / (beta[k-1]**2 * d[k-1])
+    B = (3 - alpha[k-1]) / (beta[k-1]**2 * d[k-1])
+    C = (3 - beta[k]) / (alpha[k]**2 * d[k])
+    D = beta[k] / (alpha[k]**2 * d[k])
+    a[k] = A
+    b[k] = B + C
+    c[k] = D
+    r[k] = -B*psi[k] - D*psi[k+1]
+    # The start
+    if w_start is not None:
+        b[0] = 1
+        r[0] = wrap_angle(arg(w_start) - arg_d[0])
+    else:
+        # theta_0 = ratio * phi_1 = -ratio * (theta_1 + psi_1)
+        ratio = curl_ratio(curl, alpha[0], beta[0])
+        b[0] = 1
+        c[0] = ratio
+        r[0] = -ratio * psi[1]
+    # The end, the unknown is theta_m = -phi_m (psi_m = 0)
+    if w_end is not None:
+        b[m] = 1
+        r[m] = -wrap_angle(arg_d[-1] - arg(w_end))
+    else:
+        # phi_m = ratio * theta_{m-1}
+        ratio = curl_ratio(curl, beta[-1], alpha[-1])
+        a[m] = ratio
+        b[m] = 1
+    theta = solve_tridiagonal(a, b, c, r)
+    phi = -theta[1:] - psi[1:]
+    w_out = stack([cos(arg_d + theta[:-1]), sin(arg_d + theta[:-1])], axis=-1)
+    w_in = stack([cos(arg_d - phi), sin(arg_d - phi)], axis=-1)
+    return w_out, w_in
+
+def solve_cycle(z, tensions):
+    """
+    Computes the directions at the nodes of the cyclic path z[0] .. z[n-1] ..
+    z[0] where no direction is given (tensions[k] is the tension of the
+    segment from z[k] to z[k+1 mod n]). Returns the directions at z[0..n-1].
+    """
+    z = asarray(z, dtype=float64)
+    n = len(z)
+    delta = roll(z, -1, axis=0) - z
+    d = sqrt((delta**2).sum(axis=1))
+    arg_d = arctan2(delta[:,1], delta[:,0])
+    psi = wrap_angle(arg_d - roll(arg_d, 1))
+    inv_tau = 1 / asarray(tensions, dtype=float64)
+    alpha = inv_tau
+    beta = roll(inv_tau, 1)
+    d_prev = roll(d, 1)
+    alpha_prev = roll(alpha, 1)
+    beta_next = inv_tau
+    A = alpha_prev / (beta**2 * d_prev)
+    B = (3 - alpha_prev) / (beta**2 * d_prev)
+    C = (3 - beta_next) / (alpha**2 * d)
+    D = beta_next / (alpha**2 * d)
+    theta = solve_cyclic_tridiagonal(A, B + C, D,
+            -B*psi - D*roll(psi, -1))
+    return stack([cos(arg_d + theta), sin(arg_d + theta)], axis=-1)
+
+def resolve_directions(z, w_in, w_out, tensions, cycle=False, curl=1):
+    """
+    Fills in the missing directions of the path like Metafont.
+
+    z ... the nodes
+    w_in, w_out ... the incoming and outgoing direction at each node, None if
+        not given
+    tensions ... the tension of each segment (from z[k] to z[k+1], for a cycle
+        the last one is from z[-1] to z[0]), None for a straight line
+    cycle ... whether the path is cyclic
+    curl ... the curl at the ends of the path and next to straight lines
+
+    Returns the new w_in, w_out lists. A direction given on one side of a
+    node is used on the other side as well (as in Metafont); the directions
+    at the ends of straight lines are left as None.
+    """
+    n = len(z)
+    w_in = [w_out[k] if w_in[k] is None else w_in[k] for k in range(n)]
+    w_out = [w_in[k] if w_out[k] is None else w_out[k] for k in range(n)]
+    nseg = n if cycle else n-1
+    curve = [tensions[k] is not None for k in range(nseg)]
+
+    def is_breakpoint(k):
+        # The direction is given, or the curl boundary condition is used
+        if w_in[k] is not None or (not cycle and k in [0, n-1]):
+            return True
+        return not curve[(k-1) % nseg] or not curve[k % nseg]
+
+    breaks = [k for k in range(n) if is_breakpoint(k)]
+    if len(breaks) == 0:
+        w = list(solve_cycle(z, tensions))
+        return w, w
+    # Solve each run of curves between two consecutive breakpoints
+    ends = breaks[1:] + [breaks[0] + n] if cycle else breaks[1:]
+    for i, j in zip(breaks, ends):
+        nodes = [k % n for k in range(i, j+1)]
+        segs = nodes[:-1]
+        if not curve[segs[0]] or (all(w_out[k] is not None for k in segs)
+                and all(w_in[k] is not None for k in nodes[1:])):
+            continue
+        w_start, w_end = solve_run([z[k] for k in nodes],
+                [tensions[k] for k in segs], w_out[i], w_in[nodes[-1]], curl)
+        for k, w in zip(segs, w_start):
+            if w_out[k] is None:
+                w_out[k] = w
+        for k, w in zip(nodes[1:], w_end):
+            if w_in[k] is None:
+                w_in[k] = w
+    return w_in, w_out
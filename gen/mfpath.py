@@ -0,0 +1,356 @@
+"""
+Parser of the Metafont path expressions used in the glyph definitions.
+
+The glyphs in svg.py carry their original Metafont source as a comment, this
+module allows to use the source directly, e.g.:
+
+    z1{left}..z1p..z0{-sklon2}..tension1.5..z2{right}..{sklon2}z4
+
+The supported subset:
+
+* knots: pair expressions with optional directions `{d}` before (incoming)
+  and after (outgoing) the knot; a direction on one side only is used on
+  both sides, knots without a direction get Metafont's implicit one
+* joins: `..`, `..tension t..`, `..tension t and t..` (equal tensions
+  only), `--` and `---` (straight lines); `...` and `tension atleast` are not
+  supported (they raise MFError rather than being approximated, which would
+  silently change the shape)
+* `..cycle` at the end of the path
+* `path shifted pair`, where the path can be a name of a path variable
+* numeric and pair expressions: numbers, `+ - * /`, parentheses, pairs
+  `(a,b)`, variables (`z1`, `x1` and `y1` refer to the pair `z1` and its
+  coordinates), `dir angle`, `right`, `left`, `up`, `down`, and a number
+  directly followed by a variable or parenthesis (`2z1`, `.5(x,y)`)
+
+The source is parsed into an abstract syntax tree (memoized by the source
+string), which is then evaluated with the variables of the glyph.
+"""
+
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from math import cos, sin, radians
+
+class MFError(Exception):
+    pass
+
+token_re = re.compile(r"""
+    (?P<space>\s+)
+  | (?P<number>\d+(?:\.\d+)?|\.\d+)
+  | (?P<keyword>(?:tension|and|atleast|cycle|shifted|dir|draw)(?![A-Za-z]))
+  | (?P<name>[A-Za-z_][A-Za-z_0-9]*)
+  | (?P<op>\.\.\.|\.\.|---|--|[-+*/(){},;])
+""", re.X)
+
+def tokenize(source: str):
+    tokens = []
+    pos = 0
+    while pos < len(source):
+        m = token_re.match(source, pos)
+        if m is None:
+            raise MFError(f"Unexpected character {source[pos]!r} in "
+                    f"{source!r}")
+        pos = m.end()
+        kind = m.lastgroup
+        if kind == "space":
+            continue
+        value = m.group()
+        if kind in ["keyword", "op"]:
+            kind = value
+        tokens.append((kind, value))
+    tokens.append(("end", None))
+    return tokens
+
+# Abstract syntax tree
+
+@dataclass(frozen=True)
+class Knot:
+    z: tuple
+    dir_in: tuple
+    dir_out: tuple
+
+@dataclass(frozen=True)
+class Path:
+    knots: tuple
+    # The tension expression of each join, None for a straight line
+    tensions: tuple
+    cycle: bool
+
+@dataclass(frozen=True)
+class Shifted:
+    path: object
+    offset: tuple
+
+@dataclass(frozen=True)
+class PathVariable:
+    name: str
+
+class Parser:
+
+    def __init__(self, source: str):
+        self.source = source
+        self.tokens = tokenize(source)
+        self.pos = 0
+
+    def peek(self, n=0):
+        return self.tokens[self.pos + n][0]
+
+    def next(self):
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def expect(self, kind):
+        token = self.next()
+        if token[0] != kind:
+            raise MFError(f"Expected {kind!r}, got {token[1]!r} in "
+                    f"{self.source!r}")
+        return token
+
+    # Expressions are tuples: ("num", value), ("var", name), ("pair", a, b),
+    # ("neg", a), ("dir", a) and (op, a, b) for the binary operators
+
+    def expression(self):
+        e = self.term()
+        while self.peek() in ["+", "-"]:
+            op = self.next()[0]
+            e = (op, e, self.term())
+        return e
+
+    def term(self):
+        e = self.factor()
+        while self.peek() in ["*", "/"]:
+            op = self.next()[0]
+            e = (op, e, self.factor())
+        return e
+
+    def factor(self):
+        kind = self.peek()
+        if kind == "-":
+            self.next()
+            return ("neg", self.factor())
+        if kind == "+":
+            self.next()
+            return self.factor()
+        if kind == "dir":
+            self.next()
+            return ("dir", self.factor())
+        if kind == "number":
+            e = ("num", float(self.next()[1]))
+            # Implicit multiplication: 2z1, .5(x,y)
+            if self.peek() in ["name", "("]:
+                e = ("*", e, self.primary())
+            return e
+        return self.primary()
+
+    def primary(self):
+        kind, value = self.next()
+        if kind == "number":
+            return ("num", float(value))
+        if kind == "name":
+            return ("var", value)
+        if kind == "(":
+            a = self.expression()
+            if self.peek() == ",":
+                self.next()
+                b = self.expression()
+                self.expect(")")
+                return ("pair", a, b)
+            self.expect(")")
+            return a
+        raise MFError(f"Unexpected {value!r} in {self.source!r}")
+
+    # Paths
+
+    def direction(self):
+        if self.peek() != "{":
+            return None
+        self.next()
+        d = self.expression()
+        self.expect("}")
+        return d
+
+    def knot(self):
+        dir_in = self.direction()
+        z = self.expression()
+        dir_out = self.direction()
+        return dir_in, z, dir_out
+
+    def no_atleast(self):
+        if self.peek() == "atleast":
+            raise MFError("tension atleast is not supported: "
+                    f"{self.source!r}")
+
+    def path_primary(self):
+        if self.peek() == "name" and self.peek(1) in ["shifted", "end", ";"]:
+            return PathVariable(self.next()[1])
+        knots = [self.knot()]
+        tensions = []
+        cycle = False
+        while self.peek() in ["..", "...", "--", "---"]:
+            join = self.next()[0]
+            if join in ["--", "---"]:
+                tension = None
+            elif join == "...":
+                raise MFError("The ... join is not supported: "
+                        f"{self.source!r}")
+            elif self.peek() == "tension":
+                self.next()
+                self.no_atleast()
+                tension = self.factor()
+                if self.peek() == "and":
+                    self.next()
+                    self.no_atleast()
+                    if self.factor() != tension:
+                        raise MFError("Different tensions on the two sides "
+                                f"of a join are not supported: {self.source!r}")
+                self.expect("..")
+            else:
+                tension = ("num", 1.0)
+            # The direction before the next knot belongs to it
+            if self.peek() == "cycle":
+                self.next()
+                tensions.append(tension)
+                cycle = True
+                break
+            tensions.append(tension)
+            knots.append(self.knot())
+        return Path(tuple(Knot(z, dir_in, dir_out)
+            for dir_in, z, dir_out in knots), tuple(tensions), cycle)
+
+    def path(self):
+        if self.peek() == "draw":
+            self.next()
+        p = self.path_primary()
+        while self.peek() == "shifted":
+            self.next()
+            p = Shifted(p, self.factor())
+        if self.peek() == ";":
+            self.next()
+        self.expect("end")
+        return p
+
+@lru_cache(maxsize=None)
+def parse(source: str):
+    """
+    Parses the Metafont path expression (memoized by the source).
+    """
+    return Parser(source).path()
+
+def expression_names(e):
+    if e is None or e[0] == "num":
+        return set()
+    if e[0] == "var":
+        return {e[1]}
+    return set().union(*[expression_names(x) for x in e[1:]])
+
+@lru_cache(maxsize=None)
+def free_names(source: str) -> frozenset:
+    """
+    The names of the variables used by the path expression.
+    """
+    def names(p):
+        if isinstance(p, PathVariable):
+            return {p.name}
+        if isinstance(p, Shifted):
+            return names(p.path) | expression_names(p.offset)
+        r = set()
+        for knot in p.knots:
+            for e in [knot.z, knot.dir_in, knot.dir_out]:
+                r |= expression_names(e)
+        for e in p.tensions:
+            r |= expression_names(e)
+        return r
+    return frozenset(names(parse(source)))
+
+# Evaluation
+
+constants = {
+    "right": (1.0, 0.0),
+    "left": (-1.0, 0.0),
+    "up": (0.0, 1.0),
+    "down": (0.0, -1.0),
+    "origin": (0.0, 0.0),
+}
+
+def lookup(name, env):
+    if name in env:
+        return env[name]
+    if name in constants:
+        return constants[name]
+    # x1, y1 are the coordinates of z1
+    if name[0] in "xy" and "z" + name[1:] in env:
+        return env["z" + name[1:]]["xy".index(name[0])]
+    raise MFError(f"Unknown variable {name!r}")
+
+def evaluate(e, env):
+    """
+    Evaluates the expression, returns a float or a pair (tuple).
+    """
+    kind = e[0]
+    if kind == "num":
+        return e[1]
+    if kind == "var":
+        v = lookup(e[1], env)
+        if isinstance(v, (int, float)):
+            return v
+        return (v[0], v[1])
+    if kind == "pair":
+        return (evaluate(e[1], env), evaluate(e[2], env))
+    if kind == "neg":
+        v = evaluate(e[1], env)
+        return -v if not isinstance(v, tuple) else (-v[0], -v[1])
+    if kind == "dir":
+        a = radians(evaluate(e[1], env))
+        return (cos(a), sin(a))
+    a = evaluate(e[1], env)
+    b = evaluate(e[2], env)
+    pa = isinstance(a, tuple)
+    pb = isinstance(b, tuple)
+    if kind in ["+", "-"]:
+        if pa != pb:
+            raise MFError("Cannot add a number and a pair")
+        s = 1 if kind == "+" else -1
+        return (a[0] + s*b[0], a[1] + s*b[1]) if pa else a + s*b
+    if kind == "*":
+        if pa and pb:
+            raise MFError("Cannot multiply two pairs")
+        if pa:
+            return (a[0]*b, a[1]*b)
+        if pb:
+            return (a*b[0], a*b[1])
+        return a*b
+    assert kind == "/"
+    if pb:
+        raise MFError("Cannot divide by a pair")
+    return (a[0]/b, a[1]/b) if pa else a/b
+
+def evaluate_path(p, env, draw, shift):
+    """
+    Evaluates the parsed path, returns the contour.
+
+    draw ... function (path, cycle) -> contour, where the path is in the
+        `_draw2` format (alternating nodes and tensions)
+    shift ... function (contour, offset) -> contour
+    """
+    if isinstance(p, PathVariable):
+        return lookup(p.name, env)
+    if isinstance(p, Shifted):
+        return shift(evaluate_path(p.path, env, draw, shift),
+                evaluate(p.offset, env))
+    path = []
+    for n, knot in enumerate(p.knots):
+        if n > 0:
+            t = p.tensions[n-1]
+            path.append(evaluate(t, env) if t is not None else None)
+        z = evaluate(knot.z, env)
+        dir_in = evaluate(knot.dir_in, env) if knot.dir_in else None
+        dir_out = evaluate(knot.dir_out, env) if knot.dir_out else None
+        if dir_in is not None and dir_out is not None:
+            path.append((dir_in, z, dir_out))
+        else:
+            path.append((z, dir_in if dir_in is not None else dir_out))
+    if p.cycle:
+        t = p.tensions[-1]
+        path.append(evaluate(t, env) if t is not None else None)
+    return draw(path, p.cycle)
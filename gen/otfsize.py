@@ -0,0 +1,188 @@
+"""
+Subroutinization and size report of Slabikar.otf.
+
+The glyphs share a lot of identical stroke pieces (the connections, dotah,
+smycka and the accents), which the CFF table can store once as subroutines.
+This script:
+
+* optionally desubroutinizes the CFF table (with fontTools) and
+  subroutinizes it again from scratch (requires cffsubr), keeping
+  the result only if it is smaller than the input
+* prints the size of each table, the size of the charstrings without the
+  subroutines (per glyph, the largest first) and how much the subroutines
+  save
+* fails (exit code 1) if the font is larger than the budget (`--budget`)
+
+Usage:
+
+    python otfsize.py [--subroutinize] [--budget bytes] [--glyphs n]
+        [-o out.otf] [font.otf]
+"""
+
+import argparse
+import os
+import sys
+from io import BytesIO
+
+from fontTools.ttLib import TTFont
+
+default_otf = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+        "../Slabikar.otf")
+
+def load(data: bytes) -> TTFont:
+    return TTFont(BytesIO(data))
+
+def save(font: TTFont) -> bytes:
+    f = BytesIO()
+    font.save(f)
+    return f.getvalue()
+
+def table_sizes(data: bytes) -> dict:
+    """
+    Returns the tag -> size in bytes of each table in the font file.
+    """
+    font = load(data)
+    return {tag: font.reader.tables[tag].length for tag in font.reader.keys()}
+
+def cff_table(font: TTFont):
+    if "CFF " not in font:
+        raise Exception("The font does not have a CFF table")
+    return font["CFF "].cff
+
+def desubroutinized(data: bytes) -> TTFont:
+    """
+    Returns the font with all subroutine calls in the charstrings inlined.
+    """
+    font = load(data)
+    cff_table(font).desubroutinize()
+    return font
+
+def charstring_sizes(font: TTFont) -> dict:
+    """
+    Returns the glyph name -> size in bytes of the charstring.
+    """
+    charstrings = cff_table(font).topDictIndex[0].CharStrings
+    r = {}
+    for name in charstrings.keys():
+        cs = charstrings[name]
+        cs.compile()
+        r[name] = len(cs.bytecode)
+    return r
+
+def subroutine_sizes(font: TTFont):
+    """
+    Returns (number, bytes) of the global and of the local subroutines.
+    """
+    cff = cff_table(font)
+    def size(subrs):
+        n = 0
+        for cs in subrs:
+            cs.compile()
+            n += len(cs.bytecode)
+        return len(subrs), n
+    private = cff.topDictIndex[0].Private
+    local = private.Subrs if hasattr(private, "Subrs") else []
+    return size(cff.GlobalSubrs), size(local)
+
+def subroutinize(data: bytes) -> bytes:
+    """
+    Desubroutinizes the CFF table and subroutinizes it again. Requires
+    cffsubr (it runs the subroutinizer of the AFDKO `tx` tool).
+    """
+    import cffsubr
+    font = desubroutinized(data)
+    cffsubr.subroutinize(font)
+    return save(font)
+
+def have_cffsubr():
+    try:
+        import cffsubr
+    except ImportError:
+        return False
+    return True
+
+def report(data: bytes, glyphs: int):
+    tables = table_sizes(data)
+    print(f"{'Table':8} {'Bytes':>8} {'Share':>7}")
+    for tag, size in sorted(tables.items(), key=lambda x: -x[1]):
+        print(f"{tag:8} {size:8} {size / len(data):7.1%}")
+    print(f"{'total':8} {len(data):8}")
+
+    font = load(data)
+    (ngsubrs, gsubrs), (nlsubrs, lsubrs) = subroutine_sizes(font)
+    subroutinized = sum(charstring_sizes(font).values())
+    flat_font = desubroutinized(data)
+    sizes = charstring_sizes(flat_font)
+    flat = sum(sizes.values())
+    print()
+    print(f"Charstrings: {len(sizes)} glyphs, {flat} bytes without "
+        f"subroutines, {subroutinized} bytes with {ngsubrs} global "
+        f"({gsubrs} bytes) and {nlsubrs} local ({lsubrs} bytes) "
+        f"subroutines")
+    saved = flat - subroutinized - gsubrs - lsubrs
+    print(f"The subroutines save {saved} bytes "
+        f"({saved / flat if flat else 0:.1%} of the charstrings)")
+
+    # Glyphs with identical outlines cannot share them by subroutines
+    # completely (each needs at least the calls)
+    by_bytecode = {}
+    charstrings = cff_table(flat_font).topDictIndex[0].CharStrings
+    for name in charstrings.keys():
+        by_bytecode.setdefault(charstrings[name].bytecode, []).append(name)
+    duplicates = [names for names in by_bytecode.values() if len(names) > 1]
+    if duplicates:
+        print("Identical charstrings: " + "; ".join(" ".join(names)
+            for names in duplicates))
+
+    if glyphs > 0:
+        print()
+        print("Largest glyphs (charstring bytes without subroutines):")
+        print(f"{'Glyph':20} {'Bytes':>6} {'Share':>7}")
+        for name, size in sorted(sizes.items(), key=lambda x: -x[1])[:glyphs]:
+            print(f"{name:20} {size:6} {size / flat:7.1%}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Subroutinize the CFF "
+            "table and report the size of the font")
+    parser.add_argument("font", nargs="?", default=default_otf,
+            help="the font (default: Slabikar.otf)")
+    parser.add_argument("-o", "--output",
+            help="write the font to this file (default: overwrite the input, "
+            "only with --subroutinize)")
+    parser.add_argument("--subroutinize", action="store_true",
+            help="desubroutinize and subroutinize the CFF table again")
+    parser.add_argument("--budget", type=int,
+            help="fail if the font is larger than this (in bytes)")
+    parser.add_argument("--glyphs", type=int, default=20,
+            help="number of the largest glyphs to list (default: 20)")
+    args = parser.parse_args()
+
+    data = open(args.font, "rb").read()
+    if args.subroutinize:
+        # The budget must be checked on the same font everywhere, so the
+        # step is never skipped
+        if not have_cffsubr():
+            parser.error("--subroutinize requires cffsubr (pip install "
+                "cffsubr)")
+        new = subroutinize(data)
+        print(f"Subroutinized: {len(data)} -> {len(new)} bytes")
+        if len(new) < len(data):
+            data = new
+        else:
+            print("Keeping the original subroutines")
+    if args.output or args.subroutinize:
+        open(args.output or args.font, "wb").write(data)
+
+    print()
+    report(data, args.glyphs)
+
+    if args.budget is not None:
+        print()
+        if len(data) > args.budget:
+            sys.exit(f"The font is {len(data)} bytes, over the budget of "
+                f"{args.budget} bytes")
+        print(f"The font is {len(data)} bytes, the budget is {args.budget} "
+            f"bytes")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Fast visual test: renders the text of examples/tex/example.tex directly with
+Slabikar.otf (see render.py: HarfBuzz if installed, otherwise the Python
+shaper, and FreeType) into examples/tex/proof.png, which is then compared
+with examples/tex/reference/proof.png by compare.py.
+
+This checks the glyphs and the connections in a few seconds, without TeX and
+Ghostscript. The glyphs are rendered without hinting, so the proof depends on
+the outlines, not on the hints of the build (autohinting) or on the hinting
+engine of the FreeType version. The text is not typeset as by TeX: the macros of example.tex are
+replaced by their characters and each line of the source is rendered as one
+line of the proof (the paragraphs are not broken). The full TeX round trip
+(`python build.py --tex`) remains the integration test.
+
+Usage:
+
+    python proof.py [--size 50] [--update] [-o proof.png] [example.tex]
+
+With `--update` the reference is overwritten by the rendered proof, e.g. after
+an intended change of the glyphs (run `python build.py` first, so that the
+proof is rendered from the current build of Slabikar.otf).
+"""
+
+import argparse
+import os
+import re
+import shutil
+
+import numpy as np
+from PIL import Image
+
+from render import Renderer, default_otf, draw
+
+examples = os.path.normpath(os.path.join(os.path.dirname(
+        os.path.abspath(__file__)), "../examples/tex"))
+
+# TeX macros of example.tex -> text (the font has no en and em dash, so the
+# -- and --- are kept as hyphens)
+tex_replacements = [
+    (r"\TeX{}", "TeX"),
+    (r"\TeX", "TeX"),
+    (r"\textbackslash", "\\"),
+    (r"\^{}", "^"),
+    (r"\~{}", "~"),
+    (r"\{", "{"),
+    (r"\}", "}"),
+    (r"\%", "%"),
+    (r"\&", "&"),
+    (r"\$", "$"),
+    (r"\#", "#"),
+    (r"\_", "_"),
+    (r"\noindent", ""),
+    (r"\hfill", ""),
+    ("\\\\", ""),
+]
+
+def tex_lines(filename: str) -> list[str]:
+    """
+    Returns the text lines of the document body of the TeX file, without
+    the commands that only set up the typesetting.
+    """
+    tex = open(filename, encoding="utf-8").read()
+    body = tex.split(r"\begin{document}")[1].split(r"\end{document}")[0]
+    lines = []
+    for line in body.splitlines():
+        line = line.strip()
+        # \fontsize, \fontspec, \def, \righthyphenmin, \medskip, ...
+        if re.match(r"\\[a-zA-Z]+([{=\\ ]|$)", line) and \
+                not re.match(r"\\(noindent|hfill)\b", line):
+            continue
+        # The ties
+        line = re.sub(r"(?<!\\)~", " ", line)
+        for a, b in tex_replacements:
+            line = line.replace(a, b)
+        line = line.strip()
+        if line:
+            lines.append(line)
+    return lines
+
+def render_proof(renderer: Renderer, lines: list[str], size: int = 50,
+        line_height: int = None) -> np.ndarray:
+    """
+    Renders the lines (without antialiasing), returns the coverage image
+    (uint8, 255 is black).
+    """
+    if line_height is None:
+        line_height = size * 6 // 5
+    margin = size // 2
+    placed = [renderer.place(line, size, antialias=False)[0] for line in lines]
+    glyphs = [g for p in placed for g in p]
+    left = min([0] + [x for _, x, _ in glyphs])
+    right = max([0] + [x + c.shape[1] for c, x, _ in glyphs])
+    top = max([size] + [t for _, _, t in glyphs])
+    width = right - left + 2 * margin
+    height = top + (len(lines) - 1) * line_height + size + 2 * margin
+    image = np.zeros((height, width), dtype=np.uint8)
+    for n, p in enumerate(placed):
+        draw(image, p, margin - left, margin + top + n * line_height)
+    return image
+
+def main():
+    parser = argparse.ArgumentParser(description="Render the text of "
+            "example.tex for the visual test")
+    parser.add_argument("tex", nargs="?",
+            default=os.path.join(examples, "example.tex"),
+            help="the TeX file (default: examples/tex/example.tex)")
+    parser.add_argument("--font", default=default_otf,
+            help="the font (default: Slabikar.otf)")
+    parser.add_argument("--size", type=int, default=50,
+            help="font size in pixels per em (default: 50)")
+    parser.add_argument("-o", "--output",
+            default=os.path.join(examples, "proof.png"),
+            help="the output image (default: examples/tex/proof.png)")
+    parser.add_argument("--update", action="store_true",
+            help="also store the proof as the reference")
+    args = parser.parse_args()
+
+    lines = tex_lines(args.tex)
+    renderer = Renderer(args.font, hinting=False)
+    coverage = render_proof(renderer, lines, args.size)
+    Image.fromarray(coverage == 0).save(args.output)
+    print(f"{args.output}: {len(lines)} lines, {coverage.shape[1]}x"
+        f"{coverage.shape[0]} pixels")
+    if args.update:
+        reference = os.path.join(os.path.dirname(args.output), "reference",
+                os.path.basename(args.output))
+        shutil.copy(args.output, reference)
+        print(f"{reference}: updated")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""
+Scanline rasterizer of Glif contours in NumPy.
+
+Renders the glyphs directly from the contours (as produced by `parse_glif`,
+`parse_svg` or loaded by ufo.py), without FreeType, Inkscape or Ghostscript,
+e.g. for previews and for pixel regression checks of font.ufo without building
+the OTF.
+
+The curves are flattened adaptively: each cubic is split into the number of
+line segments given by Wang's formula for the flatness `tolerance` (in
+pixels), all segments of a glyph are evaluated at once. The polygons are then
+filled with the non-zero winding rule and antialiased by supersampling:
+
+* each edge is intersected with the sample rows it spans (`samples` rows per
+  pixel), which gives the (row, column, ±1) winding crossings of all edges as
+  a few array operations
+* the crossings are summed into an accumulation buffer (`np.bincount`) and
+  the cumulative sum along each row gives the winding number of each sample
+* the samples with a non-zero winding number are averaged to the coverage of
+  each pixel (`samples` x `samples` samples per pixel)
+
+The contours of many glyphs (e.g. the whole font for a proof sheet) are
+rasterized at once, the buffer is processed in bands of rows to bound the
+memory.
+
+Usage:
+
+    python raster.py [--size 64] [--columns 16] [-o proof.png] [font.ufo]
+"""
+
+import argparse
+import os
+import time
+from math import ceil
+
+import numpy as np
+
+from glif import Point
+
+default_ufo = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+        "../font.ufo")
+
+# Flattening
+
+def contour_segments(contour: list[Point]):
+    """
+    Returns the (p0, p1, p2, p3) cubic segments of the contour (lines and
+    quadratic curves are converted to cubics) and whether it is closed. Open
+    contours are closed by the fill.
+    """
+    if len(contour) == 0:
+        return [], False
+    closed = contour[0].type != "move"
+    points = contour[1:] + [contour[0]] if closed else contour[1:]
+    segments = []
+    current = (contour[0].x, contour[0].y)
+    pending = []
+    for p in points:
+        if p.type == "offcurve":
+            pending.append((p.x, p.y))
+            continue
+        end = (p.x, p.y)
+        if len(pending) == 0:
+            segments.append((current, current, end, end))
+        elif len(pending) == 1:
+            q = pending[0]
+            segments.append((current,
+                (current[0] + 2/3*(q[0]-current[0]),
+                    current[1] + 2/3*(q[1]-current[1])),
+                (end[0] + 2/3*(q[0]-end[0]), end[1] + 2/3*(q[1]-end[1])),
+                end))
+        else:
+            segments.append((current, pending[0], pending[1], end))
+        current = end
+        pending = []
+    if not closed and current != (contour[0].x, contour[0].y):
+        start = (contour[0].x, contour[0].y)
+        segments.append((current, current, start, start))
+    return segments, closed
+
+def flatten(segments: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    Flattens the cubic segments (array of shape (n, 4, 2), consecutive
+    segments of each contour must join) into the (x0, y0, x1, y1) edges.
+    """
+    if len(segments) == 0:
+        return np.zeros((0, 4))
+    p0, p1, p2, p3 = segments[:, 0], segments[:, 1], segments[:, 2], \
+            segments[:, 3]
+    # Wang's formula: n = sqrt(3/4 * max |second difference| / tolerance)
+    d = np.maximum(np.hypot(*(p0 - 2*p1 + p2).T), np.hypot(*(p1 - 2*p2 + p3).T))
+    n = np.maximum(np.ceil(np.sqrt(0.75 * d / tolerance)), 1).astype(int)
+    index = np.repeat(np.arange(len(n)), n)
+    first = np.cumsum(n) - n
+    t = (np.arange(len(index)) - first[index] + 1) / n[index]
+    t = t[:, None]
+    s = 1 - t
+    points = s**3 * p0[index] + 3*s*s*t * p1[index] + 3*s*t*t * p2[index] \
+        + t**3 * p3[index]
+    starts = np.empty_like(points)
+    starts[1:] = points[:-1]
+    starts[first] = p0
+    return np.hstack([starts, points])
+
+def glif_edges(contours: list[list[Point]], tolerance: float,
+        scale: float, dx: float, dy: float) -> np.ndarray:
+    """
+    Returns the edges of the contours transformed to the pixel coordinates
+    (x*scale + dx, dy - y*scale) (the y axis points down in the image).
+    """
+    segments = []
+    for contour in contours:
+        segments.extend(contour_segments(contour)[0])
+    if len(segments) == 0:
+        return np.zeros((0, 4))
+    s = np.array(segments, dtype=float)
+    s[..., 0] = s[..., 0] * scale + dx
+    s[..., 1] = dy - s[..., 1] * scale
+    return flatten(s, tolerance)
+
+# Filling
+
+def rasterize(edges: np.ndarray, width: int, height: int, samples: int = 4,
+        band: int = 64) -> np.ndarray:
+    """
+    Fills the polygons given by the edges (x0, y0, x1, y1 in pixels) with the
+    non-zero winding rule. Returns the coverage (float, 0..1) of the pixels,
+    shape (height, width).
+    """
+    coverage = np.zeros((height, width))
+    edges = edges[edges[:, 1] != edges[:, 3]]
+    if len(edges) == 0 or width == 0 or height == 0:
+        return coverage
+    x0, y0, x1, y1 = edges.T * samples
+    direction = np.where(y1 > y0, 1, -1)
+    ya = np.minimum(y0, y1)
+    yb = np.maximum(y0, y1)
+    slope = (x1 - x0) / (y1 - y0)
+    # The sample rows r (with the center r + 0.5) in [ya, yb)
+    rows = height * samples
+    r0 = np.clip(np.ceil(ya - 0.5), 0, rows).astype(int)
+    r1 = np.clip(np.ceil(yb - 0.5), 0, rows).astype(int)
+    count = r1 - r0
+    index = np.repeat(np.arange(len(edges)), count)
+    r = r0[index] + np.arange(len(index)) - (np.cumsum(count) - count)[index]
+    x = x0[index] + (r + 0.5 - y0[index]) * slope[index]
+    # The crossing toggles the samples with the center right of it
+    columns = width * samples
+    c = np.clip(np.ceil(x - 0.5), 0, columns).astype(int)
+    w = direction[index]
+
+    order = np.argsort(r, kind="stable")
+    r, c, w = r[order], c[order], w[order]
+    band_rows = band * samples
+    bounds = np.searchsorted(r, np.arange(0, rows + band_rows, band_rows))
+    for b in range(len(bounds) - 1):
+        i, j = bounds[b], bounds[b+1]
+        if i == j:
+            continue
+        first = b * band_rows
+        n = min(band_rows, rows - first)
+        acc = np.bincount((r[i:j] - first) * (columns + 1) + c[i:j],
+                weights=w[i:j], minlength=n * (columns + 1))
+        winding = np.cumsum(acc.reshape(n, columns + 1)[:, :-1], axis=1)
+        inside = winding != 0
+        pixels = inside.reshape(n // samples, samples, width, samples)
+        coverage[first // samples:(first + n) // samples] = \
+                pixels.mean(axis=(1, 3))
+    return coverage
+
+def render_glif(glif, size: float, upem: int = 1000, ascender: int = 800,
+        descender: int = -300, samples: int = 4,
+        tolerance: float = 0.1) -> tuple[np.ndarray, int]:
+    """
+    Renders the glyph at `size` pixels per em. The image spans the advance
+    width and the ink horizontally and the ascender to descender height.
+    Returns the coverage and the x coordinate of the glyph origin in it.
+    """
+    s = size / upem
+    edges = glif_edges(glif.contours, tolerance, s, 0, ascender * s)
+    x = edges[:, [0, 2]]
+    left = min(0, int(np.floor(x.min()))) if len(x) else 0
+    right = max(ceil((glif.w or 0) * s), ceil(x.max()) if len(x) else 0)
+    edges[:, [0, 2]] -= left
+    height = ceil((ascender - descender) * s)
+    return rasterize(edges, right - left, height, samples), -left
+
+def proof_sheet(ufo, size: float = 64, columns: int = 16, samples: int = 4,
+        tolerance: float = 0.1) -> np.ndarray:
+    """
+    Renders all glyphs of the UFO (see ufo.py) in a grid, the components are
+    decomposed. Returns the coverage of the whole sheet, all glyphs are
+    rasterized at once.
+    """
+    upem, ascender, descender = 1000, 800, -300
+    s = size / upem
+    # The glyphs overhang to the left (the connections), the cells fit the
+    # ink of all glyphs
+    bounds = ufo.bounds()
+    left = min(0, np.nanmin(bounds[:, 0]))
+    right = max(np.nanmax(ufo.widths), np.nanmax(bounds[:, 2]))
+    cell_w = ceil((right - left) * s + size / 4)
+    cell_h = ceil((ascender - descender) * s)
+    rows = ceil(len(ufo) / columns)
+    edges = []
+    for n, name in enumerate(ufo.names):
+        row, col = divmod(n, columns)
+        dx = col * cell_w - left * s + size / 8
+        dy = row * cell_h + ascender * s
+        edges.append(glif_edges(ufo.glif(name, flatten=True).contours,
+            tolerance, s, dx, dy))
+    return rasterize(np.vstack(edges), columns * cell_w, rows * cell_h,
+            samples)
+
+def save_png(coverage: np.ndarray, filename: str):
+    """
+    Saves the coverage as a black on white grayscale image.
+    """
+    from PIL import Image
+    image = (255 - np.round(coverage * 255)).astype(np.uint8)
+    Image.fromarray(image).save(filename)
+
+def main():
+    from ufo import UFO
+    parser = argparse.ArgumentParser(description="Render a proof sheet of "
+            "the UFO glyphs")
+    parser.add_argument("ufo", nargs="?", default=default_ufo,
+            help="the UFO directory (default: font.ufo)")
+    parser.add_argument("--size", type=float, default=64,
+            help="font size in pixels per em (default: 64)")
+    parser.add_argument("--columns", type=int, default=16,
+            help="number of glyphs per row (default: 16)")
+    parser.add_argument("--samples", type=int, default=4,
+            help="samples per pixel in each direction, 1 disables "
+            "antialiasing (default: 4)")
+    parser.add_argument("-o", "--output", default="proof.png",
+            help="the output image (default: proof.png)")
+    args = parser.parse_args()
+
+    ufo = UFO(args.ufo)
+    t1 = time.perf_counter()
+    coverage = proof_sheet(ufo, args.size, args.columns, args.samples)
+    t2 = time.perf_counter()
+    save_png(coverage, args.output)
+    print(f"{args.output}: {len(ufo)} glyphs, {coverage.shape[1]}x"
+        f"{coverage.shape[0]} pixels, rendered in {(t2-t1)*1000:.0f} ms")
+
+if __name__ == "__main__":
+    main()
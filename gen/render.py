@@ -0,0 +1,267 @@
+"""
+Text rendering with a glyph raster cache.
+
+examples/python/example.py renders one string with Pillow, which loads the
+font, shapes the text and rasterizes every glyph again for each call. This
+module keeps the font loaded in a `Renderer` and caches the bitmap of each
+glyph in an LRU cache keyed by (glyph id, size, subpixel offset, antialias),
+so rendering a word is just shaping it and copying a few cached bitmaps into
+the image. The words of a worksheet repeat the same few hundred glyphs, so
+after the first words almost everything comes from the cache.
+
+* shaping: HarfBuzz (uharfbuzz) if installed, otherwise the Python shaper
+  (shaper.py with features.fea)
+* rasterization: FreeType (freetype-py), each glyph at the horizontal
+  subpixel offset of its position rounded to 1/`subpixel` pixel
+
+It can also run as a local HTTP service (`--serve`), which keeps the
+renderer with its cache between the requests:
+
+    GET /render?text=Psát&size=50&antialias=1   -> PNG image
+
+Usage:
+
+    python render.py [--size 50] [--mono] [-o out.png] text
+    python render.py --serve [--port 8000]
+"""
+
+import argparse
+import os
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from io import BytesIO
+from urllib.parse import parse_qs, urlparse
+
+import freetype
+import numpy as np
+from fontTools.ttLib import TTFont
+from PIL import Image
+
+from cache import LRUCache
+from shaper import Shaper, features_fea
+
+default_otf = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+        "../Slabikar.otf")
+
+def have_harfbuzz():
+    try:
+        import uharfbuzz
+    except ImportError:
+        return False
+    return True
+
+class Renderer:
+
+    def __init__(self, font: str = default_otf, cache_size: int = 4096,
+            subpixel: int = 4, harfbuzz: bool = None, hinting: bool = True):
+        """
+        font ... the OTF file
+        cache_size ... the maximum number of cached glyph bitmaps
+        subpixel ... number of horizontal subpixel positions of the glyphs
+        harfbuzz ... shape with HarfBuzz (default: if installed)
+        hinting ... apply the font's hints (the hinted bitmaps depend on the
+            hints of the build and on the FreeType version)
+        """
+        data = open(font, "rb").read()
+        tt = TTFont(BytesIO(data))
+        self.upem = tt["head"].unitsPerEm
+        self.glyph_order = tt.getGlyphOrder()
+        self.gids = {name: gid for gid, name in enumerate(self.glyph_order)}
+        self.advances = [tt["hmtx"][name][0] for name in self.glyph_order]
+        cmap = tt.getBestCmap()
+        if harfbuzz is None:
+            harfbuzz = have_harfbuzz()
+        if harfbuzz:
+            import uharfbuzz as hb
+            self.hb = hb
+            self.hb_font = hb.Font(hb.Face(data))
+        else:
+            self.hb = None
+            self.shaper = Shaper.from_file(features_fea,
+                    {chr(u): name for u, name in cmap.items()})
+        self.face = freetype.Face(BytesIO(data))
+        self.subpixel = subpixel
+        self.load_flags = freetype.FT_LOAD_RENDER if hinting else \
+                freetype.FT_LOAD_RENDER | freetype.FT_LOAD_NO_HINTING
+        self.cache = LRUCache(cache_size)
+
+    def shape(self, text: str):
+        """
+        Returns the list of (glyph id, x, y) positions of the glyphs in font
+        units, and the total advance.
+        """
+        r = []
+        x = 0
+        if self.hb is not None:
+            buf = self.hb.Buffer()
+            buf.add_str(text)
+            buf.guess_segment_properties()
+            self.hb.shape(self.hb_font, buf)
+            for info, pos in zip(buf.glyph_infos, buf.glyph_positions or []):
+                r.append((info.codepoint, x + pos.x_offset, pos.y_offset))
+                x += pos.x_advance
+        else:
+            for g in self.shaper.shape(text):
+                gid = self.gids.get(g.name, 0)
+                r.append((gid, x + g.x_placement, g.y_placement))
+                x += self.advances[gid] + g.x_advance
+        return r, x
+
+    def glyph(self, gid: int, size: int, offset: int, antialias: bool):
+        """
+        Returns (coverage, left, top) of the glyph rendered at `size` pixels
+        per em, shifted right by `offset`/`subpixel` pixel. The coverage is a
+        uint8 array, `left` and `top` are the position of its top left corner
+        relative to the origin of the glyph (y up).
+        """
+        key = (gid, size, offset, antialias)
+        r = self.cache.get(key)
+        if r is not None:
+            return r
+        face = self.face
+        face.set_pixel_sizes(0, size)
+        delta = freetype.Vector(offset * 64 // self.subpixel, 0)
+        face.set_transform(freetype.Matrix(0x10000, 0, 0, 0x10000), delta)
+        if antialias:
+            face.load_glyph(gid, self.load_flags)
+        else:
+            face.load_glyph(gid, self.load_flags
+                    | freetype.FT_LOAD_TARGET_MONO)
+        slot = face.glyph
+        bitmap = slot.bitmap
+        rows, width, pitch = bitmap.rows, bitmap.width, bitmap.pitch
+        buffer = np.array(bitmap.buffer, dtype=np.uint8)
+        if rows == 0 or width == 0:
+            coverage = np.zeros((0, 0), dtype=np.uint8)
+        elif antialias:
+            coverage = buffer.reshape(rows, pitch)[:, :width]
+        else:
+            coverage = np.unpackbits(buffer.reshape(rows, pitch),
+                    axis=1)[:, :width] * 255
+        r = (coverage, slot.bitmap_left, slot.bitmap_top)
+        self.cache.put(key, r)
+        return r
+
+    def place(self, text: str, size: int = 50, antialias: bool = True):
+        """
+        Returns the list of (coverage, left, top) of the glyph bitmaps of the
+        shaped text (the position of the top left corner relative to the
+        origin of the text, y up) and the total advance in pixels.
+        """
+        glyphs, advance = self.shape(text)
+        s = size / self.upem
+        placed = []
+        for gid, x, y in glyphs:
+            px = x * s
+            ix = int(np.floor(px))
+            offset = int(round((px - ix) * self.subpixel))
+            if offset == self.subpixel:
+                ix += 1
+                offset = 0
+            coverage, left, top = self.glyph(gid, size, offset, antialias)
+            if coverage.size == 0:
+                continue
+            placed.append((coverage, ix + left, int(round(y * s)) + top))
+        return placed, advance * s
+
+    def render_array(self, text: str, size: int = 50,
+            antialias: bool = True) -> np.ndarray:
+        """
+        Renders the text, returns the coverage (uint8, 255 is black) of the
+        image with a margin around the ink.
+        """
+        placed, advance = self.place(text, size, antialias)
+        # The image spans the ink and the advance, from the ascender to the
+        # descender
+        margin = size // 10 + 1
+        x0 = min([0] + [x for _, x, _ in placed]) - margin
+        x1 = max([int(np.ceil(advance))]
+                + [x + c.shape[1] for c, x, _ in placed]) + margin
+        y_top = max([size] + [top for _, _, top in placed]) + margin
+        y_bottom = min([-size // 2] + [top - c.shape[0]
+            for c, _, top in placed]) - margin
+        image = np.zeros((y_top - y_bottom, x1 - x0), dtype=np.uint8)
+        draw(image, placed, -x0, y_top)
+        return image
+
+    def render(self, text: str, size: int = 50,
+            antialias: bool = True) -> Image.Image:
+        """
+        Renders the text as black on white.
+        """
+        image = Image.fromarray(255 - self.render_array(text, size, antialias))
+        return image if antialias else image.convert("1")
+
+    def render_batch(self, texts, size: int = 50,
+            antialias: bool = True) -> list[Image.Image]:
+        return [self.render(text, size, antialias) for text in texts]
+
+def draw(image: np.ndarray, placed, x: int, y: int):
+    """
+    Draws the placed glyphs (see `Renderer.place`) into the coverage image
+    with the origin of the text at the pixel (x, y).
+    """
+    for coverage, left, top in placed:
+        h, w = coverage.shape
+        r = y - top
+        c = x + left
+        # The connections overlap the neighboring glyphs
+        np.maximum(image[r:r+h, c:c+w], coverage, out=image[r:r+h, c:c+w])
+
+def serve(renderer: Renderer, port: int):
+    class Handler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path != "/render":
+                self.send_error(404)
+                return
+            query = parse_qs(url.query)
+            try:
+                text = query["text"][0]
+                size = int(query.get("size", ["50"])[0])
+                antialias = query.get("antialias", ["1"])[0] != "0"
+                if not 1 <= size <= 1000:
+                    raise ValueError("size out of range")
+            except (KeyError, ValueError) as e:
+                self.send_error(400, str(e))
+                return
+            f = BytesIO()
+            renderer.render(text, size, antialias).save(f, "PNG")
+            data = f.getvalue()
+            self.send_response(200)
+            self.send_header("Content-Type", "image/png")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    server = HTTPServer(("127.0.0.1", port), Handler)
+    print(f"Serving on http://127.0.0.1:{port}/render?text=...")
+    server.serve_forever()
+
+def main():
+    parser = argparse.ArgumentParser(description="Render text with the font")
+    parser.add_argument("text", nargs="?", help="the text to render")
+    parser.add_argument("--font", default=default_otf,
+            help="the font (default: Slabikar.otf)")
+    parser.add_argument("--size", type=int, default=50,
+            help="font size in pixels per em (default: 50)")
+    parser.add_argument("--mono", action="store_true",
+            help="render without antialiasing")
+    parser.add_argument("-o", "--output", default="text.png",
+            help="the output image (default: text.png)")
+    parser.add_argument("--serve", action="store_true",
+            help="run the HTTP rendering service")
+    parser.add_argument("--port", type=int, default=8000,
+            help="port of the service (default: 8000)")
+    args = parser.parse_args()
+
+    renderer = Renderer(args.font)
+    if args.serve:
+        serve(renderer, args.port)
+    elif args.text is None:
+        parser.error("the text is required (or use --serve)")
+    else:
+        renderer.render(args.text, args.size, not args.mono).save(args.output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,550 @@
+"""
+Pure Python text shaper for the Slabikář font.
+
+It parses the subset of the OpenType feature file syntax used in
+font.ufo/features.fea and applies the substitution (GSUB) and positioning
+(GPOS) rules to a glyph sequence, so that the text can be shaped with the
+font's connection logic without HarfBuzz.
+
+The supported syntax:
+
+* `languagesystem` statements (ignored)
+* glyph classes: `@NAME = [a b @OTHER c-f];`
+* `lookup NAME { ... } NAME;` and `feature tag { ... } tag;` blocks
+* rules: `substitute`/`sub`, `position`/`pos` (a single value record) and
+  their `ignore` variants, with backtrack, marked (') input and lookahead
+  glyph sequences and chained `lookup NAME` references after marked glyphs
+
+The rules are applied as in the OpenType specification: for each feature, the
+glyph sequence is processed from left to right. At each position the rules
+are tried in order and the first matching rule is applied (an `ignore` rule
+applies no change), then the processing continues after the matched input.
+The chained lookups are applied at the position of the marked glyph they
+follow; each tries its own rules at that position only.
+
+For speed, the glyph classes are compiled into bitsets (Python integers
+indexed by the glyph id) and the rules of each lookup are indexed by the
+glyph id of their first input glyph. So at each position only the rules that
+can possibly match are tried.
+"""
+
+import os
+import re
+import unicodedata
+from dataclasses import dataclass
+
+features_fea = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+        "../font.ufo/features.fea")
+
+# Glyph names that cannot be derived from the Unicode character names (see
+# `glyph_name`). Also includes the aliases from the `unicode` dictionary in
+# svg.py.
+special_names = {
+    " ": "space", "\u00a0": "space",
+    "0": "zero", "1": "one", "2": "two", "3": "three", "4": "four",
+    "5": "five", "6": "six", "7": "seven", "8": "eight", "9": "nine",
+    ".": "period", ",": "comma", ":": "colon", ";": "semicolon",
+    "!": "exclam", "?": "question", "'": "quotesingle", '"': "quotedbl",
+    "\u2018": "quoteleft", "\u2019": "quoteright", "\u201c": "quotedblleft",
+    "\u201d": "quotedblright", "\u201e": "quotedblbase",
+    "-": "hyphen", "\u00ad": "hyphen", "\u2010": "hyphen", "\u2011": "hyphen",
+    "_": "underscore",
+    "(": "parenleft", ")": "parenright", "[": "bracketleft",
+    "]": "bracketright", "{": "braceleft", "}": "braceright",
+    "/": "slash", "|": "bar", "\\": "backslash", "*": "asterisk", "@": "at",
+    "#": "numbersign", "$": "dollar", "%": "percent", "\u2030": "perthousand",
+    "&": "ampersand", "+": "plus", "\u2212": "minus", "\u00d7": "multiply",
+    "=": "equal", "<": "less", ">": "greater", "^": "asciicircum",
+    "~": "asciitilde", "\u223c": "asciitilde",
+}
+
+accents = {
+    "ACUTE": "acute",
+    "CARON": "caron",
+    "DIAERESIS": "dieresis",
+    "RING ABOVE": "ring",
+    "CIRCUMFLEX": "circumflex",
+}
+
+def glyph_name(c: str):
+    """
+    Returns the (AGL) glyph name of the character `c`, or None.
+    """
+    if c in special_names:
+        return special_names[c]
+    if "a" <= c <= "z" or "A" <= c <= "Z":
+        return c
+    m = re.fullmatch(r"LATIN (SMALL|CAPITAL) LETTER ([A-Z]) WITH (.*)",
+            unicodedata.name(c, ""))
+    if m and m.group(3) in accents:
+        letter = m.group(2)
+        if m.group(1) == "SMALL":
+            letter = letter.lower()
+        return letter + accents[m.group(3)]
+    return None
+
+# Parser
+
+class ParseError(Exception):
+    pass
+
+token_re = re.compile(r"""
+    (?P<comment>\#[^\n]*)
+  | (?P<space>\s+)
+  | (?P<number>-?\d+)
+  | (?P<class>@[A-Za-z0-9_.]+)
+  | (?P<name>[A-Za-z_.][A-Za-z0-9_.\-]*)
+  | (?P<punct>[\[\]'{};<>=])
+""", re.VERBOSE)
+
+def tokenize(source: str):
+    tokens = []
+    pos = 0
+    while pos < len(source):
+        m = token_re.match(source, pos)
+        if m is None:
+            line = source.count("\n", 0, pos) + 1
+            raise ParseError(f"Unexpected character {source[pos]!r} on line {line}")
+        pos = m.end()
+        if m.lastgroup in ["comment", "space"]:
+            continue
+        tokens.append(m.group())
+    return tokens
+
+@dataclass
+class Item:
+    # The glyph names matching this position in the rule
+    glyphs: list[str]
+    marked: bool
+    lookups: list[str]
+
+@dataclass
+class RuleAST:
+    ignore: bool
+    kind: str                # "sub" or "pos"
+    items: list[Item]
+    output: list[str]        # for "sub" rules without chained lookups
+    value: tuple             # for "pos" rules: (x, y, x_advance, y_advance)
+
+@dataclass
+class FeaAST:
+    classes: dict            # name -> list of glyph names
+    lookups: dict            # name -> list of RuleAST
+    features: list           # list of (tag, list of RuleAST)
+
+class Parser:
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.i = 0
+        self.classes = {}
+
+    def peek(self):
+        if self.i < len(self.tokens):
+            return self.tokens[self.i]
+        return None
+
+    def next(self):
+        t = self.peek()
+        if t is None:
+            raise ParseError("Unexpected end of file")
+        self.i += 1
+        return t
+
+    def expect(self, t):
+        s = self.next()
+        if s != t:
+            raise ParseError(f"Expected {t!r}, got {s!r}")
+
+    def parse(self) -> FeaAST:
+        lookups = {}
+        features = []
+        while self.peek() is not None:
+            t = self.next()
+            if t == "languagesystem":
+                while self.next() != ";":
+                    pass
+            elif t.startswith("@"):
+                self.expect("=")
+                self.classes[t] = self.parse_glyph_class()
+                self.expect(";")
+            elif t in ["lookup", "feature"]:
+                name = self.next()
+                self.expect("{")
+                rules = self.parse_rules()
+                self.expect("}")
+                self.expect(name)
+                self.expect(";")
+                if t == "lookup":
+                    lookups[name] = rules
+                else:
+                    features.append((name, rules))
+            else:
+                raise ParseError(f"Unsupported statement {t!r}")
+        return FeaAST(self.classes, lookups, features)
+
+    def parse_glyph_class(self):
+        self.expect("[")
+        glyphs = []
+        while (t := self.next()) != "]":
+            if t.startswith("@"):
+                glyphs.extend(self.classes[t])
+            elif "-" in t:
+                first, last = t.split("-")
+                if len(first) != 1 or len(last) != 1:
+                    raise ParseError(f"Unsupported glyph range {t!r}")
+                glyphs.extend(chr(c) for c in range(ord(first), ord(last)+1))
+            else:
+                glyphs.append(t)
+        return glyphs
+
+    def parse_glyphs(self):
+        t = self.peek()
+        if t == "[":
+            return self.parse_glyph_class()
+        self.next()
+        if t.startswith("@"):
+            return self.classes[t]
+        return [t]
+
+    def parse_rules(self):
+        rules = []
+        while self.peek() != "}":
+            t = self.next()
+            ignore = t == "ignore"
+            if ignore:
+                t = self.next()
+            if t in ["substitute", "sub"]:
+                kind = "sub"
+            elif t in ["position", "pos"]:
+                kind = "pos"
+            else:
+                raise ParseError(f"Unsupported rule {t!r}")
+            items = []
+            output = []
+            value = None
+            while self.peek() not in [";", "by", "<"]:
+                if kind == "pos" and self.peek().lstrip("-").isdigit():
+                    break
+                glyphs = self.parse_glyphs()
+                marked = self.peek() == "'"
+                if marked:
+                    self.next()
+                lookups = []
+                while self.peek() == "lookup":
+                    self.next()
+                    lookups.append(self.next())
+                items.append(Item(glyphs, marked, lookups))
+            if self.peek() == "by":
+                self.next()
+                while self.peek() != ";":
+                    output.extend(self.parse_glyphs())
+            elif kind == "pos" and not ignore:
+                value = self.parse_value()
+            self.expect(";")
+            rules.append(RuleAST(ignore, kind, items, output, value))
+        return rules
+
+    def parse_value(self):
+        if self.peek() == "<":
+            self.next()
+            value = tuple(int(self.next()) for _ in range(4))
+            self.expect(">")
+            return value
+        # A single number is the advance adjustment
+        return (0, 0, int(self.next()), 0)
+
+def parse_fea(source: str) -> FeaAST:
+    return Parser(tokenize(source)).parse()
+
+# Compiled representation
+
+@dataclass
+class Rule:
+    ignore: bool
+    backtrack: list[int]     # bitsets, the closest glyph first
+    input: list[int]         # bitsets
+    lookahead: list[int]     # bitsets
+    output: list[int]        # glyph ids replacing the input
+    # (input index, lookup name) of the chained lookups, in order
+    lookups: list[tuple[int, str]]
+    value: tuple
+
+class Lookup:
+
+    def __init__(self, name, kind, rules):
+        self.name = name
+        self.kind = kind     # "sub" or "pos"
+        self.rules = rules
+        # glyph id -> the rules (in order) whose first input matches it
+        self.index = {}
+        for rule in rules:
+            for gid in bits(rule.input[0]):
+                self.index.setdefault(gid, []).append(rule)
+
+def bits(mask):
+    """
+    Returns the glyph ids in the bitset `mask`.
+    """
+    gid = 0
+    while mask:
+        if mask & 1:
+            yield gid
+        mask >>= 1
+        gid += 1
+
+@dataclass
+class ShapedGlyph:
+    name: str
+    # The positioning adjustments (from GPOS), in font units
+    x_placement: int = 0
+    y_placement: int = 0
+    x_advance: int = 0
+    y_advance: int = 0
+
+class Shaper:
+
+    def __init__(self, fea: str, cmap: dict = None):
+        """
+        fea ... the feature file source
+        cmap ... character -> glyph name; by default derived from the
+            character names (see `glyph_name`)
+        """
+        ast = parse_fea(fea)
+        self.glyph_ids = {}
+        self.glyph_names = []
+        # Named glyph classes: name -> bitset
+        self.classes = {}
+        for name, glyphs in ast.classes.items():
+            self.classes[name] = self.mask(glyphs)
+        self.cmap = cmap
+        self.lookups = {}
+        for name, rules in ast.lookups.items():
+            self.lookups[name] = self.compile_lookup(name, rules)
+        self.features = []
+        for tag, rules in ast.features:
+            lookup = self.compile_lookup(tag, rules)
+            if lookup is not None:
+                self.features.append((tag, lookup))
+
+    @classmethod
+    def from_file(cls, filename: str = features_fea, cmap: dict = None):
+        return cls(open(filename).read(), cmap)
+
+    # Serialization of the compiled tables
+    #
+    # The bitsets are stored as hexadecimal strings in a table and referenced
+    # by their index. Each lookup contains its rules and the glyph id ->
+    # rule indices dispatch table.
+
+    def to_dict(self) -> dict:
+        masks = []
+        mask_index = {}
+        def m(mask):
+            if mask not in mask_index:
+                mask_index[mask] = len(masks)
+                masks.append(format(mask, "x"))
+            return mask_index[mask]
+        def lookup_dict(lookup):
+            rule_index = {id(rule): n for n, rule in enumerate(lookup.rules)}
+            return {
+                "name": lookup.name,
+                "kind": lookup.kind,
+                "rules": [[
+                    rule.ignore,
+                    [m(x) for x in rule.backtrack],
+                    [m(x) for x in rule.input],
+                    [m(x) for x in rule.lookahead],
+                    rule.output,
+                    rule.lookups,
+                    rule.value,
+                ] for rule in lookup.rules],
+                "index": {str(gid): [rule_index[id(rule)] for rule in rules]
+                    for gid, rules in sorted(lookup.index.items())},
+            }
+        return {
+            "version": 1,
+            "glyphs": self.glyph_names,
+            "classes": {name: m(mask) for name, mask in self.classes.items()},
+            "lookups": [lookup_dict(l) for l in self.lookups.values()],
+            "features": [[tag, lookup_dict(l)] for tag, l in self.features],
+            "masks": masks,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict, cmap: dict = None):
+        if data["version"] != 1:
+            raise ValueError("Unsupported version of the compiled tables")
+        self = cls.__new__(cls)
+        self.glyph_names = data["glyphs"]
+        self.glyph_ids = {name: gid for gid, name in enumerate(self.glyph_names)}
+        masks = [int(x, 16) for x in data["masks"]]
+        self.classes = {name: masks[n] for name, n in data["classes"].items()}
+        self.cmap = cmap
+        def lookup(d):
+            rules = [Rule(
+                ignore=ignore,
+                backtrack=[masks[n] for n in backtrack],
+                input=[masks[n] for n in input],
+                lookahead=[masks[n] for n in lookahead],
+                output=output,
+                lookups=[tuple(x) for x in lookups],
+                value=tuple(value) if value is not None else None,
+            ) for ignore, backtrack, input, lookahead, output, lookups, value
+                in d["rules"]]
+            l = Lookup.__new__(Lookup)
+            l.name = d["name"]
+            l.kind = d["kind"]
+            l.rules = rules
+            l.index = {int(gid): [rules[n] for n in ns]
+                    for gid, ns in d["index"].items()}
+            return l
+        self.lookups = {d["name"]: lookup(d) for d in data["lookups"]}
+        self.features = [(tag, lookup(d)) for tag, d in data["features"]]
+        return self
+
+    def gid(self, name: str) -> int:
+        """
+        Returns the glyph id of the glyph `name` (assigned on first use).
+        """
+        gid = self.glyph_ids.get(name)
+        if gid is None:
+            gid = len(self.glyph_names)
+            self.glyph_ids[name] = gid
+            self.glyph_names.append(name)
+        return gid
+
+    def mask(self, glyphs) -> int:
+        m = 0
+        for g in glyphs:
+            m |= 1 << self.gid(g)
+        return m
+
+    def compile_lookup(self, name, rules):
+        if len(rules) == 0:
+            return None
+        kinds = set(rule.kind for rule in rules)
+        if len(kinds) != 1:
+            raise ParseError(f"Lookup {name} mixes substitution and positioning")
+        compiled = []
+        for r in rules:
+            items = r.items
+            marked = [n for n, item in enumerate(items) if item.marked]
+            if len(marked) > 0:
+                first, last = marked[0], marked[-1] + 1
+            else:
+                first, last = 0, len(items)
+            lookups = []
+            for n, item in enumerate(items[first:last]):
+                for lookup_name in item.lookups:
+                    if lookup_name not in self.lookups:
+                        raise ParseError(f"Unknown lookup {lookup_name}")
+                    lookups.append((n, lookup_name))
+            compiled.append(Rule(
+                ignore=r.ignore,
+                backtrack=[self.mask(item.glyphs)
+                    for item in reversed(items[:first])],
+                input=[self.mask(item.glyphs) for item in items[first:last]],
+                lookahead=[self.mask(item.glyphs) for item in items[last:]],
+                output=[self.gid(g) for g in r.output],
+                lookups=lookups,
+                value=r.value,
+            ))
+        return Lookup(name, kinds.pop(), compiled)
+
+    # Shaping
+
+    def match(self, rule, buf, pos):
+        if pos < len(rule.backtrack) \
+                or pos + len(rule.input) + len(rule.lookahead) > len(buf):
+            return False
+        for n, m in enumerate(rule.backtrack):
+            if not m >> buf[pos-1-n] & 1:
+                return False
+        for n, m in enumerate(rule.input):
+            if not m >> buf[pos+n] & 1:
+                return False
+        end = pos + len(rule.input)
+        for n, m in enumerate(rule.lookahead):
+            if not m >> buf[end+n] & 1:
+                return False
+        return True
+
+    def apply_lookup(self, lookup, buf, pos, values):
+        """
+        Applies the first matching rule of `lookup` at position `pos` of the
+        glyph id list `buf` (modified in place). Returns the position after
+        the matched input or None if no rule matched.
+        """
+        for rule in lookup.index.get(buf[pos], ()):
+            if not self.match(rule, buf, pos):
+                continue
+            end = pos + len(rule.input)
+            if rule.ignore:
+                return end
+            if lookup.kind == "pos":
+                if len(rule.lookups) == 0:
+                    v = values[pos]
+                    for n in range(4):
+                        v[n] += rule.value[n]
+            elif len(rule.lookups) == 0:
+                buf[pos:end] = rule.output
+                values[pos:end] = [[0]*4 for _ in rule.output]
+                return pos + len(rule.output)
+            positions = list(range(pos, end))
+            for n, lookup_name in rule.lookups:
+                p = positions[n]
+                length = len(buf)
+                self.apply_lookup(self.lookups[lookup_name], buf, p, values)
+                delta = len(buf) - length
+                for k in range(n+1, len(positions)):
+                    positions[k] += delta
+                end += delta
+            return end
+        return None
+
+    def apply_feature(self, lookup, buf, values):
+        pos = 0
+        while pos < len(buf):
+            end = self.apply_lookup(lookup, buf, pos, values)
+            if end is None or end <= pos:
+                pos += 1
+            else:
+                pos = end
+
+    def glyphs(self, text: str) -> list[str]:
+        """
+        Maps the characters of `text` to glyph names (no shaping).
+        """
+        r = []
+        for c in text:
+            name = self.cmap.get(c) if self.cmap is not None else glyph_name(c)
+            r.append(name if name is not None else ".notdef")
+        return r
+
+    def shape_glyphs(self, glyphs: list[str],
+            features: list[str] = None) -> list[ShapedGlyph]:
+        """
+        Shapes the glyph sequence. All features are applied by default.
+        """
+        buf = [self.gid(g) for g in glyphs]
+        values = [[0]*4 for _ in buf]
+        # All substitutions are applied before the positioning
+        for kind in ["sub", "pos"]:
+            for tag, lookup in self.features:
+                if lookup.kind == kind and (features is None or tag in features):
+                    self.apply_feature(lookup, buf, values)
+        return [ShapedGlyph(self.glyph_names[gid], *v)
+                for gid, v in zip(buf, values)]
+
+    def shape(self, text: str, features: list[str] = None) -> list[ShapedGlyph]:
+        return self.shape_glyphs(self.glyphs(text), features)
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) != 2:
+        print("shaper text")
+        sys.exit(1)
+    shaper = Shaper.from_file()
+    for g in shaper.shape(sys.argv[1]):
+        print(g.name, g.x_placement, g.y_placement, g.x_advance, g.y_advance)
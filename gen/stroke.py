@@ -0,0 +1,378 @@
+"""
+Native stroke-to-outline conversion using a circular pen.
+
+The glyphs are defined by their centerlines (the Metafont paths drawn with
+`pencircle`). This module converts such centerline contours into filled
+outline contours by offsetting each segment by the pen radius on both sides
+and joining the two offset curves with round caps at the ends. Corners get
+round joins on the outer side, the inner side goes through the node itself.
+
+The offset of a cubic Bezier curve is not a cubic, so each segment is
+approximated by one cubic: the offset endpoints are moved along the normal,
+the handles keep the directions of the segment's tangents and their lengths
+are chosen so that the cubic goes through the exact offset of the middle of
+the segment (if that is not possible, the handles are scaled according to the
+curvature at the endpoints, Tiller-Hanson style). The distance of the cubic
+from the segment is checked at a few points and the segment is subdivided (de
+Casteljau) only if it is not within the tolerance.
+
+The resulting contours can overlap each other (and themselves, e.g. in loops),
+they are correct with the non-zero winding rule. The overlaps are removed
+later by `checkoutlinesufo -e` in the build.
+"""
+
+from math import atan2, cos, sin, tan, pi, sqrt, ceil
+
+from glif import Glif, Point, verify
+
+# Version of the stroker, increase it whenever the generated outlines change
+# (it is part of the glyph cache key)
+version = 2
+
+# Maximum allowed distance (in font units) between the approximate and exact
+# offset curve (the output coordinates are rounded to integers by makeotf)
+tolerance = 0.5
+max_depth = 8
+
+# Segments shorter than this are dropped
+eps = 1e-9
+
+# Vectors
+
+def sub(a, b):
+    return (a[0]-b[0], a[1]-b[1])
+
+def add(a, b):
+    return (a[0]+b[0], a[1]+b[1])
+
+def mul(a, s):
+    return (a[0]*s, a[1]*s)
+
+def cross(a, b):
+    return a[0]*b[1] - a[1]*b[0]
+
+def dot(a, b):
+    return a[0]*b[0] + a[1]*b[1]
+
+def norm(a):
+    return sqrt(a[0]**2 + a[1]**2)
+
+def unit(a):
+    n = norm(a)
+    return (a[0]/n, a[1]/n)
+
+def left_normal(t):
+    return (-t[1], t[0])
+
+# Segments
+#
+# A segment is a tuple of 2 (line) or 4 (cubic Bezier curve) points.
+
+def contour_segments(contour: list[Point]):
+    """
+    Splits the contour into a list of segments, drops degenerate segments.
+    Returns (segments, closed).
+    """
+    p0 = contour[0]
+    points = contour
+    closed = p0.type != "move"
+    if closed:
+        points = contour + [p0]
+    segments = []
+    last = (p0.x, p0.y)
+    offcurve = []
+    for p in points[1:]:
+        z = (p.x, p.y)
+        if p.type == "offcurve":
+            offcurve.append(z)
+            continue
+        if p.type == "line":
+            seg = (last, z)
+        else:
+            assert p.type == "curve"
+            assert len(offcurve) == 2
+            seg = (last, offcurve[0], offcurve[1], z)
+        offcurve = []
+        if max(norm(sub(q, last)) for q in seg[1:]) > eps:
+            segments.append(seg)
+        last = z
+    if not closed and len(segments) > 0:
+        # Paths like the dot or krouzek end where they start
+        closed = norm(sub(segments[0][0], segments[-1][-1])) < 1e-6
+    return segments, closed
+
+def reverse_segment(seg):
+    return tuple(reversed(seg))
+
+def start_tangent(seg):
+    for q in seg[1:]:
+        d = sub(q, seg[0])
+        if norm(d) > eps:
+            return unit(d)
+
+def end_tangent(seg):
+    return mul(start_tangent(reverse_segment(seg)), -1)
+
+def start_curvature(seg):
+    """
+    Signed (positive for left turn) curvature at the start of the segment.
+    """
+    if len(seg) == 2:
+        return 0.0
+    d1 = sub(seg[1], seg[0])
+    l = norm(d1)
+    if l < eps:
+        return 0.0
+    return 2/3 * cross(d1, sub(seg[2], seg[1])) / l**3
+
+def end_curvature(seg):
+    return -start_curvature(reverse_segment(seg))
+
+def evaluate(seg, t):
+    if len(seg) == 2:
+        return add(mul(seg[0], 1-t), mul(seg[1], t))
+    p0, p1, p2, p3 = seg
+    s = 1-t
+    return (
+        s**3*p0[0] + 3*s**2*t*p1[0] + 3*s*t**2*p2[0] + t**3*p3[0],
+        s**3*p0[1] + 3*s**2*t*p1[1] + 3*s*t**2*p2[1] + t**3*p3[1],
+    )
+
+def derivative(seg, t):
+    p0, p1, p2, p3 = seg
+    s = 1-t
+    return (
+        3*s**2*(p1[0]-p0[0]) + 6*s*t*(p2[0]-p1[0]) + 3*t**2*(p3[0]-p2[0]),
+        3*s**2*(p1[1]-p0[1]) + 6*s*t*(p2[1]-p1[1]) + 3*t**2*(p3[1]-p2[1]),
+    )
+
+def second_derivative(seg, t):
+    p0, p1, p2, p3 = seg
+    s = 1-t
+    return (
+        6*s*(p2[0]-2*p1[0]+p0[0]) + 6*t*(p3[0]-2*p2[0]+p1[0]),
+        6*s*(p2[1]-2*p1[1]+p0[1]) + 6*t*(p3[1]-2*p2[1]+p1[1]),
+    )
+
+def split(seg, t=0.5):
+    p0, p1, p2, p3 = seg
+    lerp = lambda a, b: add(mul(a, 1-t), mul(b, t))
+    p01 = lerp(p0, p1); p12 = lerp(p1, p2); p23 = lerp(p2, p3)
+    p012 = lerp(p01, p12); p123 = lerp(p12, p23)
+    m = lerp(p012, p123)
+    return (p0, p01, p012, m), (m, p123, p23, p3)
+
+# Offsetting
+
+def closest_distance(seg, p, t):
+    """
+    Distance of the point `p` from the curve, the closest point is searched
+    (by Newton's method) from the parameter `t`.
+    """
+    for _ in range(8):
+        d = sub(evaluate(seg, t), p)
+        d1 = derivative(seg, t)
+        d2 = second_derivative(seg, t)
+        f = dot(d, d1)
+        df = dot(d1, d1) + dot(d, d2)
+        if abs(df) < eps:
+            break
+        t = min(max(t - f/df, 0), 1)
+    return norm(sub(evaluate(seg, t), p))
+
+def fit_offset(seg, r, q0, q3, t0, t3):
+    """
+    Returns the lengths of the handles of the cubic from `q0` (tangent `t0`)
+    to `q3` (tangent `t3`) that goes through the exact offset of the middle
+    of the segment, or None if there is no such cubic with positive handles.
+    """
+    d = derivative(seg, 0.5)
+    det = cross(t3, t0)
+    if norm(d) < eps or abs(det) < 1e-3:
+        return None
+    m = add(evaluate(seg, 0.5), mul(left_normal(unit(d)), r))
+    # B(1/2) = (q0 + 3 q1 + 3 q2 + q3)/8 with q1 = q0 + a t0, q2 = q3 - b t3
+    v = mul(sub(m, mul(add(q0, q3), 0.5)), 8/3)
+    a = cross(t3, v) / det
+    b = cross(t0, v) / det
+    if a <= 0 or b <= 0:
+        return None
+    return a, b
+
+def offset_segment(seg, r, depth=0):
+    """
+    Offsets the segment by `r` to the left. Returns a list of segments.
+    """
+    t0 = start_tangent(seg)
+    t3 = end_tangent(seg)
+    q0 = add(seg[0], mul(left_normal(t0), r))
+    q3 = add(seg[-1], mul(left_normal(t3), r))
+    if len(seg) == 2:
+        return [(q0, q3)]
+    handles = fit_offset(seg, r, q0, q3, t0, t3)
+    if handles is not None:
+        a, b = handles
+        q1 = add(q0, mul(t0, a))
+        q2 = sub(q3, mul(t3, b))
+    else:
+        # The speed of the offset curve is (1 - r*curvature) times the speed
+        # of the original curve
+        k0 = max(1 - r*start_curvature(seg), 0)
+        k3 = max(1 - r*end_curvature(seg), 0)
+        q1 = add(q0, mul(sub(seg[1], seg[0]), k0))
+        q2 = add(q3, mul(sub(seg[2], seg[3]), k3))
+    off = (q0, q1, q2, q3)
+    if depth < max_depth and any(
+            abs(closest_distance(seg, evaluate(off, t), t) - r) > tolerance
+            for t in (0.25, 0.5, 0.75)):
+        a, b = split(seg)
+        return offset_segment(a, r, depth+1) + offset_segment(b, r, depth+1)
+    return [off]
+
+def arc(center, r, a0, sweep):
+    """
+    Circular arc around `center` starting at angle `a0` (radians), the sweep
+    is positive for counter-clockwise arc. Returns a list of cubic segments.
+    """
+    n = max(ceil(abs(sweep) / (pi/2) - 1e-9), 1)
+    da = sweep / n
+    k = 4/3 * tan(da/4)
+    segments = []
+    for i in range(n):
+        a = a0 + i*da
+        b = a + da
+        p0 = add(center, (r*cos(a), r*sin(a)))
+        p3 = add(center, (r*cos(b), r*sin(b)))
+        p1 = add(p0, (-k*r*sin(a), k*r*cos(a)))
+        p2 = add(p3, (k*r*sin(b), -k*r*cos(b)))
+        segments.append((p0, p1, p2, p3))
+    return segments
+
+def angle(v):
+    return atan2(v[1], v[0])
+
+def join(center, t_in, t_out, r):
+    """
+    Joins the left offsets of two segments meeting at `center`.
+    """
+    c = cross(t_in, t_out)
+    if abs(c) < 1e-6 and dot(t_in, t_out) > 0:
+        # Smooth node
+        return []
+    n_in = left_normal(t_in)
+    n_out = left_normal(t_out)
+    p_in = add(center, mul(n_in, r))
+    p_out = add(center, mul(n_out, r))
+    if c > 0:
+        # Left turn, the left side is the inner side
+        return [(p_in, center), (center, p_out)]
+    # Right turn, round join on the outer side
+    sweep = angle(t_out) - angle(t_in)
+    while sweep > 0:
+        sweep -= 2*pi
+    return arc(center, r, angle(n_in), sweep)
+
+def offset_path(segments, r, closed):
+    """
+    Offsets the whole path by `r` to the left, including the joins (and
+    the closing join if `closed`).
+    """
+    out = []
+    for i, seg in enumerate(segments):
+        if i > 0:
+            out.extend(join(seg[0], end_tangent(segments[i-1]),
+                    start_tangent(seg), r))
+        out.extend(offset_segment(seg, r))
+    if closed:
+        out.extend(join(segments[0][0], end_tangent(segments[-1]),
+                start_tangent(segments[0]), r))
+    return out
+
+def cap(center, t, r):
+    """
+    Round cap at the end of a path with the end tangent `t`.
+    """
+    return arc(center, r, angle(left_normal(t)), -pi)
+
+def stroke_segments(segments, closed, r):
+    """
+    Returns a list of closed outlines (each a list of segments).
+    """
+    backward = [reverse_segment(seg) for seg in reversed(segments)]
+    left = offset_path(segments, r, closed)
+    right = offset_path(backward, r, closed)
+    if closed:
+        return [left, right]
+    return [left + cap(segments[-1][-1], end_tangent(segments[-1]), r)
+            + right + cap(segments[0][0], end_tangent(backward[-1]), r)]
+
+def signed_area(outline):
+    """
+    Signed area of the outline (positive for counter-clockwise), the curves
+    are approximated by their control polygons.
+    """
+    a = 0
+    for seg in outline:
+        for p, q in zip(seg[:-1], seg[1:]):
+            a += cross(p, q)
+    return a/2
+
+def outline_to_contour(outline, ndigits=3):
+    """
+    Converts the closed outline (a list of segments) to the Glif contour.
+    The outline is reversed, so that the outer contours are
+    counter-clockwise as required by PostScript fonts.
+    """
+    outline = [reverse_segment(seg) for seg in reversed(outline)]
+    fmt = lambda z, type: Point(x=round(z[0], ndigits),
+            y=round(z[1], ndigits), type=type, smooth=False)
+    contour = []
+    for seg in outline:
+        if norm(sub(seg[-1], seg[0])) < eps and \
+                max(norm(sub(q, seg[0])) for q in seg[1:]) < eps:
+            continue
+        if len(seg) == 2:
+            contour.append(fmt(seg[1], "line"))
+        else:
+            contour.extend([
+                fmt(seg[1], "offcurve"),
+                fmt(seg[2], "offcurve"),
+                fmt(seg[3], "curve"),
+            ])
+    # The contour is closed: the end node of the last segment is the first
+    # point, the last segment's offcurve points stay at the end
+    return [contour[-1]] + contour[:-1]
+
+def stroke_contour(contour: list[Point], stroke_width) -> list[list[Point]]:
+    """
+    Strokes the centerline `contour` with a circular pen of diameter
+    `stroke_width`. Returns a list of closed outline contours.
+    """
+    r = stroke_width / 2
+    segments, closed = contour_segments(contour)
+    if len(segments) == 0:
+        # A single point: draw a dot
+        p = contour[0]
+        return [outline_to_contour(arc((p.x, p.y), r, 0, -2*pi))]
+    contours = []
+    for outline in stroke_segments(segments, closed, r):
+        # Drop outlines collapsed to a point, e.g. the inner side of a dot
+        if abs(signed_area(outline)) < tolerance:
+            continue
+        contours.append(outline_to_contour(outline))
+    return contours
+
+def stroke_glif(glif: Glif, stroke_width) -> Glif:
+    """
+    Converts the centerline glif (as produced by `create_glif`) into the
+    outline glif. The components are kept, their base glyphs are stroked on
+    their own.
+    """
+    contours = []
+    for contour in glif.contours:
+        contours.extend(stroke_contour(contour, stroke_width))
+    # The advance width is an integer in the font
+    g = Glif(glif.name, glif.unicode_hex, round(glif.w), contours,
+            glif.anchors, glif.components)
+    verify(g)
+    return g
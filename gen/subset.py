@@ -0,0 +1,188 @@
+"""
+Per-document subsets of Slabikar.otf.
+
+For a generated PDF or HTML page only the glyphs reachable from its text are
+needed. `FontSubsetter.subset(text)` returns the smallest font that shapes the
+text the same way as the full font:
+
+* the characters of the text are mapped to glyphs by the font's cmap
+* the GSUB closure is computed over the lookups of features.fea (using the
+  compiled rules of the Python shaper): a substitution rule can apply if each
+  of its backtrack, input and lookahead positions matches a glyph of the
+  set, then its output (or the output of the chained lookups) is added, until
+  nothing changes. So the connection glyphs (begin_straight, conn_sv,
+  onarrow, ...) are included exactly when the text can trigger them.
+* the font is subset to the closure (fontTools), keeping all the characters
+  of the font that map to the closure glyphs
+
+The subset only depends on the closure glyph set, so the subsets are cached
+by it (in memory and optionally on disk, see cache.py). The closure itself
+is cached by the set of characters, so repeated requests with the same
+characters are served without any work. The in-memory caches are LRU caches
+of a bounded number of entries, so a long-running service does not grow.
+
+Usage:
+
+    python subset.py [--flavor woff2] [-o out] [--cache-dir dir] text.txt
+"""
+
+import argparse
+import os
+from hashlib import sha256
+from io import BytesIO
+
+from fontTools import subset as ftsubset
+from fontTools.ttLib import TTFont
+
+from cache import Cache, LRUCache, hash_key
+from shaper import Shaper, bits, features_fea
+
+default_otf = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+        "../Slabikar.otf")
+
+def rule_possible(rule, mask: int) -> bool:
+    """
+    True if each position of the rule's context can match a glyph of `mask`.
+    """
+    return all(m & mask for m in rule.backtrack) \
+        and all(m & mask for m in rule.input) \
+        and all(m & mask for m in rule.lookahead)
+
+def lookup_closure(shaper: Shaper, lookup, mask: int) -> int:
+    """
+    Returns the glyphs that the substitution `lookup` can produce from the
+    glyphs `mask`.
+    """
+    r = 0
+    for rule in lookup.rules:
+        if rule.ignore or not rule_possible(rule, mask):
+            continue
+        if len(rule.lookups) == 0:
+            for gid in rule.output:
+                r |= 1 << gid
+        # The chained lookups see the glyphs produced by the previous ones
+        # at the same position (e.g. LETTER_BEGIN, then BCONN), so they are
+        # not restricted to the rule's input glyph
+        for _, name in rule.lookups:
+            r |= lookup_closure(shaper, shaper.lookups[name], mask)
+    return r
+
+def gsub_closure(shaper: Shaper, glyphs) -> frozenset:
+    """
+    Returns the glyph names reachable from `glyphs` by the substitutions.
+    """
+    mask = shaper.mask(glyphs)
+    lookups = [lookup for _, lookup in shaper.features if lookup.kind == "sub"]
+    while True:
+        new = mask
+        for lookup in lookups:
+            new |= lookup_closure(shaper, lookup, new)
+        if new == mask:
+            break
+        mask = new
+    return frozenset(shaper.glyph_names[gid] for gid in bits(mask))
+
+class FontSubsetter:
+
+    def __init__(self, font: str = default_otf, features: str = features_fea,
+            cache_dir: str = None, cache_size: int = 64,
+            memory_entries: int = 256):
+        """
+        font ... the OTF file
+        features ... the feature file of the font (for the GSUB closure)
+        cache_dir ... the directory of the on-disk cache (None: only the
+            in-memory cache is used)
+        cache_size ... the maximum size of the on-disk cache in MB
+        memory_entries ... the maximum number of closures and of subsets
+            kept in memory
+        """
+        self.font = font
+        data = open(font, "rb").read()
+        self.font_hash = sha256(data).hexdigest()
+        self.cmap = TTFont(BytesIO(data)).getBestCmap()
+        self.shaper = Shaper.from_file(features)
+        self.cache = Cache(cache_dir, cache_size * 1024**2) \
+                if cache_dir is not None else None
+        # frozenset of characters -> closure
+        self.closures = LRUCache(memory_entries)
+        # cache key -> subset font
+        self.subsets = LRUCache(memory_entries)
+
+    def closure(self, text: str) -> frozenset:
+        """
+        Returns the names of the glyphs needed to shape `text`.
+        """
+        chars = frozenset(text)
+        closure = self.closures.get(chars)
+        if closure is None:
+            glyphs = {".notdef"}
+            for c in chars:
+                if ord(c) in self.cmap:
+                    glyphs.add(self.cmap[ord(c)])
+            closure = gsub_closure(self.shaper, glyphs)
+            self.closures.put(chars, closure)
+        return closure
+
+    def subset(self, text: str, flavor: str = None) -> bytes:
+        """
+        Returns the subset font for `text` as OTF (`flavor` None), "woff" or
+        "woff2".
+        """
+        glyphs = self.closure(text)
+        key = hash_key(self.font_hash, sorted(glyphs), flavor)
+        data = self.subsets.get(key)
+        if data is not None:
+            return data
+        data = self.cache.get(key, binary=True) if self.cache else None
+        if data is None:
+            data = self.build(glyphs, flavor)
+            if self.cache:
+                self.cache.put(key, data)
+                self.cache.evict()
+        self.subsets.put(key, data)
+        return data
+
+    def build(self, glyphs, flavor: str = None) -> bytes:
+        options = ftsubset.Options()
+        options.layout_features = ["*"]
+        # The closure is already computed from features.fea
+        options.layout_closure = False
+        options.name_IDs = ["*"]
+        options.name_languages = ["*"]
+        options.notdef_outline = True
+        options.glyph_names = True
+        font = TTFont(self.font)
+        subsetter = ftsubset.Subsetter(options)
+        subsetter.populate(glyphs=sorted(glyphs),
+                unicodes=[u for u, g in self.cmap.items() if g in glyphs])
+        subsetter.subset(font)
+        font.flavor = flavor
+        f = BytesIO()
+        font.save(f)
+        return f.getvalue()
+
+def main():
+    parser = argparse.ArgumentParser(description="Subset the font to the "
+            "glyphs needed by a text")
+    parser.add_argument("text", help="the text file (UTF-8)")
+    parser.add_argument("--font", default=default_otf,
+            help="the font (default: Slabikar.otf)")
+    parser.add_argument("--flavor", choices=["woff", "woff2"],
+            help="the output format (default: OTF)")
+    parser.add_argument("-o", "--output", help="the output file (default: "
+            "the text file name with the extension of the format)")
+    parser.add_argument("--cache-dir",
+            help="directory of the subset cache (default: no on-disk cache)")
+    args = parser.parse_args()
+
+    text = open(args.text, encoding="utf-8").read()
+    subsetter = FontSubsetter(args.font, cache_dir=args.cache_dir)
+    glyphs = subsetter.closure(text)
+    data = subsetter.subset(text, args.flavor)
+    output = args.output or os.path.splitext(args.text)[0] + "." \
+            + (args.flavor or "otf")
+    open(output, "wb").write(data)
+    print(f"{output}: {len(glyphs)} glyphs, {len(data)} bytes")
+
+if __name__ == "__main__":
+    main()
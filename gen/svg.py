@@ -8,15 +8,20 @@ reference.
 
 The metafont path is represented by nodes, optional tangents and tensions. From
 this information one can obtain bezier control points. We implemented the
-tangent+tension -> bezier control points calculation exactly. We currently
-require all tangents to be specified explicitly. The original Metafont source
-has some implicit tangents, so we have estimated those by trial and error by
-hand. In the future we could implement the Metafont's algorithm for tangents as
-well.
+tangent+tension -> bezier control points calculation exactly. We also
+implemented Metafont's choice of the implicit tangents (see
+`resolve_directions` in bezier.py), so a tangent can be left out (None) in
+`_draw2`. Most glyphs were transcribed before that and specify all tangents,
+the implicit ones in the original Metafont source were estimated by trial and
+error by hand.
 
-The generated SVG files contain the path of the cursive font. The files are
-then processed using Inkscape to produce outlines. We read them in, and convert
-to the UFO glif format, which is then used to construct the OTF font.
+The path of the cursive font is then stroked with a circular pen (see
+stroke.py) to produce outlines, which are saved in the UFO glif format, which is
+then used to construct the OTF font.
+
+Alternatively, with the `--inkscape` option, the generated SVG files contain the
+path of the cursive font. The files are then processed using Inkscape to produce
+outlines. We read them in, and convert to the UFO glif format.
 
 
 
@@ -53,16 +58,25 @@ t_style = 1
 
 
 import os
-from bezier import compute_control_points
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from bezier import compute_control_points_batch, resolve_directions
+from mfpath import parse, evaluate_path, free_names
 from math import sin, cos, pi
 from numpy import array
-from glif import Glif, verify, glif2svg, Point
+from dataclasses import replace
+from glif import Glif, Component, ArrayContours, verify, glif2svg, glif2glif, \
+        Point, decompose, convert_svg_to_glif, \
+        version as glif_version
+from stroke import stroke_glif, version as stroke_version
+from cache import Cache, hash_key
 
 def shift(contour, s):
-    p = []
-    for x in contour:
-        p.append(Point(x=x.x+s[0], y=x.y+s[1], type=x.type, smooth=x.smooth))
-    return p
+    if isinstance(contour, Component):
+        # A shared part (see `add_part`)
+        return replace(contour, x=contour.x+s[0], y=contour.y+s[1])
+    return ArrayContours.from_contours([contour]).shift(s).to_contours()[0]
 
 #path = [z1,
 #        [left, 1, z1p_tangent, z1p],
@@ -72,15 +86,28 @@ def shift(contour, s):
 #        [sklon1, 1, sklon1, z3],
 #    ]
 def _draw(path):
+    # Collect all curve segments first and compute their control points in
+    # one vectorized call
+    z0 = path[0]
+    segments = []
+    for t1, tension, t2, z in path[1:]:
+        if t1 is not None:
+            segments.append((z0, z, t1, t2, tension))
+        z0 = z
+    if len(segments) > 0:
+        z1s, z2s, w1s, w2s, taus = zip(*segments)
+        controls = compute_control_points_batch(z1s, z2s, w1s, w2s, taus, taus)
+
     contour = [
         Point(x=path[0][0], y=path[0][1], type="move", smooth=False)
     ]
+    i = 0
     for t1, tension, t2, z in path[1:]:
         if t1 is None:
             contour.append(Point(x=z[0], y=z[1], type="line", smooth=False))
         else:
-            z0 = [contour[-1].x, contour[-1].y]
-            c1, c2 = compute_control_points(z0, z, t1, t2, tension)
+            c1, c2 = controls[i]
+            i += 1
             contour.extend([
                 Point(x=c1[0], y=c1[1], type="offcurve", smooth=False),
                 Point(x=c2[0], y=c2[1], type="offcurve", smooth=False),
@@ -90,44 +117,125 @@ def _draw(path):
 
 #path = [(z1,left),1,(z1p,z1p_tangent),1,(z0,-sklon2),1.5,
 #        (z2,right),1.2,(-sklon1,z1,sklon1),1,(z3,sklon1)]
-def _draw2(path):
+def _draw2(path, cycle=False):
+    """
+    Draws the Metafont path given as alternating nodes and tensions. A node
+    is (z, direction), (direction_in, z, direction_out) or just (z,); a
+    tension of None draws a straight line.
+
+    The directions that are None (or missing) are chosen as Metafont does
+    (see `resolve_directions`), a direction given on one side of a node is
+    used on both sides. For a cyclic path (`cycle=True`) the path ends with
+    the tension of the segment from the last node back to the first one,
+    e.g. Metafont's `(0,9){right}..(0,11){left}..cycle` is
+    `[((0,9),right), 1, ((0,11),left), 1]`.
+    """
+    if cycle:
+        assert len(path) % 2 == 0
+        path = path + [path[0]]
     assert len(path) % 2 == 1
-    p2 = [path[0][0]]
-    for i in range((len(path)-1)//2):
-        node1 = path[2*i]; tension = path[2*i+1]; node2 = path[2*i+2]
-        if (len(node2) == 2):
-            if tension is None:
-                p2.append([None, None, None, node2[0]])
-            else:
-                p2.append([node1[-1], tension, node2[1], node2[0]])
+    nodes = path[0::2]
+    tensions = path[1::2]
+    z = [node[0] if len(node) < 3 else node[1] for node in nodes]
+    w_in = [node[1] if len(node) == 2 else
+            node[0] if len(node) == 3 else None for node in nodes]
+    w_out = [node[-1] if len(node) > 1 else None for node in nodes]
+    n = len(nodes)
+    if any(tensions[k] is not None and (w_out[k] is None or w_in[k+1] is None)
+            for k in range(n-1)):
+        if cycle:
+            w_in, w_out = resolve_directions(z[:-1], w_in[:-1], w_out[:-1],
+                    tensions, cycle=True)
+            w_in.append(w_in[0])
+            w_out.append(w_out[0])
+        else:
+            w_in, w_out = resolve_directions(z, w_in, w_out, tensions)
+    p2 = [z[0]]
+    for k in range(n-1):
+        if tensions[k] is None:
+            p2.append([None, None, None, z[k+1]])
         else:
-            assert len(node2) == 3
-            if tension is None:
-                p2.append([None, None, None, node2[1]])
-            else:
-                p2.append([node1[-1], tension, node2[0], node2[1]])
+            p2.append([w_out[k], tensions[k], w_in[k+1], z[k+1]])
     return _draw(p2)
 
 
+# Variables available in all Metafont paths (see `mf`), the path variables
+# (like dotah) are added as they are defined
+mf_variables = {}
+_mf_cache = {}
+
+def _mf_key(value):
+    if isinstance(value, list):
+        # Path variable, keyed by its points
+        return tuple((p.x, p.y, p.type, p.smooth) for p in value)
+    if isinstance(value, Component):
+        return (value.base, value.x, value.y)
+    if isinstance(value, (int, float)):
+        return float(value)
+    return tuple(float(x) for x in value)
+
+def _copy_contour(contour):
+    if isinstance(contour, Component):
+        return replace(contour)
+    return [replace(p) for p in contour]
+
+def mf(source, **variables):
+    """
+    Draws the Metafont path expression (see mfpath.py), e.g.
+
+        mf("z0{sklon2}..z1{right}..{sklon2}(8,6)", z0=z0, z1=z1)
+
+    The contours are memoized by the source and the values of the variables
+    it uses, so the repeated paths are only computed once. A copy of the
+    memoized contour is returned, so the callers can modify it.
+    """
+    env = {**mf_variables, **variables}
+    key = (source, tuple((name, _mf_key(env[name]))
+        for name in sorted(free_names(source)) if name in env))
+    if key not in _mf_cache:
+        _mf_cache[key] = evaluate_path(parse(source), env, _draw2, shift)
+    return _copy_contour(_mf_cache[key])
+
 def create_glif(contours, w, scale):
-    for contour in contours:
-        for p in contour:
-            p.x = float(p.x * scale)
-            p.y = float(p.y * scale)
+    components = [Component(c.base, c.x*scale, c.y*scale)
+            for c in contours if isinstance(c, Component)]
+    contours = [c for c in contours if not isinstance(c, Component)]
+    contours = ArrayContours.from_contours(contours).scale(scale).to_contours()
     w = float(w * scale)
 
     name = "a"
     unicode_hex = None
     anchors = []
-    g = Glif(name, unicode_hex, w, contours, anchors)
+    g = Glif(name, unicode_hex, w, contours, anchors, components)
     verify(g)
     return g
 
+# Builders of the centerline glifs of all characters, indexed by the (fixed)
+# glyph name. A builder is a picklable callable without arguments returning
+# the Glif, so that it can be sent to a worker process.
+chars = {}
+
 def add_char(charname, width, contours):
-    g = create_glif(contours, width, scale)
-    f = open(f'letter_{charname}.svg', 'w')
-    f.write(glif2svg(g, False, False, stroke_width))
-    f.close()
+    chars[charname] = partial(create_glif, contours, width, scale)
+
+# The names of the glyphs of the shared parts
+parts = []
+
+def add_part(name, contour):
+    """
+    Adds the shared part (an accent or a dot) as the glyph `name`.part with
+    zero width and returns its component. Shifting the component (`shift`)
+    gives a reference to the part at that offset, so the glyphs using the part
+    only store the reference and the part is stroked only once.
+
+    The parts of the letter stroke itself (dotah, smycka) are not shared this
+    way, they overlap the rest of the letter and the overlaps are only removed
+    within a glyph.
+    """
+    name += ".part"
+    add_char(name, 0, [contour])
+    parts.append(name)
+    return Component(name, 0, 0)
 
 def whatever_y(z0, vec, zy):
     """
@@ -155,15 +263,17 @@ up=array([0,1])
 # add a curve: first point, and (control-point1, control-point2, node)*n points.
 # sklon1:=-(1.5,6); sklon2:=(5,6);
 sklon1=-array([1.5,6]); sklon2=array([5,6]);
+mf_variables.update(sklon1=sklon1, sklon2=sklon2)
 
 #def dotah =
 #  draw ((0,1){sklon1}..(1,0){right}..{sklon2}(8,6))
 #enddef;
-dotah = _draw2([((0,1),sklon1),1,((1,0),right),1,((8,6),sklon2)])
+dotah = mf("(0,1){sklon1}..(1,0){right}..{sklon2}(8,6)")
+mf_variables["dotah"] = dotah
 eps = stroke_width/2 / scale
 z1 = (eps,0); z2 = (0,eps); z3 = (-eps,0); z4=(0,-eps)
-dot = _draw2([(z1,up), 1, (z2,left), 1, (z3,down), 1, (z4, right), 1,
-    (z1, up)])
+dot = add_part("dot", _draw2([(z1,up), 1, (z2,left), 1, (z3,down), 1,
+    (z4, right), 1, (z1, up)]))
 
 #def smycka =
 #   draw ((0,7){sklon1}..{sklon1}(-2,0)..{sklon1}(-3.1,-4)..
@@ -174,16 +284,17 @@ smycka = _draw2([((0,7),sklon1),1,((-2,0),sklon1),1,((-3.1,-4),sklon1),1,
     ((-5.3,-7),left),1,((-5.5,-5),-sklon1),1,
     ((-2,0),(6,5)),1,((5.5,6),sklon2)])
 
-carka = _draw2([((0,9),None),None,((1.5,13),None)])
-capcarka = _draw2([((0,15),None),None,((1.5,18),None)])
+carka = add_part("carka", _draw2([((0,9),None),None,((1.5,13),None)]))
+capcarka = add_part("capcarka", _draw2([((0,15),None),None,((1.5,18),None)]))
 #def krouzek =
 #   draw ((0,9){right}..(0,11){left}..cycle)
 #enddef;
 eps = 1.0
 z1 = (eps,0); z2 = (0,eps); z3 = (-eps,0); z4=(0,-eps)
-krouzek = shift(_draw2([(z1,up), 1, (z2,left), 1, (z3,down), 1, (z4, right), 1,
-    (z1, up)]), (0, 10))
-vokan = _draw2([((0,9),(1,1)),1,((3,11),right),1,((4,9),dir_(-105))])
+krouzek = add_part("krouzek", shift(_draw2([(z1,up), 1, (z2,left), 1,
+    (z3,down), 1, (z4, right), 1, (z1, up)]), (0, 10)))
+vokan = add_part("vokan",
+    _draw2([((0,9),(1,1)),1,((3,11),right),1,((4,9),dir_(-105))]))
 
 
 #def dvetecky (expr a, b) =
@@ -207,11 +318,13 @@ def dvetecky(x,y):
 #  draw ((0,12)..{sklon1}(-.3,10)..{right}(.8,9)..tension2..{sklon2}(5,12))
 #enddef;
 # Note: (0.2,12) looks better
-hacek = _draw2([((0,12),sklon1),1,((-.3,10),sklon1),1,((.8,9),right),2,((5,12),sklon2)])
+hacek = add_part("hacek", _draw2([((0,12),sklon1),1,((-.3,10),sklon1),1,
+    ((.8,9),right),2,((5,12),sklon2)]))
 #def hacekl =
 #  draw ((0,12)..{sklon1}(-.3,10)..{right}(.8,9)..tension2..{sklon2}(3.5,12))
 #enddef;
-hacekl = _draw2([((0,12),sklon1),1,((-.3,10),sklon1),1,((.8,9),right),2,((3.5,12),sklon2)])
+hacekl = add_part("hacekl", _draw2([((0,12),sklon1),1,((-.3,10),sklon1),1,
+    ((.8,9),right),2,((3.5,12),sklon2)]))
 
 
 
@@ -234,42 +347,42 @@ add_char("end", end_w, [
 #  draw (0,0)..(5,6);
 #endchar;
 add_char("begin_straight", 5, [
-    _draw2([((0,0),sklon2), 1, ((5,6),sklon2)]),
+    mf("(0,0){sklon2}..(5,6){sklon2}"),
 ])
 
 #beginchar(3, 6u#, 7u#, 0);  %% levy prohnuty zacatek znaku
 #  draw (0,0){(3,2)}..{sklon2}(6,6);
 #endchar;
 add_char("begin", 6, [
-    _draw2([((0,0),(3,2)), 1, ((6,6),sklon2)]),
+    mf("(0,0){(3,2)}..{sklon2}(6,6)"),
 ])
 
 #beginchar(4, 5u#, 7u#, 0);  %% obecna konvexni spojka za verzalkou a s
 #  draw (-4,0){right}..{sklon2}(5,6);
 #endchar;
 add_char("conn_s", 5, [
-    _draw2([((-4,0),right), 1, ((5,6),sklon2)]),
+    mf("(-4,0){right}..{sklon2}(5,6)"),
 ])
 
 #beginchar(5, 7u#, 7u#, 0);  %% delsi konvexni spojka za verzalkou P
 #  draw (-4,0){right}..{sklon2}(7,6);
 #endchar;
 add_char("conn_P", 7, [
-    _draw2([((-4,0),right), 1, ((7,6),sklon2)]),
+    mf("(-4,0){right}..{sklon2}(7,6)"),
 ])
 
 #beginchar(6, 3u#, 7u#, 0);  %% kratsi konvexni spojka pro dvojice sv sn
 #  draw (-4,0){right}..{sklon2}(3,6);
 #endchar;
 add_char("conn_sv", 3, [
-    _draw2([((-4,0),right), 1, ((3,6),sklon2)]),
+    mf("(-4,0){right}..{sklon2}(3,6)"),
 ])
 
 #beginchar(7, 8u#, 7u#, 0);  %% nabehova carka pro male x
 #  draw (0,2){down}..(2,0){right}..tension2..{sklon2}(8,6);
 #endchar;
 add_char("begin_x", 8, [
-    _draw2([((0,2),down), 1, ((2,0),right), 2, ((8,6),sklon2)]),
+    mf("(0,2){down}..(2,0){right}..tension2..{sklon2}(8,6)"),
 ])
 
 
@@ -2180,6 +2293,134 @@ glyphs = [
     # Helper token for OTF glyph substitution
     "subs_token",
 ]
+# The shared parts are only referenced by the components of other glyphs (they
+# are in the UFO, but not in the compiled font)
+glyphs += parts
+
+# Connections of the letters in a word, features.fea is generated from this
+# table by features.py. For each letter (all keys are optional):
+#
+# begin ... the glyph prepended at the beginning of a word
+# end ... if True, the "end" glyph is appended at the end of a word
+# straight ... the letter starts with a straight connection: "narrow" (the
+#     previous letter uses its narrow variant and "s" uses the short "conn_sv"
+#     connection) or "short" (only "s" uses "conn_sv")
+# narrow ... the narrow variant, used before a letter with straight="narrow"
+# conn ... the connection glyph appended after an uppercase letter followed by
+#     a lowercase letter
+# kern ... left kern at the beginning of a word (in units of u=scale)
+# kern_conn ... right kern if the letter is not connected to a following
+#     lowercase letter (in units of u=scale)
+# descender ... the letter has a descender, "s" after it uses its depth variant
+# left, depth ... the variants of "s" at the beginning of a word and after a
+#     letter with a descender ("s" is always connected to the next letter by
+#     "conn_s" or "conn_sv")
+connections = {
+    "A": dict(end=True),
+    "B": dict(conn="conn_s", kern_conn=2),
+    "C": dict(end=True),
+    "D": dict(conn="conn_s", kern_conn=2),
+    "E": dict(end=True),
+    "F": dict(conn="conn_s", kern_conn=6),
+    "G": dict(end=True),
+    "H": dict(end=True),
+    "I": dict(conn="conn_s", kern_conn=1),
+    "J": dict(end=True),
+    "K": dict(end=True),
+    "L": dict(end=True),
+    "M": dict(end=True),
+    "N": dict(end=True),
+    "O": dict(conn="conn_s", kern_conn=4),
+    "P": dict(conn="conn_P", kern_conn=7),
+    "Q": dict(end=True),
+    "R": dict(end=True),
+    "S": dict(conn="conn_s", kern_conn=4),
+    "T": dict(conn="conn_s", kern_conn=7),
+    "U": dict(end=True),
+    "V": dict(conn="conn_s", kern_conn=6),
+    "W": dict(conn="conn_s", kern_conn=6),
+    "X": dict(),
+    "Y": dict(end=True, descender=True),
+    "Z": dict(end=True),
+
+    "a": dict(end=True, kern=2),
+    "b": dict(begin="begin", end=True, narrow="bnarrow"),
+    "c": dict(end=True, kern=2),
+    "d": dict(end=True, kern=2),
+    "e": dict(begin="begin", end=True),
+    "f": dict(begin="begin", end=True),
+    "g": dict(end=True, kern=2, descender=True),
+    "h": dict(begin="begin", end=True),
+    "i": dict(begin="begin", end=True),
+    "j": dict(begin="begin", end=True, descender=True),
+    "k": dict(begin="begin", end=True),
+    "l": dict(begin="begin", end=True),
+    "m": dict(begin="begin_straight", end=True, straight="narrow"),
+    "n": dict(begin="begin_straight", end=True, straight="narrow"),
+    "o": dict(end=True, narrow="onarrow", kern=2),
+    "p": dict(begin="begin", end=True),
+    "q": dict(end=True, kern=2, descender=True),
+    "r": dict(begin="begin", end=True),
+    "s": dict(left="sleft", depth="sdepth"),
+    "t": dict(begin="begin", end=True, straight="short"),
+    "u": dict(begin="begin", end=True),
+    "v": dict(begin="begin_straight", end=True, straight="narrow",
+        narrow="vnarrow"),
+    "w": dict(begin="begin_straight", end=True, straight="narrow",
+        narrow="wnarrow"),
+    "x": dict(begin="begin_x", end=True),
+    "y": dict(begin="begin_straight", end=True, straight="narrow",
+        descender=True),
+    "z": dict(begin="begin_straight", end=True, straight="short"),
+
+    "Aacute": dict(end=True),
+    "Adieresis": dict(end=True),
+    "Ccaron": dict(end=True),
+    "Dcaron": dict(conn="conn_s", kern_conn=2),
+    "Eacute": dict(end=True),
+    "Ecaron": dict(end=True),
+    "Iacute": dict(conn="conn_s", kern_conn=1),
+    "Lacute": dict(end=True),
+    "Lcaron": dict(end=True),
+    "Ncaron": dict(end=True),
+    "Oacute": dict(conn="conn_s", kern_conn=4),
+    "Ocircumflex": dict(conn="conn_s", kern_conn=4),
+    "Racute": dict(end=True),
+    "Rcaron": dict(end=True),
+    "Scaron": dict(conn="conn_s", kern_conn=4),
+    "Tcaron": dict(conn="conn_s", kern_conn=7),
+    "Uacute": dict(end=True),
+    "Uring": dict(end=True),
+    "Yacute": dict(end=True, descender=True),
+    "Zcaron": dict(end=True),
+
+    "aacute": dict(end=True, kern=2),
+    "adieresis": dict(end=True, kern=2),
+    "ccaron": dict(end=True, kern=2),
+    "dcaron": dict(end=True, kern=2),
+    "eacute": dict(begin="begin", end=True),
+    "ecaron": dict(begin="begin", end=True),
+    "iacute": dict(begin="begin", end=True),
+    "lacute": dict(begin="begin", end=True),
+    "lcaron": dict(begin="begin", end=True),
+    "ncaron": dict(begin="begin_straight", end=True, straight="narrow"),
+    "oacute": dict(end=True, narrow="oacutenarrow", kern=2),
+    "ocircumflex": dict(end=True, narrow="ocircumflexnarrow", kern=2),
+    "racute": dict(begin="begin", end=True),
+    "rcaron": dict(begin="begin", end=True),
+    "scaron": dict(left="scaronleft", depth="scarondepth"),
+    "tcaron": dict(begin="begin", end=True, straight="short"),
+    "uacute": dict(begin="begin", end=True),
+    "uring": dict(begin="begin", end=True),
+    "yacute": dict(begin="begin_straight", end=True, straight="narrow",
+        descender=True),
+    "zcaron": dict(begin="begin_straight", end=True, straight="short"),
+
+    # Alternative versions
+    "onarrow": dict(kern=2),
+    "oacutenarrow": dict(kern=2),
+    "ocircumflexnarrow": dict(kern=2),
+}
 
 def fix_name(x):
     """
@@ -2194,35 +2435,121 @@ def fix_name(x):
 
 letters = [fix_name(x) for x in glyphs]
 
-current_dir = os.path.dirname(os.path.abspath(__file__))
-glyphs_dir = "../font.ufo/glyphs"
-run(f"mkdir -p {glyphs_dir}")
-s = ""
-for letter in letters:
-    s += f"file-open:letter_{letter}.svg; select-by-id: path0; object-stroke-to-path; export-type:svg; export-do\n"
-open("commands.txt", "w").write(s)
-run("inkscape --shell < commands.txt")
-for letter in letters:
-    run(f"python svg2glif.py letter_{letter}_out.svg")
-    run(f"cp letter_{letter}_out_out3.glif {glyphs_dir}/{letter}.glif")
-
-s = """\
+def glyph_key(builder, converter, decomposed=False):
+    """
+    Returns the cache key of the glyph: the hash of all the resolved inputs
+    that determine the generated glif.
+
+    If the outliner keeps the components, they only store the reference, so a
+    change of a part only regenerates the part itself. If it decomposes them
+    (`decomposed`), the key of a component is the key of its part, so a change
+    of a part also regenerates all the glyphs using it.
+    """
+    contours, width, scale = builder.args
+    path = []
+    for c in contours:
+        if not isinstance(c, Component):
+            path.append([(float(p.x), float(p.y), p.type, p.smooth)
+                for p in c])
+        elif decomposed:
+            path.append((glyph_key(chars[fix_name(c.base)], converter, True),
+                float(c.x), float(c.y)))
+        else:
+            path.append((c.base, float(c.x), float(c.y)))
+    return hash_key(path, float(width), scale, stroke_width, z_style, t_style,
+            converter)
+
+def outline_inkscape(letters, jobs):
+    # Inkscape outlines the whole glyph, so the components are decomposed
+    for letter in letters:
+        f = open(f'letter_{letter}.svg', 'w')
+        glif = decompose(chars[letter](), lambda name: chars[fix_name(name)]())
+        f.write(glif2svg(glif, False, False, stroke_width))
+        f.close()
+    s = ""
+    for letter in letters:
+        s += f"file-open:letter_{letter}.svg; select-by-id: path0; object-stroke-to-path; export-type:svg; export-do\n"
+    open("commands.txt", "w").write(s)
+    run("inkscape --shell < commands.txt")
+    svg_strs = [open(f"letter_{letter}_out.svg").read() for letter in letters]
+    with ProcessPoolExecutor(jobs) as executor:
+        return list(executor.map(convert_svg_to_glif, svg_strs))
+
+def outline_glyph(builder, stroke_width):
+    """
+    Constructs the glyph, outlines it and returns the serialized glif.
+    """
+    return glif2glif(stroke_glif(builder(), stroke_width))
+
+def outline_native(letters, jobs):
+    builders = [chars[letter] for letter in letters]
+    with ProcessPoolExecutor(jobs) as executor:
+        # The results are returned in the order of `letters`
+        return list(executor.map(outline_glyph, builders,
+                [stroke_width]*len(builders), chunksize=8))
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the font glyphs")
+    parser.add_argument("--inkscape", action="store_true",
+            help="outline the strokes using Inkscape instead of the native stroker")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(),
+            help="number of worker processes (default: number of CPUs)")
+    parser.add_argument("--cache-dir", default=".cache",
+            help="directory of the glyph cache (default: .cache)")
+    parser.add_argument("--cache-size", type=int, default=64,
+            help="maximum size of the glyph cache in MB (default: 64)")
+    parser.add_argument("--no-cache", action="store_true",
+            help="regenerate all glyphs, do not use the glyph cache")
+    args = parser.parse_args()
+
+    glyphs_dir = "../font.ufo/glyphs"
+    run(f"mkdir -p {glyphs_dir}")
+    if args.inkscape:
+        outline = outline_inkscape
+        converter = ("inkscape", glif_version)
+    else:
+        outline = outline_native
+        converter = ("native", stroke_version, glif_version)
+
+    # Only the glyphs whose inputs changed are regenerated
+    keys = {letter: glyph_key(chars[letter], converter, args.inkscape)
+            for letter in letters}
+    glif_strs = {}
+    if not args.no_cache:
+        cache = Cache(args.cache_dir, args.cache_size * 1024**2)
+        for letter in letters:
+            glif_str = cache.get(keys[letter])
+            if glif_str is not None:
+                glif_strs[letter] = glif_str
+    todo = [letter for letter in letters if letter not in glif_strs]
+    print(f"Glyphs: {len(letters)-len(todo)} cached, {len(todo)} to generate")
+    if len(todo) > 0:
+        for letter, glif_str in zip(todo, outline(todo, args.jobs)):
+            glif_strs[letter] = glif_str
+            if not args.no_cache:
+                cache.put(keys[letter], glif_str)
+    if not args.no_cache:
+        cache.evict()
+    for letter in letters:
+        open(f"{glyphs_dir}/{letter}.glif", "w").write(glif_strs[letter])
+
+    s = """\
 <?xml version="1.0" encoding="UTF-8"?>
 <!DOCTYPE plist PUBLIC "-//Apple//DTD PLIST 1.0//EN" "http://www.apple.com/DTDs/PropertyList-1.0.dtd">
 <plist version="1.0">
 \t<dict>
 """
-for name in glyphs:
-    filename = fix_name(name) + ".glif"
-    s += f"\t\t<key>{name}</key>\n"
-    s += f"\t\t<string>{filename}</string>\n"
-s += """\
+    for name in glyphs:
+        filename = fix_name(name) + ".glif"
+        s += f"\t\t<key>{name}</key>\n"
+        s += f"\t\t<string>{filename}</string>\n"
+    s += """\
 \t</dict>
 </plist>
 """
-open(f"{glyphs_dir}/contents.plist", "w").write(s)
+    open(f"{glyphs_dir}/contents.plist", "w").write(s)
 
-s = """\
+    s = """\
 <?xml version="1.0" encoding="UTF-8"?>
 <!DOCTYPE plist PUBLIC "-//Apple//DTD PLIST 1.0//EN" "http://www.apple.com/DTDs/PropertyList-1.0.dtd">
 <plist version="1.0">
@@ -2230,19 +2557,26 @@ s = """\
 \t\t<key>public.glyphOrder</key>
 \t\t<array>
 """
-for name in glyphs:
-    s += f"\t\t\t<string>{name}</string>\n"
-s += """\
+    for name in glyphs:
+        s += f"\t\t\t<string>{name}</string>\n"
+    s += """\
 \t\t</array>
 \t</dict>
 </plist>
 """
-open(f"{glyphs_dir}/../lib.plist", "w").write(s)
-
-s = ""
-for name in glyphs:
-    s += f"{name}\t{name}"
-    if name in unicode:
-        s += "\t" + ",".join(unicode[name])
-    s += "\n"
-open(f"{glyphs_dir}/../../GlyphOrderAndAliasDB", "w").write(s)
+    open(f"{glyphs_dir}/../lib.plist", "w").write(s)
+
+    # The shared parts are decomposed by makeotf, they are left out of the
+    # font (`makeotf -gs` omits the glyphs not listed here)
+    s = ""
+    for name in glyphs:
+        if name in parts:
+            continue
+        s += f"{name}\t{name}"
+        if name in unicode:
+            s += "\t" + ",".join(unicode[name])
+        s += "\n"
+    open(f"{glyphs_dir}/../../GlyphOrderAndAliasDB", "w").write(s)
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,57 @@
+"""
+Converts outline SVG files (as produced by Inkscape) to glif files.
+
+The inputs are SVG files or directories (all their *.svg files), they are
+converted in a pool of worker processes. Each input is read and parsed once.
+The outputs of file.svg are file_out3.glif and file_out3.svg (the glyph
+written back as SVG, to compare with the input).
+
+Usage:
+
+    python svg2glif.py [-d directory] [-j jobs] file.svg|directory ...
+"""
+
+import argparse
 import os
-import sys
-from glif import parse_svg, glif2svg, glif2glif
-
-if len(sys.argv) != 2:
-    print("svg2glif filename")
-    sys.exit(1)
-
-filename_in  = sys.argv[1]
-filename_out_svg = os.path.splitext(os.path.basename(filename_in))[0] + "_out3.svg"
-print(f"{filename_in} -> {filename_out_svg}")
-g = parse_svg(open(filename_in).read())
-open(filename_out_svg, "w").write(glif2svg(g, False, True, 0.0))
-
-filename_out_glif = os.path.splitext(os.path.basename(filename_in))[0] + "_out3.glif"
-print(f"{filename_in} -> {filename_out_glif}")
-g = parse_svg(open(filename_in).read())
-open(filename_out_glif, "w").write(glif2glif(g))
+from concurrent.futures import ProcessPoolExecutor
+
+from glif import glif2glif, glif2svg, parse_svg
+from glif2svg import input_files
+
+def convert(filename_in: str, directory: str) -> list[str]:
+    """
+    Converts the SVG file to glif and back to SVG in `directory`, returns the
+    output filenames.
+    """
+    base = os.path.join(directory,
+            os.path.splitext(os.path.basename(filename_in))[0] + "_out3")
+    g = parse_svg(open(filename_in, encoding="utf-8").read())
+    open(base + ".svg", "w").write(glif2svg(g, False, True, 0.0))
+    open(base + ".glif", "w").write(glif2glif(g))
+    return [base + ".svg", base + ".glif"]
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert SVG files to glif")
+    parser.add_argument("inputs", nargs="+",
+            help="SVG files or directories with SVG files")
+    parser.add_argument("-d", "--directory", default=".",
+            help="output directory (default: the current directory)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(),
+            help="number of worker processes (default: number of CPUs)")
+    args = parser.parse_args()
+
+    filenames = input_files(args.inputs, ".svg")
+    os.makedirs(args.directory, exist_ok=True)
+    directories = [args.directory] * len(filenames)
+    if args.jobs > 1 and len(filenames) > 1:
+        with ProcessPoolExecutor(args.jobs) as executor:
+            outputs = list(executor.map(convert, filenames, directories,
+                chunksize=max(len(filenames) // (4*args.jobs), 1)))
+    else:
+        outputs = list(map(convert, filenames, directories))
+    for filename_in, filenames_out in zip(filenames, outputs):
+        for filename_out in filenames_out:
+            print(f"{filename_in} -> {filename_out}")
+
+if __name__ == "__main__":
+    main()
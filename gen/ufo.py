@@ -0,0 +1,263 @@
+"""
+Bulk loader of the glyphs of a UFO font.
+
+`parse_glif` builds the full ElementTree of each file and a `Point` object for
+each node, which is slow for tools that need the whole font (metrics reports,
+diffing, rendering). This module reads all the files listed in
+glyphs/contents.plist with a simple scanner of the glif tags directly into a
+single `ArrayContours` for the whole font. The `Glif` objects are only
+created on demand (`UFO.glif`).
+
+The scanner only understands the glif elements that we use (advance, unicode,
+outline/contour/point, outline/component and anchor), everything else (e.g.
+lib, comments) is skipped. The components are kept as references, use
+`UFO.glif(name, flatten=True)` to get the glyph with their contours.
+
+Usage:
+
+    python ufo.py [-j jobs] [--metrics] [font.ufo]
+"""
+
+import argparse
+import os
+import plistlib
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from glif import Glif, Anchor, Component, ArrayContours, point_dtype, \
+        point_type_codes, decompose, num, verify
+
+default_ufo = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+        "../font.ufo")
+
+tag_re = re.compile(r"<(/?)([A-Za-z]+)([^>]*?)(/?)>", re.S)
+attr_re = re.compile(r"""([A-Za-z]+)\s*=\s*(?:"([^"]*)"|'([^']*)')""")
+comment_re = re.compile(r"<!--.*?-->", re.S)
+
+# A point or the end of a contour (an empty contour is written as
+# `<contour />`). With `findall` this gives one tuple per point without
+# creating any match objects. The first pattern only matches
+# the attribute order written by `glif2glif`, which is much faster to match,
+# the second one matches the attributes in any order (type and smooth are
+# optional).
+point_re = re.compile(r'<point (?:smooth="(yes|no)" )?(?:type="(\w+)" )?'
+        r'x="([^"]*)" y="([^"]*)" ?/>|(</contour>|<contour\s*/>)')
+
+def _attr(name):
+    return rf"""(?=[^>]*?\b{name}\s*=\s*["']([^"']*)["'])"""
+point_any_re = re.compile(r"<point\b(?:" + _attr("smooth") + ")?"
+        + "(?:" + _attr("type") + ")?" + _attr("x") + _attr("y")
+        + r"[^>]*>|(</contour>|<contour\s*/>)")
+contour_end_re = re.compile(r"</contour>|<contour\s*/>")
+
+def attributes(s: str) -> dict:
+    return {m[1]: m[2] if m[3] is None else m[3]
+            for m in attr_re.finditer(s)}
+
+def scan_points(outline: str):
+    """
+    Scans the points of the outline element. Returns the `points` and
+    `starts` arrays of `ArrayContours`.
+    """
+    items = point_re.findall(outline)
+    if len(items) != outline.count("<point") \
+            + len(contour_end_re.findall(outline)):
+        items = point_any_re.findall(outline)
+    starts = [0]
+    n = 0
+    for item in items:
+        if item[4]:
+            starts.append(n)
+        else:
+            n += 1
+    if n < len(items):
+        items = [item for item in items if not item[4]]
+    points = np.empty(n, dtype=point_dtype)
+    if n > 0:
+        smooth, type, x, y, _ = zip(*items)
+        points["x"] = np.array(x, dtype=float)
+        points["y"] = np.array(y, dtype=float)
+        points["type"] = [point_type_codes[t or "offcurve"] for t in type]
+        points["smooth"] = [s == "yes" for s in smooth]
+    return points, np.array(starts)
+
+def scan_glif(text: str):
+    """
+    Scans the glif file. Returns (name, unicode_hex, w, points, starts,
+    anchors, components), where `points` and `starts` are the arrays of
+    `ArrayContours`.
+    """
+    if "<!--" in text:
+        text = comment_re.sub("", text)
+    # The points are scanned separately, the rest of the tags one by one
+    i = text.find("<outline")
+    if i >= 0:
+        j = text.find("</outline>", i)
+        outline = text[i:j]
+        text = text[:i] + text[j:]
+    else:
+        outline = ""
+    points, starts = scan_points(outline)
+    components = []
+    if "<component" in outline:
+        for m in tag_re.finditer(outline):
+            if m[2] == "component":
+                a = attributes(m[3])
+                components.append(Component(a["base"],
+                    num(a.get("xOffset", "0")), num(a.get("yOffset", "0"))))
+    name = None
+    unicode_hex = None
+    w = None
+    anchors = []
+    for m in tag_re.finditer(text):
+        closing, tag, attrs, _ = m.groups()
+        if closing:
+            continue
+        if tag == "glyph":
+            name = attributes(attrs)["name"]
+        elif tag == "advance":
+            w = int(attributes(attrs)["width"])
+        elif tag == "unicode" and unicode_hex is None:
+            unicode_hex = attributes(attrs)["hex"]
+        elif tag == "anchor":
+            a = attributes(attrs)
+            anchors.append(Anchor(int(a["x"]), int(a["y"]), a.get("name")))
+    return name, unicode_hex, w, points, starts, anchors, components
+
+def read_glif(filename: str):
+    return scan_glif(open(filename, encoding="utf-8").read())
+
+def read_contents(path: str) -> dict:
+    """
+    Returns the glyph name -> filename dictionary of the glyphs directory.
+    """
+    with open(os.path.join(path, "glyphs", "contents.plist"), "rb") as f:
+        return plistlib.load(f)
+
+class UFO:
+
+    def __init__(self, path: str = default_ufo, jobs: int = 1):
+        """
+        path ... the UFO directory
+        jobs ... number of worker processes to read the files with (for
+            large fonts, for small fonts the startup of the processes costs
+            more than it saves)
+        """
+        self.path = path
+        contents = read_contents(path)
+        filenames = [os.path.join(path, "glyphs", f)
+                for f in contents.values()]
+        if jobs > 1:
+            with ProcessPoolExecutor(jobs) as executor:
+                glyphs = list(executor.map(read_glif, filenames,
+                    chunksize=max(len(filenames) // (4*jobs), 1)))
+        else:
+            glyphs = [read_glif(f) for f in filenames]
+
+        self.names = list(contents)
+        self.index = {name: n for n, name in enumerate(self.names)}
+        self.unicodes = [g[1] for g in glyphs]
+        # NaN for the glyphs without an advance (None in the Glif)
+        self.widths = np.array([g[2] if g[2] is not None else np.nan
+            for g in glyphs], dtype=float)
+        self.anchors = [g[5] for g in glyphs]
+        self.components = [g[6] for g in glyphs]
+        parts = [ArrayContours(g[3], g[4]) for g in glyphs]
+        # The contours of glyph `n` are contours[glyph_starts[n]:
+        # glyph_starts[n+1]] of the whole font
+        self.glyph_starts = np.cumsum([0] + [len(c) for c in parts])
+        self.contours = ArrayContours.concatenate(parts) if parts else \
+                ArrayContours(np.empty(0, dtype=point_dtype), np.zeros(1, int))
+        self.glifs = {}
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def glyph_contours(self, name: str) -> ArrayContours:
+        """
+        The contours of the glyph (views into the arrays of the whole font).
+        """
+        n = self.index[name]
+        starts = self.contours.starts[
+                self.glyph_starts[n]:self.glyph_starts[n+1]+1]
+        return ArrayContours(self.contours.points[starts[0]:starts[-1]],
+                starts - starts[0])
+
+    def glif(self, name: str, flatten: bool = False) -> Glif:
+        """
+        Returns the Glif of the glyph, created on the first access. With
+        `flatten` the components are replaced by their contours.
+        """
+        if name not in self.glifs:
+            n = self.index[name]
+            w = self.widths[n]
+            g = Glif(name, self.unicodes[n], None if np.isnan(w) else int(w),
+                    self.glyph_contours(name).to_contours(), self.anchors[n],
+                    self.components[n])
+            verify(g)
+            self.glifs[name] = g
+        if flatten:
+            return decompose(self.glifs[name], self.glif)
+        return self.glifs[name]
+
+    def bounds(self) -> np.ndarray:
+        """
+        Returns the (xmin, ymin, xmax, ymax) of the points (including the
+        offcurve points and the points of the components) of each glyph, NaN
+        for empty glyphs.
+        """
+        points = self.contours.points
+        first = self.contours.starts[self.glyph_starts]
+        r = np.full((len(self), 4), np.nan)
+        nonempty = first[:-1] < first[1:]
+        if len(points) > 0:
+            idx = first[:-1][nonempty]
+            for n, (col, reduce) in enumerate([("x", np.minimum),
+                    ("y", np.minimum), ("x", np.maximum), ("y", np.maximum)]):
+                r[nonempty, n] = reduce.reduceat(points[col], idx)
+        # The components are resolved in the order of their nesting depth
+        todo = [n for n in range(len(self)) if self.components[n]]
+        while todo:
+            ready = [n for n in todo if all(self.index[c.base] not in todo
+                for c in self.components[n])]
+            if len(ready) == 0:
+                raise Exception("Cyclic components")
+            for n in ready:
+                for c in self.components[n]:
+                    b = r[self.index[c.base]] + [c.x, c.y, c.x, c.y]
+                    r[n, :2] = np.fmin(r[n, :2], b[:2])
+                    r[n, 2:] = np.fmax(r[n, 2:], b[2:])
+            todo = [n for n in todo if n not in ready]
+        return r
+
+def main():
+    parser = argparse.ArgumentParser(description="Load the UFO glyphs")
+    parser.add_argument("ufo", nargs="?", default=default_ufo,
+            help="the UFO directory (default: font.ufo)")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+            help="number of worker processes (default: 1)")
+    parser.add_argument("--metrics", action="store_true",
+            help="print the advance width and bounds of each glyph")
+    args = parser.parse_args()
+
+    t1 = time.perf_counter()
+    ufo = UFO(args.ufo, args.jobs)
+    t2 = time.perf_counter()
+    print(f"Loaded {len(ufo)} glyphs, {len(ufo.contours)} contours, "
+        f"{len(ufo.contours.points)} points in {(t2-t1)*1000:.1f} ms")
+    if args.metrics:
+        print(f"{'Glyph':20} {'Width':>6} {'xMin':>8} {'yMin':>8} "
+            f"{'xMax':>8} {'yMax':>8}")
+        for name, w, b in zip(ufo.names, ufo.widths, ufo.bounds()):
+            w = "" if np.isnan(w) else int(w)
+            print(f"{name:20} {w:>6} {b[0]:8.1f} {b[1]:8.1f} {b[2]:8.1f} "
+                f"{b[3]:8.1f}")
+
+if __name__ == "__main__":
+    main()
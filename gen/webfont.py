@@ -0,0 +1,129 @@
+"""
+Web font versions of Slabikar.otf.
+
+Writes Slabikar.woff2 and Slabikar.woff (the glyphs that are not reachable
+from any character are dropped). With `--subsets` it also writes the unicode-range subsets and
+Slabikar-subsets.css with their @font-face rules:
+
+* punctuation ... the digits, punctuation and other symbols (and space)
+* letters ... the ASCII and Czech letters (and space)
+
+The connections are only applied between the glyphs of one font file (the
+browser shapes each run of characters that use the same @font-face rule
+separately), so all the letters must be in one subset: splitting the
+ASCII letters from the Czech ones would break the connections in words like
+"čas". The letters subset keeps all the glyphs used by the GSUB connection
+rules (begin, end, conn_*, subs_token, the narrow and "s" variants).
+
+Usage:
+
+    python webfont.py [--subsets] [-d directory] [font.otf]
+"""
+
+import argparse
+import os
+import unicodedata
+
+from fontTools import subset
+from fontTools.ttLib import TTFont
+
+default_otf = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+        "../Slabikar.otf")
+
+def subset_font(filename: str, unicodes, glyphs=()) -> TTFont:
+    """
+    Returns the subset of the font with the given characters and glyphs and
+    everything reachable from them by the layout features.
+    """
+    options = subset.Options()
+    options.layout_features = ["*"]
+    options.name_IDs = ["*"]
+    options.name_languages = ["*"]
+    options.notdef_outline = True
+    options.glyph_names = True
+    font = TTFont(filename)
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(unicodes=unicodes, glyphs=glyphs)
+    subsetter.subset(font)
+    return font
+
+def save(font: TTFont, filename: str, flavor: str):
+    font.flavor = flavor
+    font.save(filename)
+    print(f"{filename}: {os.path.getsize(filename)} bytes")
+
+def subsets(font: TTFont) -> dict:
+    """
+    Returns the name -> (unicodes, glyphs) of each subset.
+    """
+    cmap = font.getBestCmap()
+    space = {0x20, 0xa0}
+    letters = {u for u in cmap if unicodedata.category(chr(u))[0] == "L"}
+    punctuation = set(cmap) - letters
+    # The glyphs without a character are only reachable by the substitutions
+    # (the connections), keep them all.
+    encoded = set(cmap.values())
+    helpers = [name for name in font.getGlyphOrder() if name not in encoded
+            and name != ".notdef"]
+    # Where the unicode ranges overlap (space), browsers use the last rule
+    return {
+        "punctuation": (sorted(punctuation | space), []),
+        "letters": (sorted(letters | space), helpers),
+    }
+
+def unicode_range(unicodes) -> str:
+    """
+    Formats the sorted characters as the CSS unicode-range.
+    """
+    ranges = []
+    for u in unicodes:
+        if ranges and ranges[-1][1] == u - 1:
+            ranges[-1][1] = u
+        else:
+            ranges.append([u, u])
+    return ", ".join(f"U+{a:04X}" if a == b else f"U+{a:04X}-{b:04X}"
+            for a, b in ranges)
+
+def font_face(name: str, unicodes) -> str:
+    return f"""\
+@font-face {{
+  font-family: 'Slabikar';
+  src: url('{name}.woff2') format('woff2'),
+       url('{name}.woff') format('woff');
+  font-weight: normal;
+  font-style: normal;
+  unicode-range: {unicode_range(unicodes)};
+}}
+"""
+
+def main():
+    parser = argparse.ArgumentParser(description="Write the web fonts")
+    parser.add_argument("font", nargs="?", default=default_otf,
+            help="the font (default: Slabikar.otf)")
+    parser.add_argument("-d", "--directory",
+            help="output directory (default: the directory of the font)")
+    parser.add_argument("--subsets", action="store_true",
+            help="also write the unicode-range subsets and their CSS")
+    args = parser.parse_args()
+
+    directory = args.directory or os.path.dirname(os.path.abspath(args.font))
+    base = os.path.splitext(os.path.basename(args.font))[0]
+    cmap = TTFont(args.font).getBestCmap()
+    font = subset_font(args.font, list(cmap))
+    for flavor in ["woff2", "woff"]:
+        save(font, os.path.join(directory, f"{base}.{flavor}"), flavor)
+
+    if args.subsets:
+        css = ""
+        for name, (unicodes, glyphs) in subsets(TTFont(args.font)).items():
+            font = subset_font(args.font, unicodes, glyphs)
+            for flavor in ["woff2", "woff"]:
+                save(font, os.path.join(directory, f"{base}-{name}.{flavor}"),
+                    flavor)
+            css += font_face(f"{base}-{name}", unicodes)
+        filename = os.path.join(directory, f"{base}-subsets.css")
+        open(filename, "w").write(css)
+        print(f"{filename}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+import os
+import sys
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The modules in gen/ import each other by their plain names
+sys.path.insert(0, os.path.join(root, "gen"))
@@ -0,0 +1,41 @@
+from math import sqrt
+
+import numpy as np
+
+from bezier import compute_control_points, resolve_directions, solve_cycle
+
+def test_circle_through_4_points():
+    # (1,0)..(0,1)..(-1,0)..(0,-1)..cycle is Metafont's circle: the
+    # directions are the tangents and the control points are at the
+    # distance 4/3 (sqrt(2) - 1) from the nodes
+    z = [(1, 0), (0, 1), (-1, 0), (0, -1)]
+    w = solve_cycle(z, [1]*4)
+    assert np.allclose(w, [(0, 1), (-1, 0), (0, -1), (1, 0)])
+    c1, c2 = compute_control_points(z[0], z[1], w[0], w[1], 1)
+    k = 4/3 * (sqrt(2) - 1)
+    assert np.allclose(c1, (1, k))
+    assert np.allclose(c2, (k, 1))
+
+def test_circle_tension_does_not_change_directions():
+    z = [(1, 0), (0, 1), (-1, 0), (0, -1)]
+    assert np.allclose(solve_cycle(z, [2]*4), solve_cycle(z, [1]*4))
+
+def test_open_path_curl():
+    # With curl 1 the path through three points of a circle starts and ends
+    # along the circle: (0,0)..(1,1)..(2,0) is a half circle
+    w_in, w_out = resolve_directions([(0, 0), (1, 1), (2, 0)], [None]*3,
+            [None]*3, [1, 1])
+    assert np.allclose(w_out[0], (0, 1))
+    assert np.allclose(w_out[1], (1, 0))
+    assert np.allclose(w_in[2], (0, -1))
+
+def test_cycle_mirror_symmetry():
+    # Mirroring the nodes (and reversing them to keep the orientation)
+    # mirrors the directions
+    a = np.radians([0, 50, 130, 200, 290])
+    z = np.stack([2*np.cos(a), np.sin(a)], axis=1)
+    tensions = [1, 1.2, 1, 2, 1]
+    w = solve_cycle(z, tensions)
+    zm = z[::-1] * (-1, 1)
+    wm = solve_cycle(zm, np.roll(tensions[::-1], -1))
+    assert np.allclose(wm[::-1], -w * (-1, 1))
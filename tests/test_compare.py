@@ -0,0 +1,70 @@
+import json
+import os
+import sys
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from conftest import root
+
+sys.path.insert(0, os.path.join(root, "examples/tex"))
+import compare
+
+def page():
+    """
+    A page (True is white, as written by Ghostscript) with a few strokes.
+    """
+    a = np.ones((300, 200), dtype=bool)
+    a[50:54, 20:180] = False
+    a[100:250, 60:63] = False
+    a[200:203, 10:150] = False
+    return a
+
+def save(a, filename):
+    Image.fromarray(a).save(filename)
+
+@pytest.fixture
+def pages(tmp_path):
+    os.makedirs(tmp_path / "reference")
+    save(page(), tmp_path / "reference" / "page.png")
+    return tmp_path
+
+def test_shifted_page_passes(pages):
+    a = page()
+    a[:, 1:] = a[:, :-1].copy()
+    save(a, pages / "page.png")
+    s = compare.compare_page(str(pages / "page.png"),
+            str(pages / "reference"), 1, 64, 0)
+    assert s["ok"]
+    assert s["different"] > 0 and s["failing"] == 0
+    assert os.path.exists(pages / "diff-page.png")
+    # Without the tolerance the shift fails
+    s = compare.compare_page(str(pages / "page.png"),
+            str(pages / "reference"), 0, 64, 0)
+    assert not s["ok"]
+
+def test_missing_stroke_fails(pages):
+    a = page()
+    a[100:250, 60:63] = True
+    save(a, pages / "page.png")
+    s = compare.compare_page(str(pages / "page.png"),
+            str(pages / "reference"), 1, 64, 0)
+    assert not s["ok"]
+    assert s["failing"] > 0
+    # The failing tiles are the ones the stroke went through
+    assert {(t["x"], t["y"]) for t in s["tiles"]} == \
+            {(0, 64), (0, 128), (0, 192)}
+
+def test_main(pages, monkeypatch):
+    save(page(), pages / "page.png")
+    monkeypatch.chdir(pages)
+    monkeypatch.setattr(sys, "argv", ["compare.py", "page.png"])
+    compare.main()
+    [s] = json.load(open(pages / "compare.json"))
+    assert s["ok"] and s["different"] == 0
+    a = page()
+    a[50:54, 20:180] = True
+    save(a, pages / "page.png")
+    with pytest.raises(Exception, match="Images not equal"):
+        compare.main()
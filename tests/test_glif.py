@@ -0,0 +1,30 @@
+import pytest
+
+from glif import parse_path, parse_svg
+
+def test_path_must_start_with_moveto():
+    for d in ["S 1 2 3 4", "T 1 2", "L 1 2", "s 1 2 3 4 M 0 0"]:
+        with pytest.raises(Exception, match="must start with a moveto"):
+            parse_path(d, 1.0, 0.0)
+
+def test_smooth_curve_after_moveto():
+    # Without a previous curve the first control point is the current point
+    [contour] = parse_path("M 0 0 S 10 10 20 0", 1.0, 0.0)
+    assert [(p.x, p.y, p.type) for p in contour] == [(0, 0, "move"),
+        (0, 0, "offcurve"), (10, -10, "offcurve"), (20, 0, "curve")]
+
+def test_parse_svg_size_from_view_box():
+    path = '<path id="path0" d="M0 0 L10 10 L 0 10 Z"/>'
+    ns = 'xmlns="http://www.w3.org/2000/svg"'
+    g = parse_svg(f'<svg {ns} viewBox="0 0 100 200">{path}</svg>')
+    assert g.w == 100
+    assert [(p.x, p.y) for p in g.contours[0]] == [(0, 200), (10, 190),
+        (0, 190)]
+    # Only one of width and height: the other one is taken from the viewBox
+    g = parse_svg(f'<svg {ns} width="300px" viewBox="0,0, 100,200">{path}'
+        '</svg>')
+    assert g.w == 300
+    assert [(p.x, p.y) for p in g.contours[0]][0] == (0, 200)
+    g = parse_svg(f'<svg {ns} height="50" viewBox="0 0 100 200">{path}</svg>')
+    assert g.w == 100
+    assert [(p.x, p.y) for p in g.contours[0]][0] == (0, 50)
@@ -0,0 +1,78 @@
+import pytest
+
+from mfpath import MFError, evaluate, evaluate_path, free_names, parse
+
+sklon1 = (1, 3)
+sklon2 = (5, 6)
+right, left, up, down = (1.0, 0.0), (-1.0, 0.0), (0.0, 1.0), (0.0, -1.0)
+env = {"sklon1": sklon1, "sklon2": sklon2}
+
+def draw(path, cycle):
+    return path, cycle
+
+def shift(contour, offset):
+    return "shifted", contour, offset
+
+# The Metafont sources in svg.py and the `_draw2` paths they replaced
+replaced = [
+    ("(0,1){sklon1}..(1,0){right}..{sklon2}(8,6)",
+        [((0,1),sklon1),1,((1,0),right),1,((8,6),sklon2)]),
+    ("(0,0){sklon2}..(5,6){sklon2}", [((0,0),sklon2), 1, ((5,6),sklon2)]),
+    ("(0,0){(3,2)}..{sklon2}(6,6)", [((0,0),(3,2)), 1, ((6,6),sklon2)]),
+    ("(-4,0){right}..{sklon2}(5,6)", [((-4,0),right), 1, ((5,6),sklon2)]),
+    ("(0,2){down}..(2,0){right}..tension2..{sklon2}(8,6)",
+        [((0,2),down), 1, ((2,0),right), 2, ((8,6),sklon2)]),
+]
+
+@pytest.mark.parametrize("source, path", replaced)
+def test_replaced_paths(source, path):
+    assert evaluate_path(parse(source), env, draw, shift) == (path, False)
+
+def test_cycle_and_straight_lines():
+    source = "z1{up}..z2{left}--(x1,y2-1)..tension 1.5 and 1.5..cycle"
+    z = {"z1": (1.0, 0.0), "z2": (0.0, 2.0)}
+    assert free_names(source) == {"z1", "z2", "x1", "y2", "up", "left"}
+    assert evaluate_path(parse(source), z, draw, shift) == ([((1, 0),up), 1,
+        ((0, 2),left), None, ((1, 1),None), 1.5], True)
+
+def test_shifted_path_variable():
+    e = {"dotah": "contour"}
+    assert evaluate_path(parse("dotah shifted (2,3)"), e, draw, shift) == \
+            ("shifted", "contour", (2, 3))
+
+def test_expressions():
+    e = {"z1": (2.0, 4.0), "a": 3.0}
+    def value(source):
+        return evaluate(parse(source).knots[0].z, e)
+    assert value("2z1") == (4, 8)
+    assert value(".5(x1,a)") == (1, 1.5)
+    assert value("-z1 + (1,1)*a/3") == (-1, -3)
+    assert value("dir 90") == pytest.approx((0, 1))
+
+@pytest.mark.parametrize("source", [
+    "z1...z2",
+    "z1..tension atleast 1..z2",
+    "z1..tension 1 and atleast 1..z2",
+    "z1..tension 1 and 2..z2",
+    "z1..z2 z3",
+])
+def test_unsupported(source):
+    with pytest.raises(MFError):
+        parse(source)
+
+def test_mf_memoized_contours_are_copies():
+    from svg import mf
+    a = mf("(0,0){right}..{sklon2}(5,6)")
+    a[0].x = 100
+    a.append(a[0])
+    assert mf("(0,0){right}..{sklon2}(5,6)")[0].x == 0
+    assert len(mf("(0,0){right}..{sklon2}(5,6)")) == len(a) - 1
+
+def test_mf_path_variables_keyed_by_points():
+    from svg import mf
+    p = mf("(0,0){right}..{sklon2}(5,6)")
+    q = mf("(0,0){right}..{sklon2}(6,6)")
+    assert mf("p shifted (1,0)", p=p)[-1].x == p[-1].x + 1
+    # The same points give the same result, other points another one
+    assert mf("p shifted (1,0)", p=list(p))[-1].x == p[-1].x + 1
+    assert mf("p shifted (1,0)", p=q)[-1].x == q[-1].x + 1
@@ -0,0 +1,74 @@
+import numpy as np
+
+from glif import Point
+from raster import flatten, glif_edges, rasterize
+
+def polygon(*points):
+    """
+    The edges of the closed polygon.
+    """
+    p = np.array(points, dtype=float)
+    return np.hstack([p, np.roll(p, -1, axis=0)])
+
+def test_unit_square():
+    coverage = rasterize(polygon((1, 1), (2, 1), (2, 2), (1, 2)), 4, 4)
+    expected = np.zeros((4, 4))
+    expected[1, 1] = 1
+    assert np.array_equal(coverage, expected)
+
+def test_square_between_pixels():
+    # Covers a quarter of each of 4 pixels, in both orientations
+    for square in [polygon((0.5, 0.5), (1.5, 0.5), (1.5, 1.5), (0.5, 1.5)),
+            polygon((0.5, 0.5), (0.5, 1.5), (1.5, 1.5), (1.5, 0.5))]:
+        coverage = rasterize(square, 3, 3)
+        assert np.allclose(coverage[:2, :2], 0.25)
+        assert coverage.sum() == 1
+
+def test_nonzero_overlap():
+    # Two overlapping squares of the same orientation: the overlap is filled
+    # once (the even-odd rule would leave a hole)
+    edges = np.vstack([polygon((0, 0), (3, 0), (3, 3), (0, 3)),
+        polygon((1, 1), (4, 1), (4, 4), (1, 4))])
+    coverage = rasterize(edges, 5, 5)
+    assert coverage.sum() == 9 + 9 - 4
+    assert coverage[2, 2] == 1
+    # A square wound twice is filled, an inner square of the opposite
+    # orientation is a hole
+    twice = polygon((0, 0), (4, 0), (4, 4), (0, 4), (0, 0), (4, 0), (4, 4),
+            (0, 4))
+    hole = polygon((1, 1), (1, 3), (3, 3), (3, 1))
+    coverage = rasterize(np.vstack([twice, hole]), 4, 4)
+    assert coverage.sum() == 16
+    coverage = rasterize(np.vstack([polygon((0, 0), (4, 0), (4, 4), (0, 4)),
+        hole]), 4, 4)
+    assert coverage.sum() == 16 - 4
+
+def test_circle_area():
+    # The flattened circle of radius 10 covers its area
+    k = 4/3 * (np.sqrt(2) - 1) * 10
+    c = 10
+    contour = [Point(c + 10, c, "curve", True), Point(c + 10, c + k,
+        "offcurve", False), Point(c + k, c + 10, "offcurve", False),
+        Point(c, c + 10, "curve", True), Point(c - k, c + 10, "offcurve",
+        False), Point(c - 10, c + k, "offcurve", False), Point(c - 10, c,
+        "curve", True), Point(c - 10, c - k, "offcurve", False), Point(c - k,
+        c - 10, "offcurve", False), Point(c, c - 10, "curve", True),
+        Point(c + k, c - 10, "offcurve", False), Point(c + 10, c - k,
+        "offcurve", False)]
+    edges = glif_edges([contour], 0.01, 1, 0, 20)
+    coverage = rasterize(edges, 20, 20, samples=8)
+    assert abs(coverage.sum() - np.pi * 100) < 0.5
+
+def test_flatten_tolerance():
+    # A quarter circle is flattened to more segments for a smaller tolerance
+    k = 4/3 * (np.sqrt(2) - 1) * 100
+    segment = np.array([[[100, 0], [100, k], [k, 100], [0, 100]]],
+            dtype=float)
+    coarse = flatten(segment, 1)
+    fine = flatten(segment, 0.01)
+    assert len(fine) > len(coarse) > 1
+    for edges in [coarse, fine]:
+        assert np.allclose(edges[0, :2], (100, 0))
+        assert np.allclose(edges[-1, 2:], (0, 100))
+        # Consecutive edges join
+        assert np.allclose(edges[1:, :2], edges[:-1, 2:])
@@ -0,0 +1,37 @@
+import os
+import random
+
+import pytest
+from fontTools.ttLib import TTFont
+
+from shaper import Shaper, special_names
+
+from conftest import root
+
+otf = os.path.join(root, "Slabikar.otf")
+
+def test_special_names_in_font():
+    # The characters must map to the same glyphs as in the font's cmap,
+    # otherwise the shaper disagrees with the real shaping
+    cmap = TTFont(otf).getBestCmap()
+    for c, name in special_names.items():
+        assert cmap.get(ord(c)) == name, (c, name)
+
+def test_shaper_matches_harfbuzz():
+    hb = pytest.importorskip("uharfbuzz")
+    data = open(otf, "rb").read()
+    font = hb.Font(hb.Face(data))
+    cmap = TTFont(otf).getBestCmap()
+    shaper = Shaper.from_file()
+    # The characters of the font and the dashes, which it does not have
+    # (HarfBuzz hides the soft hyphen, it is only shown at a line break)
+    chars = [chr(u) for u in cmap if u != 0xad] + ["\u2013", "\u2014"]
+    rng = random.Random(0)
+    for _ in range(500):
+        text = "".join(rng.choice(chars) for _ in range(rng.randint(1, 8)))
+        buf = hb.Buffer()
+        buf.add_str(text)
+        buf.guess_segment_properties()
+        hb.shape(font, buf)
+        expected = [font.glyph_to_string(i.codepoint) for i in buf.glyph_infos]
+        assert [g.name for g in shaper.shape(text)] == expected, text
@@ -0,0 +1,50 @@
+from math import sqrt
+
+import stroke
+from glif import Point
+from stroke import evaluate, stroke_contour
+
+def circle(radius):
+    # The circle as 4 cubic curves, counter-clockwise
+    k = 4/3 * (sqrt(2) - 1) * radius
+    z = [(radius, 0), (0, radius), (-radius, 0), (0, -radius)]
+    contour = []
+    for (x0, y0), (x1, y1) in zip(z, z[1:] + z[:1]):
+        contour.extend([
+            Point(x0 - k*y0/radius, y0 + k*x0/radius, "offcurve", False),
+            Point(x1 + k*y1/radius, y1 - k*x1/radius, "offcurve", False),
+            Point(x1, y1, "curve", False),
+        ])
+    return [contour[-1]] + contour[:-1]
+
+def segments(contour):
+    # The cubic segments of the closed outline contour
+    points = [(p.x, p.y) for p in contour] + [(contour[0].x, contour[0].y)]
+    return [tuple(points[i:i+4]) for i in range(0, len(points) - 1, 3)]
+
+def test_stroked_circle():
+    # Each quarter of the circle is offset by one cubic on both sides, which
+    # is within the tolerance of the offset circles
+    outlines = stroke_contour(circle(100), 30)
+    assert len(outlines) == 2
+    radii = []
+    for contour in outlines:
+        assert len(contour) == 12
+        assert all(p.type == "curve" for p in contour[::3])
+        d = [sqrt(x**2 + y**2) for seg in segments(contour)
+                for x, y in (evaluate(seg, t/8) for t in range(9))]
+        radii.append((min(d), max(d)))
+    (outer_min, outer_max), (inner_min, inner_max) = sorted(radii,
+            reverse=True)
+    tolerance = stroke.tolerance
+    assert 115 - tolerance < outer_min <= outer_max < 115 + tolerance
+    assert 85 - tolerance < inner_min <= inner_max < 85 + tolerance
+
+def test_stroked_line():
+    # A line gets two straight sides and two round caps
+    contour = [Point(0, 0, "move", False), Point(100, 0, "line", False)]
+    [outline] = stroke_contour(contour, 20)
+    xs = [p.x for p in outline]
+    ys = [p.y for p in outline]
+    assert (min(xs), max(xs), min(ys), max(ys)) == (-10, 110, -10, 10)
+    assert sum(p.type == "line" for p in outline) == 2
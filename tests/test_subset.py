@@ -0,0 +1,16 @@
+import os
+
+from subset import FontSubsetter
+
+from conftest import root
+
+def test_memory_caches_are_bounded():
+    subsetter = FontSubsetter(os.path.join(root, "Slabikar.otf"),
+            memory_entries=2)
+    for text in ["a", "ab", "abc", "ab"]:
+        subsetter.subset(text)
+    assert len(subsetter.closures.entries) == 2
+    assert len(subsetter.subsets.entries) == 2
+    # "ab" was served from the cache
+    assert subsetter.closures.hits == 1
+    assert "a" in subsetter.closure("a") and "c" not in subsetter.closure("ab")
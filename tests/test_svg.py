@@ -0,0 +1,20 @@
+from functools import partial
+
+import svg
+
+def test_glyph_key_of_decomposed_components(monkeypatch):
+    converter = ("test",)
+    keys = {decomposed: svg.glyph_key(svg.chars["ccaron"], converter,
+        decomposed) for decomposed in [False, True]}
+    # A change of the hacek part
+    builder = svg.chars["hacek.part"]
+    contours, width, scale = builder.args
+    monkeypatch.setitem(svg.chars, "hacek.part",
+            partial(builder.func, [svg.shift(contours[0], (1, 0))], width,
+                scale))
+    # With the components kept, only the part itself is regenerated; with
+    # the components decomposed (Inkscape) the glyphs using it are as well
+    assert svg.glyph_key(svg.chars["ccaron"], converter) == keys[False]
+    assert svg.glyph_key(svg.chars["ccaron"], converter, True) != keys[True]
+    assert svg.glyph_key(svg.chars["c"], converter, True) == \
+        svg.glyph_key(svg.chars["c"], converter)
@@ -0,0 +1,46 @@
+import os
+import plistlib
+
+from glif import Component, Glif, Point, glif2glif, parse_glif
+from ufo import UFO
+
+def write_ufo(path, glifs):
+    glyphs_dir = os.path.join(path, "glyphs")
+    os.makedirs(glyphs_dir)
+    contents = {}
+    for name, text in glifs.items():
+        contents[name] = f"{name}.glif"
+        open(os.path.join(glyphs_dir, f"{name}.glif"), "w").write(text)
+    with open(os.path.join(glyphs_dir, "contents.plist"), "wb") as f:
+        plistlib.dump(contents, f)
+
+def test_ufo_matches_parse_glif(tmp_path):
+    square = [Point(0, 0, "line", False), Point(100, 0, "line", False),
+            Point(100, 100, "line", False), Point(0, 100, "line", False)]
+    glifs = {
+        # An empty contour (written as <contour />) before a non-empty one
+        "a": glif2glif(Glif("a", None, 500, [[], square], [])),
+        "b": glif2glif(Glif("b", None, 600, [square],
+            [], [Component("a", 10, 20)])),
+        # No advance
+        "c": '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<glyph name="c" format="2">\n'
+            '    <outline>\n'
+            '        <contour>\n'
+            '            <point type="line" y="0" x="0"/>\n'
+            '            <point type="line" x="10" y="10"/>\n'
+            '        </contour>\n'
+            '        <contour/>\n'
+            '    </outline>\n'
+            '</glyph>\n',
+    }
+    assert "<contour />" in glifs["a"]
+    write_ufo(str(tmp_path), glifs)
+    ufo = UFO(str(tmp_path))
+    for name, text in glifs.items():
+        expected = parse_glif(text)
+        g = ufo.glif(name)
+        assert g.w == expected.w
+        assert g.contours == expected.contours
+        assert g.components == expected.components
+    assert ufo.glif("c").w is None
@@ -3,7 +3,7 @@
 set -ex
 
 mkdir docs2
-cp Slabikar.otf docs2/
+cp Slabikar.otf Slabikar*.woff2 Slabikar*.woff Slabikar-subsets.css docs2/
 cp examples/html/example.html docs2/index.html
 git checkout gh-pages
 rm -rf docs